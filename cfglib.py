@@ -91,6 +91,73 @@ migrate_opts = [
                help='Number retry if except Performing error'),
     cfg.IntOpt('time_wait', default='5',
                help='Time wait if except Performing error'),
+    cfg.StrOpt('scheduler', default='linear',
+               help='linear - run tasks one by one, '
+                    'dag - run independent resource transport tasks '
+                    'concurrently'),
+    cfg.IntOpt('scheduler_workers', default=4,
+               help='Max number of tasks running at once in dag scheduler'),
+    cfg.IntOpt('instances_workers', default=1,
+               help='Number of instances migrated concurrently, '
+                    '1 - migrate instances one by one'),
+    cfg.IntOpt('instances_workers_per_host', default=0,
+               help='Max number of instances migrated concurrently from '
+                    'the same source compute host, 0 - no limit'),
+    cfg.ListOpt('instances_pipeline', default=[],
+                help='Number of instances processed concurrently by each '
+                     'stage of instance migration: stop, transfer of disks '
+                     'and volumes, deploy and start. Stages of consecutive '
+                     'instances overlap. Empty - no pipelining'),
+    cfg.ListOpt('instances_priority_tenants', default=[],
+                help='Instances of these tenants are migrated first when '
+                     'instances are migrated concurrently'),
+    cfg.StrOpt('journal', default='',
+               help='path to the checkpoint journal of migration, which is '
+                    'used to resume interrupted migration (fab resume), '
+                    'empty - no journal'),
+    cfg.StrOpt('executor', default='process',
+               help='how thread tasks of the scheduler are run: process - '
+                    'in forked processes, thread - in threads (tasks '
+                    'must not depend on fabric env), inline - one by one'),
+    cfg.IntOpt('executor_workers', default=4,
+               help='Max number of thread tasks running at once'),
+    cfg.IntOpt('executor_ageing', default=60,
+               help='Thread tasks waiting for a worker are started by '
+                    'priority, priority of a waiting task grows by one level '
+                    'every executor_ageing seconds, 0 - no ageing'),
+    cfg.StrOpt('profile', default='',
+               help='path to the file where time, memory, API calls and '
+                    'bytes transferred by every task are appended as JSON '
+                    'lines, empty - no profiling'),
+    cfg.IntOpt('instances_page_size', default=500,
+               help='Number of instances read from the source cloud by one '
+                    'API call, 0 - read all instances by one call'),
+    cfg.IntOpt('instances_fetch_workers', default=4,
+               help='Number of instances read at once when instances are '
+                    'filtered by id'),
+    cfg.IntOpt('cache_ttl', default=300,
+               help='Seconds lists of flavors, keypairs, images, '
+                    'services and ports are cached for, 0 - no caching'),
+    cfg.StrOpt('ext_ip_cache', default='',
+               help='path to the file where external IPs of compute hosts '
+                    'are kept between runs (direct_compute_transfer), '
+                    'empty - resolve IPs in every run'),
+    cfg.BoolOpt('inventory_from_db', default=False,
+                help='read instances of the source cloud from the nova '
+                     'database instead of the compute API'),
+    cfg.StrOpt('instance_name_template', default='instance-%08x',
+               help='instance_name_template of nova of the source cloud, '
+                    'used to name instances read from the database '
+                    '(inventory_from_db)'),
+    cfg.IntOpt('neutron_bulk_size', default=100,
+               help='Number of ports, security groups and rules created by '
+                    'one request'),
+    cfg.FloatOpt('plan_bandwidth', default=100,
+                 help='throughput of transfer of data of one instance in '
+                      'MB/s, used by the plan of migration'),
+    cfg.IntOpt('plan_instance_overhead', default=60,
+               help='seconds spent on migration of one instance besides '
+                    'transfer of its data, used by the plan of migration'),
 ]
 
 mail = cfg.OptGroup(name='mail',
@@ -32,5 +32,8 @@ class CloudFerry(object):
     def __init__(self, config):
         self.config = config
 
-    def migrate(self):
+    def migrate(self, resume=False):
+        pass
+
+    def plan(self):
         pass
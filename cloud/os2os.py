@@ -16,10 +16,16 @@
 import cloud
 import cloud_ferry
 from cloudferrylib.base.action import copy_var, rename_info, merge, is_end_iter, get_info_iter, create_reference
+from cloudferrylib.base.action import parallel_iter
+from cloudferrylib.base.action import pipeline
 from cloudferrylib.os.actions import identity_transporter
 from cloudferrylib.scheduler import scheduler
 from cloudferrylib.scheduler import namespace
 from cloudferrylib.scheduler import cursor
+from cloudferrylib.scheduler import dag
+from cloudferrylib.scheduler import executor
+from cloudferrylib.scheduler import journal
+from cloudferrylib.scheduler import thread_tasks
 from cloudferrylib.os.image import glance_image
 from cloudferrylib.os.storage import cinder_storage
 from cloudferrylib.os.network import neutron
@@ -45,9 +51,11 @@ from cloudferrylib.os.actions import get_info_instances
 from cloudferrylib.os.actions import prepare_networks
 from cloudferrylib.os.actions import dissociate_floatingip_via_compute
 from cloudferrylib.os.actions import map_compute_info
+from cloudferrylib.os.actions import plan_migration
 from cloudferrylib.os.actions import deploy_volumes
 from cloudferrylib.os.actions import start_vm
 from cloudferrylib.os.actions import stop_vm
+from cloudferrylib.utils import profiler
 from cloudferrylib.utils import utils as utl
 from cloudferrylib.os.actions import transport_compute_resources
 from cloudferrylib.os.actions import task_transfer
@@ -55,6 +63,9 @@ from cloudferrylib.utils.drivers import ssh_ceph_to_ceph
 from cloudferrylib.os.actions import get_filter
 
 
+LOG = utl.get_log(__name__)
+
+
 class OS2OSFerry(cloud_ferry.CloudFerry):
 
     def __init__(self, config):
@@ -71,8 +82,19 @@ class OS2OSFerry(cloud_ferry.CloudFerry):
             'dst_cloud': self.dst_cloud,
             'cfg': self.config
         }
+        self.migration_journal = None
+        self.task_profiler = None
 
-    def migrate(self):
+    def migrate(self, resume=False):
+        if resume and not self.config.migrate.journal:
+            raise ValueError("Migration can't be resumed: migrate.journal "
+                             "is not set")
+        if self.config.migrate.journal:
+            self.migration_journal = journal.Journal(
+                self.config.migrate.journal, [self.src_cloud, self.dst_cloud])
+        if self.config.migrate.profile:
+            self.task_profiler = profiler.Profiler(self.config.migrate.profile)
+        self.src_cloud.resources[utl.COMPUTE_RESOURCE].resolve_ext_ips()
         namespace_scheduler = namespace.Namespace({
             '__init_task__': self.init,
             'info_result': {
@@ -82,12 +104,120 @@ class OS2OSFerry(cloud_ferry.CloudFerry):
 
         task_resources_transporting = self.transport_resources()
         transport_instances_and_dependency_resources = self.migrate_instances()
+        is_dag = self.config.migrate.scheduler == 'dag'
 
-        process_migration = task_resources_transporting >> transport_instances_and_dependency_resources
+        if is_dag:
+            process_migration = transport_instances_and_dependency_resources
+        else:
+            process_migration = (task_resources_transporting >>
+                                 transport_instances_and_dependency_resources)
 
         process_migration = cursor.Cursor(process_migration)
-        scheduler_migr = scheduler.Scheduler(namespace=namespace_scheduler, cursor=process_migration)
+        scheduler_executor = executor.get_executor(
+            self.config.migrate.executor,
+            self.config.migrate.executor_workers,
+            self.config.migrate.executor_ageing)
+        scheduler_migr = scheduler.Scheduler(namespace=namespace_scheduler,
+                                             cursor=process_migration,
+                                             executor=scheduler_executor)
+
+        task_profiler = self.task_profiler
+        scheduler_migr.profiler = task_profiler
+
+        migration_journal = self.migration_journal
+        restored = 0
+        if migration_journal:
+            if resume:
+                restored = scheduler_migr.resume(migration_journal)
+            else:
+                migration_journal.reset()
+                scheduler_migr.journal = migration_journal
+
+        if is_dag and not restored:
+            scheduler_res = scheduler.DagScheduler(
+                namespace=namespace_scheduler,
+                cursor=cursor.Cursor(task_resources_transporting),
+                workers=self.config.migrate.scheduler_workers)
+            scheduler_res.journal = migration_journal
+            scheduler_res.profiler = task_profiler
+            scheduler_res.start()
+            if scheduler_res.status_error:
+                if task_profiler:
+                    task_profiler.log_summary()
+                self.log_cache_stats()
+                return
+
         scheduler_migr.start()
+        if task_profiler:
+            task_profiler.log_summary()
+        self.log_cache_stats()
+
+    def log_cache_stats(self):
+        for cloud_migr in (self.src_cloud, self.dst_cloud):
+            for name, resource in sorted(cloud_migr.resources.iteritems()):
+                cache = getattr(resource, 'cache', None)
+                if cache is not None:
+                    LOG.info("Cached lists of %s %s (hits, misses): %s",
+                             cloud_migr.position, name, cache.stats())
+
+    def plan(self):
+        """Estimate migration by the read side of it, nothing is deployed."""
+        if self.config.migrate.instances_pipeline:
+            # transfer of data is the stage limiting the pipeline
+            workers = int(self.config.migrate.instances_pipeline[
+                1 if len(self.config.migrate.instances_pipeline) > 1 else 0])
+        else:
+            workers = self.config.migrate.instances_workers
+        act_get_filter = get_filter.GetFilter(self.init)
+        act_get_info_inst = get_info_instances.GetInfoInstances(
+            self.init, cloud='src_cloud')
+        act_convert_c_to_v = convert_compute_to_volume.ConvertComputeToVolume(
+            self.init, cloud='src_cloud')
+        act_plan = plan_migration.PlanMigration(
+            self.init, cloud='src_cloud', workers=workers,
+            workers_per_host=self.config.migrate.instances_workers_per_host,
+            get_priority=self.get_instance_priority)
+        namespace_plan = namespace.Namespace({'__init_task__': self.init})
+        scheduler_plan = scheduler.Scheduler(
+            namespace=namespace_plan,
+            cursor=cursor.Cursor(act_get_filter >> act_get_info_inst >>
+                                 act_convert_c_to_v >> act_plan))
+        scheduler_plan.start()
+        if scheduler_plan.status_error:
+            return None
+        plan = namespace_plan.vars['plan']
+        duration, path = self.plan_critical_path(plan)
+        plan['critical_path'] = path
+        plan['total_duration'] = duration
+        LOG.info("Plan of migration of instances:\n%s",
+                 plan_migration.report(plan))
+        LOG.info("Critical path (%.0f seconds): %s",
+                 duration, ' >> '.join(path))
+        return plan
+
+    def plan_critical_path(self, plan):
+        """Longest chain of tasks of the migration and its duration.
+
+        Durations of resource tasks are taken from the profile of previous
+        runs, if any; images are copied at `plan_bandwidth`. Instances are
+        migrated after all resources.
+        """
+        graph = dag.Dag(self.transport_resources())
+        task_times = profiler.get_task_times(self.config.migrate.profile)
+        names = [str(t).split('|')[-1] for t in graph.tasks]
+        durations = [task_times.get(name, 0) for name in names]
+        for i, t in enumerate(graph.tasks):
+            if isinstance(t, copy_g2g.CopyFromGlanceToGlance):
+                durations[i] = max(durations[i],
+                                   float(plan['images_bytes']) /
+                                   (self.config.migrate.plan_bandwidth *
+                                    plan_migration.MB))
+        if self.config.migrate.scheduler == 'dag':
+            duration, path = graph.critical_path(durations)
+        else:
+            duration, path = sum(durations), range(len(graph))
+        return (duration + plan['duration'],
+                [names[i] for i in path] + [utl.INSTANCES_TYPE])
 
     def migrate_instances(self):
         name_data = 'info'
@@ -95,7 +225,6 @@ class OS2OSFerry(cloud_ferry.CloudFerry):
         name_backup = 'info_backup'
         name_iter = 'info_iter'
         save_result = self.save_result(name_data, name_result, name_result, 'instances')
-        trans_one_inst = self.migrate_process_instance()
         init_iteration_instance = self.init_iteration_instance(name_data, name_backup, name_iter)
         act_get_filter = get_filter.GetFilter(self.init)
         act_get_info_inst = get_info_instances.GetInfoInstances(self.init, cloud='src_cloud')
@@ -104,6 +233,36 @@ class OS2OSFerry(cloud_ferry.CloudFerry):
         rename_info_iter = rename_info.RenameInfo(name_result, name_data)
         is_instances = is_end_iter.IsEndIter()
 
+        if self.config.migrate.instances_pipeline:
+            workers = [int(w) for w in self.config.migrate.instances_pipeline]
+            per_host = self.config.migrate.instances_workers_per_host
+            stages = [pipeline.Stage(net, w, per_host) for net, w in
+                      zip(self.migrate_process_instance_stages(), workers)]
+            return act_get_filter >> \
+                act_get_info_inst >> \
+                pipeline.Pipeline(stages, name_data, name_result,
+                                  get_priority=self.get_instance_priority,
+                                  journal=self.migration_journal,
+                                  profiler=self.task_profiler) >> \
+                rename_info_iter >> \
+                act_cleanup_images
+
+        trans_one_inst = self.migrate_process_instance()
+        if self.config.migrate.instances_workers > 1:
+            migrate_all_inst = parallel_iter.ParallelIter(
+                trans_one_inst, name_data, name_result,
+                workers=self.config.migrate.instances_workers,
+                workers_per_host=(
+                    self.config.migrate.instances_workers_per_host),
+                get_priority=self.get_instance_priority,
+                journal=self.migration_journal,
+                profiler=self.task_profiler)
+            return act_get_filter >> \
+                act_get_info_inst >> \
+                migrate_all_inst >> \
+                rename_info_iter >> \
+                act_cleanup_images
+
         transport_instances_and_dependency_resources = \
             act_get_filter >> \
             act_get_info_inst >> \
@@ -116,6 +275,12 @@ class OS2OSFerry(cloud_ferry.CloudFerry):
             act_cleanup_images
         return transport_instances_and_dependency_resources
 
+    def get_instance_priority(self, instance):
+        if (instance[utl.INSTANCE_BODY]['tenant_name'] in
+                self.config.migrate.instances_priority_tenants):
+            return thread_tasks.HIGH
+        return thread_tasks.NORMAL
+
     def init_iteration_instance(self, data, name_backup, name_iter):
         init_iteration_instance = copy_var.CopyVar(data, name_backup, True) >>\
                                   create_reference.CreateReference(data, name_iter)
@@ -191,6 +356,11 @@ class OS2OSFerry(cloud_ferry.CloudFerry):
         return act_net_prep >> act_map_com_info >> act_deploy_instances
 
     def migrate_process_instance(self):
+        stop_inst, transport_resource_inst, deploy_inst = \
+            self.migrate_process_instance_stages()
+        return stop_inst >> transport_resource_inst >> deploy_inst
+
+    def migrate_process_instance_stages(self):
         act_attaching = attach_used_volumes_via_compute.AttachVolumesCompute(self.init, cloud='dst_cloud')
         act_stop_vms = stop_vm.StopVms(self.init, cloud='src_cloud')
         act_start_vms = start_vm.StartVms(self.init, cloud='dst_cloud')
@@ -198,5 +368,6 @@ class OS2OSFerry(cloud_ferry.CloudFerry):
         # transport_resource_inst = self.migrate_resources_by_instance()
         transport_inst = self.migrate_instance()
         act_dissociate_floatingip = dissociate_floatingip_via_compute.DissociateFloatingip(self.init, cloud='src_cloud')
-        return act_stop_vms >> transport_resource_inst >> transport_inst >> \
-               act_attaching >> act_dissociate_floatingip >> act_start_vms
+        deploy_inst = (transport_inst >> act_attaching >>
+                       act_dissociate_floatingip >> act_start_vms)
+        return act_stop_vms, transport_resource_inst, deploy_inst
@@ -23,6 +23,8 @@ class CopyVar(action.Action):
         self.original_info_name = original_info_name
         self.info_name = info_name
         self.deepcopy = deepcopy
+        self.requires = (original_info_name,)
+        self.provides = (info_name,)
         super(CopyVar, self).__init__({})
 
     def run(self, **kwargs):
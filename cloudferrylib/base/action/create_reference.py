@@ -22,6 +22,8 @@ class CreateReference(action.Action):
     def __init__(self, original_info_name, info_name):
         self.original_info_name = original_info_name
         self.info_name = info_name
+        self.requires = (original_info_name,)
+        self.provides = (info_name,)
         super(CreateReference, self).__init__({})
 
     def run(self, **kwargs):
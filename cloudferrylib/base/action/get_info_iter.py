@@ -24,6 +24,8 @@ class GetInfoIter(action.Action):
         self.iter_info_name = iter_info_name
         self.info_name = info_name
         self.resource_name = resource_name
+        self.requires = (iter_info_name,)
+        self.provides = (iter_info_name, info_name)
         super(GetInfoIter, self).__init__({})
 
     def run(self, **kwargs):
@@ -23,6 +23,8 @@ class IsEndIter(action.Action):
                  resource_name=utl.INSTANCES_TYPE):
         self.iter_info_name = iter_info_name
         self.resource_name = resource_name
+        self.requires = (iter_info_name,)
+        self.provides = ()
         super(IsEndIter, self).__init__({})
 
     def run(self, **kwargs):
@@ -14,7 +14,7 @@
 
 
 from cloudferrylib.base.action import action
-import copy
+from cloudferrylib.utils import utils as utl
 
 
 class Merge(action.Action):
@@ -24,11 +24,13 @@ class Merge(action.Action):
         self.data2 = data2
         self.result = result
         self.resources_name = resources_name
+        self.requires = (data1, data2)
+        self.provides = (result,)
         super(Merge, self).__init__({})
 
     def run(self, **kwargs):
-        data1 = copy.deepcopy(kwargs[self.data1])
-        data2 = copy.deepcopy(kwargs[self.data2])
+        data1 = kwargs[self.data1]
+        data2 = utl.copy_path(kwargs[self.data2], self.resources_name)
         data2[self.resources_name].update(
             data1[self.resources_name]
         )
@@ -0,0 +1,35 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+from cloudferrylib.base.action import pipeline
+from cloudferrylib.utils import utils as utl
+
+
+class ParallelIter(pipeline.Pipeline):
+    """Pass every object of the info through the chain `net` concurrently.
+
+    Pipeline of a single stage: at most `workers` objects are processed
+    at once and at most `workers_per_host` of them from the same host
+    (0 - no limit).
+    """
+
+    def __init__(self, net, info_name='info', result_name='info_result',
+                 resource_name=utl.INSTANCES_TYPE, workers=1,
+                 workers_per_host=0, get_host=pipeline.get_instance_host,
+                 get_priority=None, journal=None, profiler=None):
+        super(ParallelIter, self).__init__(
+            [pipeline.Stage(net, workers, workers_per_host)],
+            info_name, result_name, resource_name, get_host, get_priority,
+            journal, profiler)
@@ -0,0 +1,192 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import collections
+import multiprocessing
+import Queue
+
+from cloudferrylib.base.action import action
+from cloudferrylib.scheduler import cursor
+from cloudferrylib.scheduler import namespace
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.utils import utils as utl
+
+
+LOG = utl.get_log(__name__)
+
+
+def get_instance_host(obj):
+    return obj[utl.INSTANCE_BODY]['host']
+
+
+class Stage(object):
+    def __init__(self, net, workers=1, workers_per_host=0):
+        self.net = net
+        self.workers = workers
+        self.workers_per_host = workers_per_host
+
+
+class Pipeline(action.Action):
+    """Pass every object of the info through the chain of stages.
+
+    Each stage is a chain of tasks with its own queue of objects and its
+    own limit of objects processed at once (`workers`, and
+    `workers_per_host` for objects from the same host, 0 - no limit).
+    Object goes to the queue of the next stage as soon as it leaves the
+    previous one, so stages of consecutive objects overlap.
+
+    Each object is processed in a separate process with its own namespace,
+    where `info_name` holds this object only (as GetInfoIter does). Vars
+    written by a stage are passed to the next stage of the same object.
+    When the last stage is finished, resulting `info_name` is merged into
+    `result_name` (as Merge does).
+
+    Objects enter the pipeline by `get_priority`, the highest first.
+    If an object fails, no more objects enter the pipeline, but objects
+    already in it go through the remaining stages.
+
+    With `journal` every finished object is journaled along with ids of
+    finished objects (`<result_name>_done`), so that the pipeline of the
+    resumed migration skips them.
+
+    With `profiler` tasks of every object are profiled and their records
+    are collected into `profiler`.
+    """
+
+    def __init__(self, stages, info_name='info', result_name='info_result',
+                 resource_name=utl.INSTANCES_TYPE, get_host=get_instance_host,
+                 get_priority=None, journal=None, profiler=None):
+        self.stages = stages
+        self.info_name = info_name
+        self.result_name = result_name
+        self.done_name = result_name + '_done'
+        self.resource_name = resource_name
+        self.get_host = get_host
+        self.get_priority = get_priority
+        self.journal = journal
+        self.profiler = profiler
+        self.requires = (info_name, result_name)
+        self.provides = (result_name, self.done_name)
+        super(Pipeline, self).__init__({})
+
+    def run(self, **kwargs):
+        objs = kwargs[self.info_name][self.resource_name]
+        result = utl.copy_path(kwargs[self.result_name], self.resource_name)
+        done = dict(kwargs.get(self.done_name) or {})
+        queues = [collections.deque() for _ in self.stages]
+        if self.get_priority:
+            objs = sorted(objs.iteritems(),
+                          key=lambda item: -self.get_priority(item[1]))
+        else:
+            objs = objs.items()
+        for obj_id, obj in objs:
+            if obj_id in done:
+                # finished before the migration was resumed
+                continue
+            item_vars = {self.info_name: {self.resource_name: {obj_id: obj}}}
+            queues[0].append((obj_id, self.get_host(obj), item_vars))
+        running = {}
+        hosts = [collections.defaultdict(int) for _ in self.stages]
+        failed = []
+        results = multiprocessing.Queue()
+        while any(queues) or running:
+            if failed:
+                queues[0].clear()
+            for num in reversed(xrange(len(self.stages))):
+                self.dispatch(num, queues[num], running, hosts[num],
+                              kwargs, results)
+            try:
+                num, obj_id, item_vars, error, records = results.get(
+                    timeout=1)
+            except Queue.Empty:
+                for (num, obj_id), (process, _) in running.items():
+                    if not process.is_alive() and process.exitcode:
+                        self.release(num, obj_id, running, hosts)
+                        failed.append(obj_id)
+                        LOG.error("Process of %s %s exited with code %s",
+                                  self.resource_name, obj_id,
+                                  process.exitcode)
+                continue
+            host = self.release(num, obj_id, running, hosts)
+            if self.profiler:
+                self.profiler.records.extend(records)
+            if error:
+                failed.append(obj_id)
+                LOG.error("Migration of %s %s failed: %s",
+                          self.resource_name, obj_id, error)
+                continue
+            if num + 1 < len(self.stages):
+                queues[num + 1].append((obj_id, host, item_vars))
+                continue
+            result[self.resource_name].update(
+                item_vars[self.info_name][self.resource_name])
+            done[obj_id] = True
+            if self.journal:
+                self.journal.append(None, {}, {self.result_name: result,
+                                               self.done_name: done})
+        if failed:
+            raise RuntimeError("Migration of %s %s failed" %
+                               (self.resource_name, ', '.join(failed)))
+        return {
+            self.result_name: result,
+            self.done_name: done
+        }
+
+    def dispatch(self, num, queue, running, hosts, kwargs, results):
+        stage = self.stages[num]
+        busy = sum(1 for n, _ in running if n == num)
+        left = collections.deque()
+        while queue:
+            obj_id, host, item_vars = queue.popleft()
+            if (busy >= stage.workers or
+                    (stage.workers_per_host and
+                     hosts[host] >= stage.workers_per_host)):
+                left.append((obj_id, host, item_vars))
+                continue
+            process = multiprocessing.Process(
+                target=self.run_item,
+                args=(num, obj_id, item_vars, kwargs, results))
+            process.start()
+            running[(num, obj_id)] = (process, host)
+            hosts[host] += 1
+            busy += 1
+        queue.extend(left)
+
+    @staticmethod
+    def release(num, obj_id, running, hosts):
+        process, host = running.pop((num, obj_id))
+        process.join()
+        hosts[num][host] -= 1
+        return host
+
+    def run_item(self, num, obj_id, item_vars, kwargs, results):
+        vars = dict(kwargs)
+        vars.update(item_vars)
+        ns = namespace.Namespace(vars)
+        scheduler_item = scheduler.Scheduler(
+            namespace=ns, cursor=cursor.Cursor(self.stages[num].net))
+        # records made before the fork belong to the parent already
+        recorded = len(self.profiler.records) if self.profiler else 0
+        scheduler_item.profiler = self.profiler
+        scheduler_item.start()
+        records = self.profiler.records[recorded:] if self.profiler else []
+        if scheduler_item.status_error:
+            results.put((num, obj_id, None, str(scheduler_item.exception),
+                         records))
+            return
+        item_vars = {k: v for k, v in ns.vars.iteritems()
+                     if k in item_vars or k not in kwargs or
+                     v is not kwargs[k]}
+        results.put((num, obj_id, item_vars, None, records))
@@ -22,6 +22,8 @@ class RenameInfo(action.Action):
     def __init__(self, original_info_name, info_name):
         self.original_info_name = original_info_name
         self.info_name = info_name
+        self.requires = (original_info_name,)
+        self.provides = (original_info_name, info_name)
         super(RenameInfo, self).__init__({})
 
     def run(self, **kwargs):
@@ -12,7 +12,13 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import sys
+
 from cloudferrylib.base import resource
+from cloudferrylib.utils import utils
+
+
+LOG = utils.get_log(__name__)
 
 
 class Network(resource.Resource):
@@ -30,6 +36,25 @@ class Network(resource.Resource):
     def create_port(self, net_id, mac, ip, tenant_id, keep_ip, sg_ids=None):
         raise NotImplemented("it's base class")
 
+    def create_ports(self, ports):
+        """Create ports by dicts of arguments of create_port.
+
+        If any port fails, ports already created are deleted.
+        """
+        created = []
+        try:
+            for port in ports:
+                created.append(self.create_port(**port))
+        except Exception:
+            exc_info = sys.exc_info()
+            for port in created:
+                try:
+                    self.delete_port(port['id'])
+                except Exception as e:
+                    LOG.error("Delete of port %s failed: %s", port['id'], e)
+            raise exc_info[0], exc_info[1], exc_info[2]
+        return created
+
     def delete_port(self, port_id):
         raise NotImplemented("it's base class")
 
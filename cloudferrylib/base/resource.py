@@ -12,18 +12,45 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import weakref
+
+from cloudferrylib.utils import client_cache
 from cloudferrylib.utils import proxy_client
+from cloudferrylib.utils import utils
+
+
+# Resources by id, objects inherited by forked processes keep their ids
+resources = weakref.WeakValueDictionary()
+
+
+def get_resource(resource_id):
+    return resources[resource_id]
 
 
 class Resource(object):
     def __init__(self):
-        pass
+        resources[id(self)] = self
 
-    def proxy(self, client, cfg):
-        retry = cfg.migrate.retry
+    def proxy(self, client, cfg, retry=None):
+        if retry is None:
+            retry = cfg.migrate.retry
         time_wait = cfg.migrate.time_wait
         return proxy_client.Proxy(client, retry, time_wait)
 
+    def get_tenant_client(self, tenant):
+        """Client of the resource in `tenant` from the shared cache.
+
+        Client is created by `get_client` with credentials of the cloud
+        and the tenant replaced.
+        """
+        cloud = self.config.cloud
+        key = (self.__class__.__name__, cloud.host, cloud.user, tenant)
+        params = utils.ext_dict(cloud=utils.ext_dict(
+            user=cloud.user, password=cloud.password, tenant=tenant,
+            host=cloud.host))
+        return client_cache.clients.get(
+            key, lambda: self.proxy(self.get_client(params), self.config))
+
     def read_info(self, opts={}):
         pass
 
@@ -44,3 +71,7 @@ class Resource(object):
 
     def __deepcopy__(self, memo):
         return self
+
+    def __reduce__(self):
+        # info sent back from child processes refers to the parent resources
+        return get_resource, (id(self),)
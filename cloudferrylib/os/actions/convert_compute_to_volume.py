@@ -13,8 +13,6 @@
 # limitations under the License.
 
 
-import copy
-
 from cloudferrylib.base.action import action
 from cloudferrylib.utils import utils as utl
 
@@ -22,7 +20,7 @@ from cloudferrylib.utils import utils as utl
 class ConvertComputeToVolume(action.Action):
 
     def run(self, info=None, **kwargs):
-        compute_info = copy.deepcopy(info)
+        compute_info = info
         storage_info = {utl.VOLUMES_TYPE: {}}
         ignored = {}
         resource_storage = self.cloud.resources[utl.STORAGE_RESOURCE]
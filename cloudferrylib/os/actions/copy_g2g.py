@@ -21,6 +21,8 @@ LOG = utl.get_log(__name__)
 
 
 class CopyFromGlanceToGlance(transporter.Transporter):
+    provides = ('images_info',)
+
     def __init__(self, init, callback=None):
         super(CopyFromGlanceToGlance, self).__init__(init)
         self.callback = callback if callback else self.callback_print_progress
@@ -17,6 +17,7 @@ from cloudferrylib.utils import utils as utl
 
 
 class GetFilter(action.Action):
+    provides = ('search_opts',)
 
     def run(self, **kwargs):
         search_opts = None
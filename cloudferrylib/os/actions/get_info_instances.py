@@ -18,6 +18,9 @@ from cloudferrylib.utils import utils as utl
 
 
 class GetInfoInstances(action.Action):
+    requires = ('search_opts',)
+    provides = ('info',)
+
     def __init__(self, init, cloud=None):
         super(GetInfoInstances, self).__init__(init, cloud)
 
@@ -18,6 +18,7 @@ from cloudferrylib.utils import utils as utl
 
 
 class IdentityTransporter(transporter.Transporter):
+    provides = ('identity_info',)
 
     def run(self, **kwargs):
         src_resource = self.src_cloud.resources[utl.IDENTITY_RESOURCE]
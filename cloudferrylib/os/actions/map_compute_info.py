@@ -15,14 +15,13 @@
 
 from cloudferrylib.base.action import action
 from cloudferrylib.utils import utils as utl
-import copy
 
 
 class MapComputeInfo(action.Action):
 
     def run(self, info=None, **kwargs):
 
-        new_compute_info = copy.deepcopy(info)
+        new_compute_info = utl.copy_path(info, utl.INSTANCES_TYPE)
 
         src_compute = self.src_cloud.resources[utl.COMPUTE_RESOURCE]
         dst_compute = self.dst_cloud.resources[utl.COMPUTE_RESOURCE]
@@ -33,7 +32,10 @@ class MapComputeInfo(action.Action):
         dst_flavors_dict = \
             {flavor.name: flavor.id for flavor in dst_compute.get_flavor_list()}
 
-        for instance in new_compute_info[utl.INSTANCES_TYPE].values():
+        instances = new_compute_info[utl.INSTANCES_TYPE]
+        for instance_id, instance in instances.items():
+            instance = utl.copy_path(instance, 'instance')
+            instances[instance_id] = instance
             _instance = instance['instance']
             flavor_name = src_flavors_dict[_instance['flavor_id']]
             _instance['flavor_id'] = dst_flavors_dict[flavor_name]
@@ -18,6 +18,9 @@ from cloudferrylib.utils import utils as utl
 
 
 class NetworkTransporter(transporter.Transporter):
+    # tenants have to be deployed before networks
+    requires = ('identity_info',)
+    provides = ()
 
     def run(self, **kwargs):
         src_resource = self.src_cloud.resources[utl.NETWORK_RESOURCE]
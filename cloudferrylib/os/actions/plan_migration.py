@@ -0,0 +1,140 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import collections
+import heapq
+
+from cloudferrylib.base.action import action
+from cloudferrylib.utils import utils as utl
+
+
+GB = 1024 ** 3
+MB = 1024 ** 2
+
+
+def schedule(items, workers=1, workers_per_host=0):
+    """Simulate concurrent migration of (key, host, duration) items.
+
+    Items are started in order, at most `workers` at once and at most
+    `workers_per_host` from the same host (0 - no limit), as Pipeline
+    does. Returns {key: (start, end)}.
+    """
+    times = {}
+    queue = list(items)
+    running = []
+    hosts = collections.defaultdict(int)
+    now = 0
+    while queue:
+        left = []
+        for key, host, duration in queue:
+            if (len(running) >= max(workers, 1) or
+                    (workers_per_host and
+                     hosts[host] >= workers_per_host)):
+                left.append((key, host, duration))
+                continue
+            heapq.heappush(running, (now + duration, host))
+            hosts[host] += 1
+            times[key] = (now, now + duration)
+        queue = left
+        if queue:
+            now, host = heapq.heappop(running)
+            hosts[host] -= 1
+    return times
+
+
+def report(plan):
+    row = '%-36s %-24s %-16s %12s %10s %10s %10s'
+    lines = [row % ('instance', 'name', 'host', 'bytes', 'duration',
+                    'start', 'end')]
+    for inst_id, inst in sorted(plan[utl.INSTANCES_TYPE].iteritems(),
+                                key=lambda item: item[1]['start']):
+        lines.append(row % (inst_id, inst['name'], inst['host'],
+                            inst['bytes'], '%.0f' % inst['duration'],
+                            '%.0f' % inst['start'], '%.0f' % inst['end']))
+    lines.append('total: %s instances, %s bytes, %.0f seconds' %
+                 (len(plan[utl.INSTANCES_TYPE]), plan['bytes'],
+                  plan['duration']))
+    return '\n'.join(lines)
+
+
+class PlanMigration(action.Action):
+    """Estimate data volume and duration of migration of instances.
+
+    Bytes of an instance are sizes of its image (counted for the first
+    instance using it only), volumes and ephemeral disk. Duration of an
+    instance is its bytes at `plan_bandwidth` MB/s plus
+    `plan_instance_overhead` seconds; instances are scheduled by
+    `get_priority` with the limits of concurrent migration (see
+    `schedule`). Nothing is changed in the clouds.
+    """
+
+    requires = ('info', 'storage_info')
+    provides = ('plan',)
+
+    def __init__(self, init, cloud=None, workers=1, workers_per_host=0,
+                 get_priority=None):
+        super(PlanMigration, self).__init__(init, cloud)
+        self.workers = workers
+        self.workers_per_host = workers_per_host
+        self.get_priority = get_priority
+
+    def run(self, info=None, storage_info=None, **kwargs):
+        image_resource = self.cloud.resources[utl.IMAGE_RESOURCE]
+        compute_resource = self.cloud.resources[utl.COMPUTE_RESOURCE]
+        image_sizes = {image.id: image.size or 0
+                       for image in image_resource.get_image_list()}
+        ephemeral_sizes = {flavor.id: flavor.ephemeral
+                           for flavor in compute_resource.get_flavor_list()}
+        volume_sizes = collections.defaultdict(int)
+        for volume in storage_info[utl.VOLUMES_TYPE].itervalues():
+            instance = volume[utl.META_INFO]['instance']
+            inst_id = instance[utl.INSTANCE_BODY]['id']
+            volume_sizes[inst_id] += volume[utl.VOLUME_BODY]['size'] * GB
+
+        instances = info[utl.INSTANCES_TYPE].items()
+        if self.get_priority:
+            instances.sort(key=lambda item: -self.get_priority(item[1]))
+        bandwidth = self.cfg.migrate.plan_bandwidth * MB
+        overhead = self.cfg.migrate.plan_instance_overhead
+        plan = {utl.INSTANCES_TYPE: {}}
+        counted_images = set()
+        items = []
+        for inst_id, instance in instances:
+            _instance = instance[utl.INSTANCE_BODY]
+            size = volume_sizes[inst_id]
+            image_id = _instance['image_id']
+            if image_id and image_id not in counted_images:
+                counted_images.add(image_id)
+                size += image_sizes.get(image_id, 0)
+            if _instance['is_ephemeral']:
+                size += ephemeral_sizes.get(_instance['flavor_id'], 0) * GB
+            duration = float(size) / bandwidth + overhead
+            plan[utl.INSTANCES_TYPE][inst_id] = {
+                'name': _instance['name'],
+                'host': _instance['host'],
+                'bytes': size,
+                'duration': duration,
+            }
+            items.append((inst_id, _instance['host'], duration))
+        times = schedule(items, self.workers, self.workers_per_host)
+        for inst_id, (start, end) in times.iteritems():
+            plan[utl.INSTANCES_TYPE][inst_id].update(start=start, end=end)
+        plan['bytes'] = sum(inst['bytes'] for inst in
+                            plan[utl.INSTANCES_TYPE].itervalues())
+        plan['duration'] = max([end for _, end in times.itervalues()] or [0])
+        plan['images_bytes'] = sum(image_sizes.itervalues())
+        return {
+            'plan': plan
+        }
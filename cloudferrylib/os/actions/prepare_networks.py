@@ -13,8 +13,6 @@
 # limitations under the License.
 
 
-import copy
-
 from cloudferrylib.base.action import action
 from cloudferrylib.utils import utils as utl
 
@@ -23,7 +21,7 @@ class PrepareNetworks(action.Action):
 
     def run(self, info=None, **kwargs):
 
-        info_compute = copy.deepcopy(info)
+        info_compute = utl.copy_path(info, utl.INSTANCES_TYPE)
 
         network_resource = self.cloud.resources[utl.NETWORK_RESOURCE]
         identity_resource = self.cloud.resources[utl.IDENTITY_RESOURCE]
@@ -31,12 +29,19 @@ class PrepareNetworks(action.Action):
         keep_ip = self.cfg.migrate.keep_ip
 
         instances = info_compute[utl.INSTANCES_TYPE]
+        dst_security_groups = network_resource.get_security_groups()
+        ports = []
+        nics = []
         for (id_inst, inst) in instances.iteritems():
-            params = []
             networks_info = inst[utl.INSTANCE_BODY][utl.INTERFACES]
             security_groups = inst[utl.INSTANCE_BODY]['security_groups']
             tenant_name = inst[utl.INSTANCE_BODY]['tenant_name']
             tenant_id = identity_resource.get_tenant_id_by_name(tenant_name)
+            sg_ids = []
+            for sg in dst_security_groups:
+                if sg['tenant_id'] == tenant_id:
+                    if sg['name'] in security_groups:
+                        sg_ids.append(sg['id'])
             for src_net in networks_info:
                 dst_net = network_resource.get_network(src_net, tenant_id,
                                                        keep_ip)
@@ -44,26 +49,32 @@ class PrepareNetworks(action.Action):
                                                                src_net['mac'])
                 if port_id:
                     network_resource.delete_port(port_id)
-                sg_ids = []
-                for sg in network_resource.get_security_groups():
-                    if sg['tenant_id'] == tenant_id:
-                        if sg['name'] in security_groups:
-                            sg_ids.append(sg['id'])
-                port = network_resource.create_port(dst_net['id'],
-                                                    src_net['mac'],
-                                                    src_net['ip'],
-                                                    tenant_id,
-                                                    keep_ip,
-                                                    sg_ids)
-                if self.cfg.migrate.keep_floatingip:
-                    if src_net['floatingip']:
+                ports.append(dict(net_id=dst_net['id'],
+                                  mac=src_net['mac'],
+                                  ip=src_net['ip'],
+                                  tenant_id=tenant_id,
+                                  keep_ip=keep_ip,
+                                  sg_ids=sg_ids))
+                nics.append((id_inst, src_net, dst_net))
+        # ports of all instances are created at once, by bulk requests;
+        # if any of them fails, ports already created are deleted
+        created = network_resource.create_ports(ports)
+        params = {id_inst: [] for id_inst in instances}
+        dst_flotingips_map = None
+        for (id_inst, src_net, dst_net), port in zip(nics, created):
+            if self.cfg.migrate.keep_floatingip:
+                if src_net['floatingip']:
+                    if dst_flotingips_map is None:
                         dst_flotingips = network_resource.get_floatingips()
                         dst_flotingips_map = \
                             {fl_ip['floating_ip_address']: fl_ip['id'] for fl_ip in dst_flotingips}
-                        dst_floatingip_id = dst_flotingips_map[src_net['floatingip']]
-                        floating_ip = network_resource.update_floatingip(dst_floatingip_id, port['id'])
-                params.append({'net-id': dst_net['id'], 'port-id': port['id']})
-            instances[id_inst][utl.INSTANCE_BODY]['nics'] = params
+                    dst_floatingip_id = dst_flotingips_map[src_net['floatingip']]
+                    network_resource.update_floatingip(dst_floatingip_id, port['id'])
+            params[id_inst].append({'net-id': dst_net['id'],
+                                    'port-id': port['id']})
+        for (id_inst, inst) in instances.items():
+            instances[id_inst] = utl.copy_path(inst, utl.INSTANCE_BODY)
+            instances[id_inst][utl.INSTANCE_BODY]['nics'] = params[id_inst]
         info_compute[utl.INSTANCES_TYPE] = instances
         return {
             'info': info_compute
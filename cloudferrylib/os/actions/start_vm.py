@@ -13,6 +13,10 @@
 # limitations under the License.
 
 from cloudferrylib.base.action import action
+from cloudferrylib.utils import utils as utl
+
+
+LOG = utl.get_log(__name__)
 
 
 class StartVms(action.Action):
@@ -20,5 +24,12 @@ class StartVms(action.Action):
     def run(self, info, **kwargs):
         compute_resource = self.cloud.resources['compute']
 
-        for instance in info['instances']:
-            compute_resource.change_status('active', instance_id=instance)
+        errors = compute_resource.change_statuses('active',
+                                                  info['instances'].keys())
+        for instance_id, error in errors.iteritems():
+            LOG.error("Start of instance %s failed: %s", instance_id, error)
+        if errors:
+            raise RuntimeError("Start of instances %s failed" %
+                               ', '.join(errors))
+
+        return {}
@@ -13,16 +13,23 @@
 # limitations under the License.
 
 from cloudferrylib.base.action import action
-import copy
+from cloudferrylib.utils import utils as utl
+
+
+LOG = utl.get_log(__name__)
 
 
 class StopVms(action.Action):
 
     def run(self, info=None, **kwargs):
-        info = copy.deepcopy(info)
         compute_resource = self.cloud.resources['compute']
 
-        for instance in info['instances']:
-            compute_resource.change_status('shutoff', instance_id=instance)
+        errors = compute_resource.change_statuses('shutoff',
+                                                  info['instances'].keys())
+        for instance_id, error in errors.iteritems():
+            LOG.error("Stop of instance %s failed: %s", instance_id, error)
+        if errors:
+            raise RuntimeError("Stop of instances %s failed" %
+                               ', '.join(errors))
 
         return {}
@@ -14,9 +14,14 @@
 
 
 from cloudferrylib.base.action import action
+from cloudferrylib.utils import driver_transporter
+from cloudferrylib.utils import profiler
 from cloudferrylib.utils import utils as utl
 
 
+LOG = utl.get_log(__name__)
+
+
 class TaskTransfer(action.Action):
     def __init__(self, init, driver,
                  input_info='info',
@@ -36,6 +41,21 @@ class TaskTransfer(action.Action):
 
         for item in data_for_trans.itervalues():
             data = item[self.resource_root_name]
-            self.driver.transfer(data)
+            output = self.driver.transfer(data)
+            if self.cfg.migrate.profile:
+                self.count_bytes(data, output)
 
         return {}
+
+    @staticmethod
+    def count_bytes(data, output):
+        """Counts bytes reported by dd during transfer, falling back to
+        the volume size (in GB) already known from the info."""
+
+        size = driver_transporter.transferred_bytes(output)
+        if size is None and data.get('size'):
+            size = int(data['size']) * 1024 ** 3
+        if size is None:
+            LOG.debug("Transferred size of %s is unknown", data['path_src'])
+            return
+        profiler.count(profiler.BYTES, size)
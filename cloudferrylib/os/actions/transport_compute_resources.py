@@ -20,6 +20,7 @@ from cloudferrylib.utils import utils as utl
 
 
 class TransportComputeResources(action.Action):
+    provides = ('info',)
 
     def run(self, info=None, identity_info=None, **kwargs):
         info = copy.deepcopy(info)
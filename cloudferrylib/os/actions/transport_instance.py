@@ -14,6 +14,7 @@
 
 
 import copy
+import time
 
 from fabric.api import env
 from fabric.api import run
@@ -65,7 +66,6 @@ class TransportInstance(action.Action):
     # TODO constants
 
     def run(self, info=None, **kwargs):
-        info = copy.deepcopy(info)
         #Init before run
         dst_storage = self.dst_cloud.resources[utl.STORAGE_RESOURCE]
         src_compute = self.src_cloud.resources[utl.COMPUTE_RESOURCE]
@@ -82,6 +82,9 @@ class TransportInstance(action.Action):
         for instance_id, instance in info[utl.INSTANCES_TYPE].iteritems():
             instance_boot = instance[utl.INSTANCE_BODY]['boot_mode']
             is_ephemeral = instance[utl.INSTANCE_BODY]['is_ephemeral']
+            # transport of disks changes these parts of the instance
+            for body in (utl.INSTANCE_BODY, DIFF, EPHEMERAL):
+                instance = utl.copy_path(instance, body)
             one_instance = {
                 utl.INSTANCES_TYPE: {
                     instance_id: instance
@@ -112,15 +115,16 @@ class TransportInstance(action.Action):
         }
 
     def deploy_instance(self, dst_cloud, info):
-        info = copy.deepcopy(info)
         dst_compute = dst_cloud.resources[COMPUTE]
 
+        since = time.time()
         new_ids = dst_compute.deploy(info)
-        for i in new_ids.iterkeys():
-            dst_compute.wait_for_status(i, 'active')
+        dst_compute.wait_for_statuses(new_ids.keys(), 'active', since=since)
         new_info = dst_compute.read_info(search_opts={'id': new_ids.keys()})
-        for i in new_ids.iterkeys():
-            dst_compute.change_status('shutoff', instance_id=i)
+        errors = dst_compute.change_statuses('shutoff', new_ids.keys())
+        if errors:
+            raise RuntimeError("Stop of instances %s failed: %s" %
+                               (', '.join(errors), errors.values()[0]))
         for new_id, old_id in new_ids.iteritems():
             new_info['instances'][new_id]['old_id'] = old_id
             new_info['instances'][new_id]['meta'] = \
@@ -129,8 +133,6 @@ class TransportInstance(action.Action):
         return info
 
     def prepare_ephemeral_drv(self, info, new_info, map_new_to_old_ids):
-        info = copy.deepcopy(info)
-        new_info = copy.deepcopy(new_info)
         for new_id, old_id in map_new_to_old_ids.iteritems():
             instance_old = info[INSTANCES][old_id]
             instance_new = new_info[INSTANCES][new_id]
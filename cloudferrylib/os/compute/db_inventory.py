@@ -0,0 +1,183 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import collections
+import json
+
+
+# nova's default instance_name_template
+INSTANCE_NAME_TEMPLATE = 'instance-%08x'
+
+# vm_state -> status shown by the compute API
+VM_STATES = {
+    'active': 'ACTIVE',
+    'building': 'BUILD',
+    'stopped': 'SHUTOFF',
+    'paused': 'PAUSED',
+    'suspended': 'SUSPENDED',
+    'rescued': 'RESCUE',
+    'resized': 'VERIFY_RESIZE',
+    'soft-delete': 'SOFT_DELETED',
+    'shelved': 'SHELVED',
+    'shelved_offloaded': 'SHELVED_OFFLOADED',
+    'error': 'ERROR',
+}
+
+# search option -> column of the instances table
+SEARCH_COLUMNS = {
+    'id': 'i.uuid',
+    'tenant_id': 'i.project_id',
+    'host': 'i.host',
+}
+
+INSTANCES_QUERY = """
+SELECT i.id, i.uuid, i.display_name, i.vm_state, i.project_id, i.image_ref,
+       i.key_name, i.host, i.availability_zone, t.flavorid
+FROM instances i JOIN instance_types t ON t.id = i.instance_type_id
+WHERE i.deleted = 0{filters}
+ORDER BY i.id"""
+
+SECURITY_GROUPS_QUERY = """
+SELECT a.instance_uuid, g.name
+FROM security_group_instance_association a
+JOIN security_groups g ON g.id = a.security_group_id
+JOIN instances i ON i.uuid = a.instance_uuid
+WHERE a.deleted = 0 AND i.deleted = 0{filters}
+ORDER BY a.id"""
+
+VOLUMES_QUERY = """
+SELECT b.instance_uuid, b.volume_id, b.device_name
+FROM block_device_mapping b JOIN instances i ON i.uuid = b.instance_uuid
+WHERE b.deleted = 0 AND b.volume_id IS NOT NULL AND i.deleted = 0{filters}
+ORDER BY b.id"""
+
+NETWORKS_QUERY = """
+SELECT c.instance_uuid, c.network_info
+FROM instance_info_caches c JOIN instances i ON i.uuid = c.instance_uuid
+WHERE c.deleted = 0 AND i.deleted = 0{filters}"""
+
+
+class DbServer(object):
+    """Server read from the nova database.
+
+    Has attributes of novaclient's Server used to convert instances, and
+    MACs of its fixed IPs and devices of its volumes which are read by
+    separate API calls for Server.
+    """
+
+    def __init__(self, row, name_template=INSTANCE_NAME_TEMPLATE):
+        self.id = row['uuid']
+        self.name = row['display_name']
+        self.status = VM_STATES.get(row['vm_state'],
+                                    (row['vm_state'] or '').upper())
+        self.tenant_id = row['project_id']
+        self.flavor = {'id': row['flavorid']}
+        self.image = {'id': row['image_ref']} if row['image_ref'] else ''
+        self.key_name = row['key_name']
+        self.security_groups = []
+        self.networks = collections.OrderedDict()
+        self.macs = {}
+        self.devices = []
+        # the template is formatted as nova does it: by the instance
+        # fields if it has named fields, by the id otherwise
+        setattr(self, 'OS-EXT-SRV-ATTR:instance_name',
+                name_template % (row if '%(' in name_template
+                                 else row['id']))
+        setattr(self, 'OS-EXT-SRV-ATTR:host', row['host'])
+        setattr(self, 'OS-EXT-AZ:availability_zone',
+                row['availability_zone'])
+        setattr(self, 'os-extended-volumes:volumes_attached', [])
+
+    def add_network_info(self, network_info):
+        """Add addresses of cached network info as Server.networks has."""
+        for vif in json.loads(network_info or '[]'):
+            network = vif.get('network') or {}
+            addresses = self.networks.setdefault(network.get('label'), [])
+            for subnet in network.get('subnets', []):
+                for ip in subnet.get('ips', []):
+                    addresses.append(ip['address'])
+                    self.macs[ip['address']] = vif.get('address')
+                    addresses.extend(floating['address'] for floating in
+                                     ip.get('floating_ips', []))
+
+
+def supports(search_opts):
+    """Whether servers can be filtered by the search options in the DB."""
+    return all(key in SEARCH_COLUMNS or key == 'all_tenants'
+               for key in (search_opts or {}))
+
+
+def scope(search_opts, project_id):
+    """Search options selecting the servers the compute API returns.
+
+    The API lists servers of the project of the client only, unless
+    `all_tenants` is set, while servers requested by id are read from any
+    project.
+    """
+    search_opts = dict(search_opts or {})
+    all_tenants = search_opts.pop('all_tenants', None)
+    if project_id is not None and not all_tenants and \
+            'id' not in search_opts:
+        search_opts['tenant_id'] = project_id
+    return search_opts
+
+
+def make_filters(search_opts):
+    """SQL conditions with their parameters for the search options."""
+    filters = []
+    params = {}
+    for key, value in sorted((search_opts or {}).iteritems()):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        names = []
+        for i, item in enumerate(values):
+            names.append(':%s_%d' % (key, i))
+            params['%s_%d' % (key, i)] = item
+        filters.append(' AND %s IN (%s)' % (SEARCH_COLUMNS[key],
+                                            ', '.join(names) or 'NULL'))
+    return ''.join(filters), params
+
+
+def read_servers(connector, search_opts=None,
+                 name_template=INSTANCE_NAME_TEMPLATE, project_id=None):
+    """Servers with their security groups, networks and volumes.
+
+    Everything is read by four queries whatever the number of servers is.
+    Libvirt names of the servers are made by nova's `name_template`.
+    Servers are scoped to `project_id` as the compute API does it, if set.
+    """
+    filters, params = make_filters(scope(search_opts, project_id))
+
+    def query(command):
+        return list(connector.execute(command.format(filters=filters),
+                                      **params))
+
+    servers = collections.OrderedDict(
+        (row['uuid'], DbServer(row, name_template))
+        for row in query(INSTANCES_QUERY))
+    for row in query(SECURITY_GROUPS_QUERY):
+        if row['instance_uuid'] in servers:
+            servers[row['instance_uuid']].security_groups.append(
+                {'name': row['name']})
+    for row in query(VOLUMES_QUERY):
+        if row['instance_uuid'] in servers:
+            server = servers[row['instance_uuid']]
+            server.devices.append((row['volume_id'], row['device_name']))
+            getattr(server, 'os-extended-volumes:volumes_attached').append(
+                {'id': row['volume_id']})
+    for row in query(NETWORKS_QUERY):
+        if row['instance_uuid'] in servers:
+            servers[row['instance_uuid']].add_network_info(
+                row['network_info'])
+    return servers.values()
@@ -14,13 +14,16 @@
 
 
 import copy
+from multiprocessing.pool import ThreadPool
 import time
-from sqlalchemy import exc
 
 from novaclient.v1_1 import client as nova_client
 
 from cloudferrylib.base import compute
+from cloudferrylib.os.compute import db_inventory
+from cloudferrylib.os.compute import status_watcher
 from cloudferrylib.utils import mysql_connector
+from cloudferrylib.utils import list_cache
 from cloudferrylib.utils import timeout_exception
 from cloudferrylib.utils import utils as utl
 
@@ -32,6 +35,98 @@ DISK = "disk"
 LOCAL = ".local"
 LEN_UUID_INSTANCE = 36
 INTERFACES = "interfaces"
+VOLUMES_ATTACHED = "os-extended-volumes:volumes_attached"
+
+# current status -> wanted status -> ((server action, status after it), ...)
+STATUS_STEPS = {
+    'paused': {
+        'active': (('unpause', 'active'),),
+        'shutoff': (('stop', 'shutoff'),),
+        'suspend': (('unpause', 'active'), ('suspend', 'suspend')),
+    },
+    'suspend': {
+        'active': (('resume', 'active'),),
+        'shutoff': (('stop', 'shutoff'),),
+        'paused': (('resume', 'active'), ('pause', 'paused')),
+    },
+    'active': {
+        'paused': (('pause', 'paused'),),
+        'suspend': (('suspend', 'suspend'),),
+        'shutoff': (('stop', 'shutoff'),),
+    },
+    'shutoff': {
+        'active': (('start', 'active'),),
+        'paused': (('start', 'active'), ('pause', 'paused')),
+        'suspend': (('start', 'active'), ('suspend', 'suspend')),
+    },
+}
+
+# reads of fewer instances filtered by id look up their data one by one
+LOOKUP_CONTEXT_MIN_IDS = 10
+
+
+class LookupContext(object):
+    """Data needed to convert many instances, read by one list call each.
+
+    Tenants, flavors, MACs of ports and devices of attached volumes are
+    read once for all instances. Anything missing from the prefetched data
+    is read for the instance as it is done without the context. MACs and
+    devices of servers read from the database (`db_servers`) are taken
+    from them.
+    """
+
+    def __init__(self, compute_res, db_servers=None):
+        resources = compute_res.cloud.resources
+        self.compute = compute_res
+        self.get_tenant_name = resources[
+            utl.IDENTITY_RESOURCE].get_tenants_func()
+        self.flavors = {flavor.id: flavor
+                        for flavor in compute_res.get_flavor_list()}
+        if db_servers is not None:
+            self.macs = {}
+            self.devices = {}
+            for server in db_servers:
+                self.macs.update(server.macs)
+                for volume_id, device in server.devices:
+                    self.devices[(server.id, volume_id)] = device
+            return
+        self.macs = None
+        network_res = resources.get(utl.NETWORK_RESOURCE)
+        if hasattr(network_res, 'get_macs_by_ip'):
+            self.macs = network_res.get_macs_by_ip()
+        self.devices = {}
+        storage_res = resources.get(utl.STORAGE_RESOURCE)
+        if storage_res is not None:
+            for volume in storage_res.get_volumes_list(
+                    search_opts={'all_tenants': 1}):
+                for attachment in volume.attachments:
+                    self.devices[(attachment['server_id'], volume.id)] = \
+                        attachment['device']
+
+    def get_flavor(self, flavor_id):
+        if flavor_id not in self.flavors:
+            self.flavors[flavor_id] = self.compute.get_flavor_from_id(
+                flavor_id)
+        return self.flavors[flavor_id]
+
+    def get_networks(self, instance):
+        if self.macs is None:
+            return self.compute.get_networks(instance)
+        return self.compute.get_networks(instance, self.macs.get)
+
+    def get_volumes(self, instance):
+        """Attached volumes as (id, device) in the order of attachment."""
+        attached = getattr(instance, VOLUMES_ATTACHED, None)
+        if attached is not None:
+            keys = [(instance.id, v['id']) for v in attached]
+            if all(key in self.devices for key in keys):
+                return [(key[1], self.devices[key]) for key in keys]
+        return get_server_volumes(self.compute, instance)
+
+
+def get_server_volumes(compute_res, instance):
+    return [(v.id, v.device) for v in
+            compute_res.nova_client.volumes.get_server_volumes(instance.id)]
 
 
 class NovaCompute(compute.Compute):
@@ -42,9 +137,11 @@ class NovaCompute(compute.Compute):
         self.config = config
         self.cloud = cloud
         self.identity = cloud.resources['identity']
+        self.cache = list_cache.ListCache(config.migrate.cache_ttl)
         self.mysql_connector = mysql_connector.MysqlConnector(config.mysql,
                                                               'nova')
         self.nova_client = self.proxy(self.get_client(), config)
+        self.status_watcher = status_watcher.StatusWatcher(self.nova_client)
 
     def get_client(self, params=None):
         """Getting nova client. """
@@ -115,37 +212,83 @@ class NovaCompute(compute.Compute):
         search_opts = kwargs.get('search_opts')
         info = {'instances': {}}
 
-        for instance in self.get_instances_list(search_opts=search_opts):
-            info['instances'][instance.id] = self.convert(instance,
-                                                          self.config,
-                                                          self.cloud)
+        for instance_id, instance in self.iter_instances_info(search_opts):
+            info['instances'][instance_id] = instance
 
         return info
 
+    def iter_instances_info(self, search_opts=None):
+        """Yield (id, converted instance) as instances are read.
+
+        With `inventory_from_db` instances of the source cloud are read
+        from the nova database, unless they are filtered by options the
+        database read doesn't support.
+        """
+        if self.use_db_inventory(search_opts):
+            servers = db_inventory.read_servers(
+                self.mysql_connector, search_opts,
+                self.config.migrate.instance_name_template,
+                self.identity.get_tenant_id_by_name(self.config.cloud.tenant))
+            context = LookupContext(self, servers)
+            for server in servers:
+                yield server.id, self.convert_instance(server, self.config,
+                                                       self.cloud, context)
+            return
+        context = None
+        ids = search_opts.get('id') if search_opts else None
+        if ids and len(ids if type(ids) is list else [ids]) < \
+                LOOKUP_CONTEXT_MIN_IDS:
+            # as deploy reads every migrated instance, listing everything
+            # for it would cost more than its own lookups
+            for instance in self.iter_instances(search_opts):
+                yield instance.id, self.convert(instance, self.config,
+                                                self.cloud)
+            return
+        for instance in self.iter_instances(search_opts):
+            if context is None:
+                context = LookupContext(self)
+            yield instance.id, self.convert(instance, self.config,
+                                            self.cloud, context)
+
+    def use_db_inventory(self, search_opts):
+        if (not self.config.migrate.inventory_from_db or
+                self.cloud.position != 'src'):
+            return False
+        if not db_inventory.supports(search_opts):
+            LOG.warning("Instances are filtered by %s, they are read by "
+                        "API", ', '.join(search_opts))
+            return False
+        return True
+
     @staticmethod
-    def convert_instance(instance, cfg, cloud):
-        identity_res = cloud.resources[utl.IDENTITY_RESOURCE]
+    def convert_instance(instance, cfg, cloud, context=None):
         compute_res = cloud.resources[utl.COMPUTE_RESOURCE]
 
         instance_name = getattr(instance, "OS-EXT-SRV-ATTR:instance_name")
         instance_host = getattr(instance, 'OS-EXT-SRV-ATTR:host')
 
-        get_tenant_name = identity_res.get_tenants_func()
+        if context is None:
+            identity_res = cloud.resources[utl.IDENTITY_RESOURCE]
+            get_tenant_name = identity_res.get_tenants_func()
+            interfaces = compute_res.get_networks(instance)
+            server_volumes = get_server_volumes(compute_res, instance)
+            flavor = compute_res.get_flavor_from_id(instance.flavor['id'])
+        else:
+            get_tenant_name = context.get_tenant_name
+            interfaces = context.get_networks(instance)
+            server_volumes = context.get_volumes(instance)
+            flavor = context.get_flavor(instance.flavor['id'])
 
         security_groups = []
         for security_group in instance.security_groups:
             security_groups.append(security_group['name'])
 
-        interfaces = compute_res.get_networks(instance)
-
-        volumes = [{'id': v.id,
+        volumes = [{'id': volume_id,
                     'num_device': i,
-                    'device': v.device} for i, v in enumerate(
-                        compute_res.nova_client.volumes.get_server_volumes(
-                            instance.id))]
+                    'device': device} for i, (volume_id, device) in
+                   enumerate(server_volumes)]
 
-        is_ephemeral = compute_res.get_flavor_from_id(
-            instance.flavor['id']).ephemeral > 0
+        is_ephemeral = flavor.ephemeral > 0
 
         is_ceph = cfg.compute.backend.lower() == utl.CEPH
         direct_transfer = cfg.migrate.direct_compute_transfer
@@ -243,11 +386,11 @@ class NovaCompute(compute.Compute):
                     'meta': {}}
 
     @staticmethod
-    def convert(obj, cfg=None, cloud=None):
+    def convert(obj, cfg=None, cloud=None, context=None):
         res_tuple = (nova_client.keypairs.Keypair, nova_client.flavors.Flavor)
 
         if isinstance(obj, nova_client.servers.Server):
-            return NovaCompute.convert_instance(obj, cfg, cloud)
+            return NovaCompute.convert_instance(obj, cfg, cloud, context)
         elif isinstance(obj, res_tuple):
             return NovaCompute.convert_resources(obj)
 
@@ -303,56 +446,22 @@ class NovaCompute(compute.Compute):
         return info
 
     def _deploy_user_quotas(self, quotas, tenant_map, user_map):
-        insert_cmd = ("INSERT INTO project_user_quotas (user_id, project_id, "
-                      "resource, hard_limit, deleted) VALUES ('%s', '%s', '%s'"
-                      ", %s, 0)")
-
-        update_cmd = ("UPDATE project_user_quotas SET hard_limit=%s WHERE "
-                      "user_id='%s' AND project_id='%s' AND resource='%s' AND "
-                      "deleted=0")
-
-        for _quota in quotas:
-            quota = _quota['quota']
-            try:
-                self.mysql_connector.execute(insert_cmd % (
-                    user_map[quota['user_id']],
-                    tenant_map[quota['project_id']],
-                    quota['resource'],
-                    quota['hard_limit']))
-            except exc.IntegrityError as e:
-                if 'Duplicate entry' in e.message:
-                    self.mysql_connector.execute(update_cmd % (
-                        quota['hard_limit'],
-                        user_map[quota['user_id']],
-                        tenant_map[quota['project_id']],
-                        quota['resource'],
-                    ))
-                else:
-                    raise
+        rows = [{'user_id': user_map[quota['quota']['user_id']],
+                 'project_id': tenant_map[quota['quota']['project_id']],
+                 'resource': quota['quota']['resource'],
+                 'hard_limit': quota['quota']['hard_limit'],
+                 'deleted': 0} for quota in quotas]
+        self.mysql_connector.upsert(
+            'project_user_quotas', rows,
+            keys=('user_id', 'project_id', 'resource', 'deleted'))
 
     def _deploy_project_quotas(self, quotas, tenant_map):
-        insert_cmd = ("INSERT INTO quotas (project_id, resource, "
-                      "hard_limit, deleted) VALUES ('%s', '%s', %s, 0)")
-
-        update_cmd = ("UPDATE quotas SET hard_limit=%s WHERE project_id='%s' "
-                      "AND resource='%s' AND deleted=0")
-
-        for _quota in quotas:
-            quota = _quota['quota']
-            try:
-                self.mysql_connector.execute(insert_cmd % (
-                    tenant_map[quota['project_id']],
-                    quota['resource'],
-                    quota['hard_limit']))
-            except exc.IntegrityError as e:
-                if 'Duplicate entry' in e.message:
-                    self.mysql_connector.execute(update_cmd % (
-                        quota['hard_limit'],
-                        tenant_map[quota['project_id']],
-                        quota['resource'],
-                    ))
-                else:
-                    raise
+        rows = [{'project_id': tenant_map[quota['quota']['project_id']],
+                 'resource': quota['quota']['resource'],
+                 'hard_limit': quota['quota']['hard_limit'],
+                 'deleted': 0} for quota in quotas]
+        self.mysql_connector.upsert(
+            'quotas', rows, keys=('project_id', 'resource', 'deleted'))
 
     def _deploy_keypair(self, keypairs):
         dest_keypairs = [keypair.name for keypair in self.get_keypair_list()]
@@ -384,25 +493,10 @@ class NovaCompute(compute.Compute):
 
     def _deploy_instances(self, info_compute):
         new_ids = {}
-        nova_tenants_clients = {
-            self.config['cloud']['tenant']: self.nova_client}
-
-        params = {'user': self.config['cloud']['user'],
-                  'password': self.config['cloud']['password'],
-                  'tenant': self.config['cloud']['tenant'],
-                  'host': self.config['cloud']['host']}
-
-        for _instance in info_compute['instances'].itervalues():
-            tenant_name = _instance['instance']['tenant_name']
-            if tenant_name not in nova_tenants_clients:
-                params['tenant'] = tenant_name
-                nova_tenants_clients[tenant_name] = self.get_nova_client(
-                    params)
 
         for _instance in info_compute['instances'].itervalues():
             instance = _instance['instance']
             meta = _instance['meta']
-            self.nova_client = nova_tenants_clients[instance['tenant_name']]
             create_params = {'name': instance['name'],
                              'flavor': instance['flavor_id'],
                              'key_name': instance['key_name'],
@@ -420,13 +514,16 @@ class NovaCompute(compute.Compute):
                     "boot_index": 0
                 }]
                 create_params['image'] = None
-            new_id = self.create_instance(**create_params)
+            new_id = self.create_instance(tenant=instance['tenant_name'],
+                                          **create_params)
             new_ids[new_id] = instance['id']
-        self.nova_client = nova_tenants_clients[self.config['cloud']['tenant']]
         return new_ids
 
-    def create_instance(self, **kwargs):
-        return self.nova_client.servers.create(**kwargs).id
+    def create_instance(self, tenant=None, **kwargs):
+        """Create instance in `tenant`, in the tenant of the config if None."""
+        client = self.get_tenant_client(tenant) if tenant else \
+            self.nova_client
+        return client.servers.create(**kwargs).id
 
     def get_instances_list(self, detailed=True, search_opts=None,
                            marker=None,
@@ -442,6 +539,51 @@ class NovaCompute(compute.Compute):
             else:
                 return [self.nova_client.servers.get(ids)]
 
+    def iter_instances(self, search_opts=None, limit=None, workers=None):
+        """Yield servers page by page, `limit` servers per API call.
+
+        Nova may return less than `limit` servers per page (if `limit` is
+        above its osapi_max_limit), so only an empty page ends the list.
+
+        Servers filtered by id are read concurrently by `workers` threads.
+        """
+        if limit is None:
+            limit = self.config.migrate.instances_page_size
+        ids = search_opts.get('id', None) if search_opts else None
+        if ids:
+            if type(ids) is not list:
+                ids = [ids]
+            if workers is None:
+                workers = self.config.migrate.instances_fetch_workers
+            pool = ThreadPool(max(min(workers, len(ids)), 1))
+            try:
+                for instance in pool.imap(self.nova_client.servers.get, ids):
+                    yield instance
+            finally:
+                pool.terminate()
+            return
+        marker = None
+        while True:
+            page = self.get_instances_list(search_opts=search_opts,
+                                           marker=marker,
+                                           limit=limit or None)
+            for instance in page:
+                yield instance
+            if not limit or not page:
+                return
+            marker = page[-1].id
+
+    def resolve_ext_ips(self):
+        """Resolve external IPs of all compute hosts at once."""
+        if not self.config.migrate.direct_compute_transfer:
+            return
+        hosts = [service.host for service in
+                 self.nova_client.services.list(binary='nova-compute')
+                 if service.state == 'up' and service.status == 'enabled']
+        utl.resolve_ext_ips(self.config.cloud.ext_cidr,
+                            self.cloud.getIpSsh(),
+                            hosts)
+
     def get_instance(self, instance_id):
         return self.get_instances_list(search_opts={'id': instance_id})[0]
 
@@ -450,97 +592,111 @@ class NovaCompute(compute.Compute):
             instance = self.nova_client.servers.get(instance_id)
         curr = self.get_status(self.nova_client.servers, instance.id).lower()
         will = status.lower()
-        func_restore = {
-            'start': lambda instance: instance.start(),
-            'stop': lambda instance: instance.stop(),
-            'resume': lambda instance: instance.resume(),
-            'paused': lambda instance: instance.pause(),
-            'unpaused': lambda instance: instance.unpause(),
-            'suspend': lambda instance: instance.suspend(),
-            'status': lambda status: lambda instance: self.wait_for_status(
-                instance_id,
-                status)
-        }
-        map_status = {
-            'paused': {
-                'active': (func_restore['unpaused'],
-                           func_restore['status']('active')),
-                'shutoff': (func_restore['stop'],
-                            func_restore['status']('shutoff')),
-                'suspend': (func_restore['unpaused'],
-                            func_restore['status']('active'),
-                            func_restore['suspend'],
-                            func_restore['status']('suspend'))
-            },
-            'suspend': {
-                'active': (func_restore['resume'],
-                           func_restore['status']('active')),
-                'shutoff': (func_restore['stop'],
-                            func_restore['status']('shutoff')),
-                'paused': (func_restore['resume'],
-                           func_restore['status']('active'),
-                           func_restore['paused'],
-                           func_restore['status']('paused'))
-            },
-            'active': {
-                'paused': (func_restore['paused'],
-                           func_restore['status']('paused')),
-                'suspend': (func_restore['suspend'],
-                            func_restore['status']('suspend')),
-                'shutoff': (func_restore['stop'],
-                            func_restore['status']('shutoff'))
-            },
-            'shutoff': {
-                'active': (func_restore['start'],
-                           func_restore['status']('active')),
-                'paused': (func_restore['start'],
-                           func_restore['status']('active'),
-                           func_restore['paused'],
-                           func_restore['status']('paused')),
-                'suspend': (func_restore['start'],
-                            func_restore['status']('active'),
-                            func_restore['suspend'],
-                            func_restore['status']('suspend'))
-            }
-        }
         if curr != will:
+            since = time.time()
             try:
-                reduce(lambda res, f: f(instance), map_status[curr][will],
-                       None)
+                for action, action_status in STATUS_STEPS[curr][will]:
+                    getattr(instance, action)()
+                    self.wait_for_status(instance.id, action_status,
+                                         since=since)
             except timeout_exception.TimeoutException as e:
                 return e
         else:
             return True
 
-    def wait_for_status(self, id_obj, status, limit_retry=90):
-        count = 0
-        getter = self.nova_client.servers
-        while getter.get(id_obj).status.lower() != status.lower():
-            time.sleep(2)
-            count += 1
-            if count > limit_retry:
-                raise timeout_exception.TimeoutException(
-                    getter.get(id_obj).status.lower(), status, "Timeout exp")
+    def change_statuses(self, status, instance_ids, timeout=180):
+        """Change status of many instances at once.
+
+        Every step of the transition is requested for all instances first,
+        then all of them are waited for together by the status watcher.
+        Instance which failed a step is not changed any more.
+        Returns {instance_id: error} of failed instances.
+        """
+        will = status.lower()
+        errors = {}
+        steps = {}
+        for instance_id in instance_ids:
+            try:
+                instance = self.nova_client.servers.get(instance_id)
+            except Exception as e:
+                errors[instance_id] = e
+                continue
+            curr = instance.status.lower()
+            if curr == will:
+                continue
+            if will not in STATUS_STEPS.get(curr, {}):
+                errors[instance_id] = RuntimeError(
+                    "Can't change status of server %s from %s to %s" %
+                    (instance_id, curr, will))
+                continue
+            steps[instance_id] = (instance, list(STATUS_STEPS[curr][will]))
+        while steps:
+            since = time.time()
+            statuses = {}
+            for instance_id, (instance, left) in steps.items():
+                action, action_status = left.pop(0)
+                try:
+                    getattr(instance, action)()
+                except Exception as e:
+                    errors[instance_id] = e
+                    del steps[instance_id]
+                    continue
+                statuses[instance_id] = action_status
+            errors.update(self.status_watcher.wait_for_all(statuses, timeout,
+                                                           since))
+            steps = {instance_id: step for instance_id, step in
+                     steps.iteritems() if step[1] and
+                     instance_id not in errors}
+        return errors
+
+    def wait_for_status(self, id_obj, status, limit_retry=90, since=None):
+        """Wait for the status of the server by the status watcher.
+
+        Timeout is `limit_retry` polls of 2 seconds. Status changes after
+        `since` are taken into account, without it the current status of
+        the server is checked first.
+        """
+        if since is None:
+            since = time.time()
+            if self.get_status(self.nova_client.servers,
+                               id_obj).lower() == status.lower():
+                return
+        self.status_watcher.wait_for([id_obj], status, limit_retry * 2, since)
+
+    def wait_for_statuses(self, ids, status, timeout=180, since=None):
+        """Wait for the status of all servers, changes after `since` count.
+
+        Raises TimeoutException or RuntimeError of the first failed server.
+        """
+        self.status_watcher.wait_for(ids, status, timeout, since)
 
     def get_flavor_from_id(self, flavor_id):
+        for flavor in self.get_flavor_list():
+            if flavor.id == flavor_id:
+                return flavor
         return self.nova_client.flavors.get(flavor_id)
 
     def get_flavor_list(self, **kwargs):
-        return self.nova_client.flavors.list(**kwargs)
+        if kwargs:
+            return self.nova_client.flavors.list(**kwargs)
+        return self.cache.get('flavors', self.nova_client.flavors.list)
 
     def create_flavor(self, **kwargs):
+        self.cache.invalidate('flavors')
         return self.nova_client.flavors.create(**kwargs)
 
     def delete_flavor(self, flavor_id):
+        self.cache.invalidate('flavors')
         self.nova_client.flavors.delete(flavor_id)
 
     def get_keypair_list(self):
-        return self.nova_client.keypairs.list()
+        return self.cache.get('keypairs', self.nova_client.keypairs.list)
 
     def get_keypair(self, name):
         return self.nova_client.keypairs.get(name)
 
     def create_keypair(self, name, public_key=None):
+        self.cache.invalidate('keypairs')
         return self.nova_client.keypairs.create(name, public_key)
 
     def get_interface_list(self, server_id):
@@ -553,9 +709,10 @@ class NovaCompute(compute.Compute):
     def get_status(self, getter, res_id):
         return getter.get(res_id).status
 
-    def get_networks(self, instance):
+    def get_networks(self, instance, func_mac_address=None):
         networks = []
-        func_mac_address = self.get_func_mac_address(instance)
+        if func_mac_address is None:
+            func_mac_address = self.get_func_mac_address(instance)
         for network in instance.networks.items():
             networks_info = dict(name=network[0],
                                  ip=network[1][0],
@@ -0,0 +1,168 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import datetime
+import os
+import threading
+import time
+
+from cloudferrylib.utils import timeout_exception
+from cloudferrylib.utils import utils as utl
+
+
+LOG = utl.get_log(__name__)
+
+ERROR = 'error'
+
+
+class Waiter(object):
+    def __init__(self, server_id, status, timeout, since):
+        self.server_id = server_id
+        self.status = status.lower()
+        self.deadline = time.time() + timeout
+        self.since = since
+        self.polled = False
+        self.current = None
+        self.error = None
+        self.event = threading.Event()
+
+    def finish(self, error=None):
+        self.error = error
+        self.event.set()
+
+
+class StatusWatcher(object):
+    """Waits for statuses of many servers by one periodic list query.
+
+    Every poll lists servers changed since the previous poll (or since the
+    time given by a new waiter) and wakes waiters whose servers reached
+    their status. Waiter fails when its server goes to error or its
+    timeout expires. Poll interval doubles from `interval` up to
+    `max_interval` while nothing changes. `skew` seconds are added to
+    every changes-since window to cover clock difference with the cloud.
+    Watcher is used by the process which created it, it starts again in
+    a forked process.
+    """
+
+    def __init__(self, client, interval=2, max_interval=30, skew=60):
+        self.client = client
+        self.interval = interval
+        self.max_interval = max_interval
+        self.skew = skew
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.cond = threading.Condition()
+        self.waiters = []
+        self.thread = None
+        self.last_poll = None
+        self.current_interval = self.interval
+
+    def watch(self, server_id, status, timeout=180, since=None):
+        """Start waiting for the status, changes after `since` count."""
+        if self.pid != os.getpid():
+            self.reset()
+        waiter = Waiter(server_id, status, timeout,
+                        since if since is not None else time.time())
+        with self.cond:
+            self.waiters.append(waiter)
+            self.current_interval = self.interval
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.work)
+                self.thread.daemon = True
+                self.thread.start()
+            self.cond.notify()
+        return waiter
+
+    def wait_for(self, server_ids, status, timeout=180, since=None):
+        """Wait until all servers have the status.
+
+        Raises TimeoutException or RuntimeError of the first failed server.
+        """
+        errors = self.wait_for_all(dict.fromkeys(server_ids, status),
+                                   timeout, since)
+        for server_id in server_ids:
+            if server_id in errors:
+                raise errors[server_id]
+
+    def wait_for_all(self, statuses, timeout=180, since=None):
+        """Wait until every server of {server_id: status} has its status.
+
+        Returns {server_id: error} of failed servers.
+        """
+        waiters = [self.watch(server_id, status, timeout, since)
+                   for server_id, status in statuses.iteritems()]
+        for waiter in waiters:
+            while not waiter.event.wait(self.max_interval):
+                pass
+        return {waiter.server_id: waiter.error
+                for waiter in waiters if waiter.error}
+
+    def work(self):
+        while True:
+            with self.cond:
+                while not self.waiters:
+                    self.cond.wait()
+                waiters = list(self.waiters)
+            since = min([w.since for w in waiters if not w.polled] +
+                        [self.last_poll or time.time()])
+            started = time.time()
+            try:
+                servers = self.list_changed(since - self.skew)
+            except Exception as e:
+                LOG.warning("Polling of servers status failed: %s", e)
+                servers = []
+            finished = self.update(waiters, servers, started)
+            with self.cond:
+                self.last_poll = started
+                if finished:
+                    self.current_interval = self.interval
+                else:
+                    self.current_interval = min(self.current_interval * 2,
+                                                self.max_interval)
+                if self.waiters:
+                    nearest = min(w.deadline for w in self.waiters)
+                    self.cond.wait(max(min(self.current_interval,
+                                           nearest - time.time()), 0.1))
+
+    def list_changed(self, since):
+        changes_since = datetime.datetime.utcfromtimestamp(since).strftime(
+            '%Y-%m-%dT%H:%M:%SZ')
+        return self.client.servers.list(
+            search_opts={'changes-since': changes_since, 'all_tenants': 1})
+
+    def update(self, waiters, servers, now):
+        statuses = {server.id: server.status.lower() for server in servers}
+        finished = []
+        for waiter in waiters:
+            waiter.polled = True
+            waiter.current = statuses.get(waiter.server_id, waiter.current)
+            if waiter.current == waiter.status:
+                waiter.finish()
+            elif waiter.current == ERROR:
+                waiter.finish(RuntimeError("Server %s went to error status "
+                                           "while waiting for %s" %
+                                           (waiter.server_id, waiter.status)))
+            elif now > waiter.deadline:
+                waiter.finish(timeout_exception.TimeoutException(
+                    waiter.current, waiter.status, "Timeout exp"))
+            else:
+                continue
+            finished.append(waiter)
+        with self.cond:
+            for waiter in finished:
+                self.waiters.remove(waiter)
+        return finished
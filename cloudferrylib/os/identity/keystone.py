@@ -19,6 +19,7 @@ from cloudferrylib.base import identity
 from cloudferrylib.utils import GeneratorPassword
 from cloudferrylib.utils import Postman
 from cloudferrylib.utils import Templater
+from cloudferrylib.utils import list_cache
 from cloudferrylib.utils import utils as utl
 
 
@@ -33,6 +34,7 @@ class KeystoneIdentity(identity.Identity):
     def __init__(self, config, cloud):
         super(KeystoneIdentity, self).__init__()
         self.config = config
+        self.cache = list_cache.ListCache(config.migrate.cache_ttl)
         self.keystone_client = self.proxy(self.get_client(), config)
         self.mysql_connector = cloud.mysql_connector
         self.cloud = cloud
@@ -139,7 +141,8 @@ class KeystoneIdentity(identity.Identity):
     def get_public_endpoint_service_by_id(self, service_id):
         """Getting endpoint public URL from keystone. """
 
-        for endpoint in self.keystone_client.endpoints.list():
+        for endpoint in self.cache.get('endpoints',
+                                       self.keystone_client.endpoints.list):
             if endpoint.service_id == service_id:
                 return endpoint.publicurl
 
@@ -186,7 +189,7 @@ class KeystoneIdentity(identity.Identity):
     def get_services_list(self):
         """ Getting list of available services from keystone. """
 
-        return self.keystone_client.services.list()
+        return self.cache.get('services', self.keystone_client.services.list)
 
     def get_tenants_list(self):
         """ Getting list of tenants from keystone. """
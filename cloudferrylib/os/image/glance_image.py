@@ -24,6 +24,7 @@ from glanceclient.v1 import client as glance_client
 
 from cloudferrylib.base import image
 from cloudferrylib.utils import file_like_proxy
+from cloudferrylib.utils import list_cache
 from cloudferrylib.utils import utils as utl
 
 
@@ -41,6 +42,7 @@ class GlanceImage(image.Image):
         self.host = config.cloud.host
         self.cloud = cloud
         self.identity_client = cloud.resources['identity']
+        self.cache = list_cache.ListCache(config.migrate.cache_ttl)
         self.glance_client = self.proxy(self.get_client(), config)
         super(GlanceImage, self).__init__(config)
 
@@ -55,19 +57,29 @@ class GlanceImage(image.Image):
             token=self.identity_client.get_auth_token_from_user())
 
     def get_image_list(self):
-        return self.glance_client.images.list()
+        return self.cache.get('images', self.glance_client.images.list)
 
     def create_image(self, **kwargs):
+        self.cache.invalidate('images')
         return self.glance_client.images.create(**kwargs)
 
     def delete_image(self, image_id):
+        self.cache.invalidate('images')
         self.glance_client.images.delete(image_id)
 
-    def get_image_by_id(self, image_id):
+    def find_image(self, match):
         for glance_image in self.get_image_list():
-            if glance_image.id == image_id:
+            if match(glance_image):
+                return glance_image
+        # image may be created not by this resource after list was cached
+        self.cache.invalidate('images')
+        for glance_image in self.get_image_list():
+            if match(glance_image):
                 return glance_image
 
+    def get_image_by_id(self, image_id):
+        return self.find_image(lambda image: image.id == image_id)
+
     def get_image_by_name(self, image_name):
         for glance_image in self.get_image_list():
             if glance_image.name == image_name:
@@ -83,18 +95,23 @@ class GlanceImage(image.Image):
     def get_image(self, im):
         """ Get image by id or name. """
 
-        for glance_image in self.get_image_list():
-            if im in (glance_image.name, glance_image.id):
+        return self.find_image(
+            lambda glance_image: im in (glance_image.name, glance_image.id))
+
+    def get_fresh_image(self, image_id):
+        """Image by id, not from the cached list, for changing fields."""
+        for glance_image in self.glance_client.images.list():
+            if glance_image.id == image_id:
                 return glance_image
 
     def get_image_status(self, image_id):
-        return self.get_image_by_id(image_id).status
+        return self.get_fresh_image(image_id).status
 
     def get_ref_image(self, image_id):
         return self.glance_client.images.data(image_id)._resp
 
     def get_image_checksum(self, image_id):
-        return self.get_image_by_id(image_id).checksum
+        return self.get_fresh_image(image_id).checksum
 
     @staticmethod
     def convert(glance_image, cloud):
@@ -13,17 +13,26 @@
 # limitations under the License.
 
 
+import collections
+
 import ipaddr
 
 from neutronclient.common.exceptions import IpAddressGenerationFailureClient
+from neutronclient.common.exceptions import IpAddressInUseClient
+from neutronclient.common.exceptions import NeutronClientException
 from neutronclient.v2_0 import client as neutron_client
 
 from cloudferrylib.base import network
+from cloudferrylib.os.network import neutron_snapshot
+from cloudferrylib.os.network import port_index
+from cloudferrylib.os.network import resource_index
 from cloudferrylib.utils import utils as utl
 
 
 LOG = utl.get_log(__name__)
 DEFAULT_SECGR = 'default'
+# floating IPs allocated at once when looking for given addresses
+FLOATINGIP_BATCH_SIZE = 32
 
 
 class NeutronNetwork(network.Network):
@@ -37,55 +46,68 @@ class NeutronNetwork(network.Network):
         self.cloud = cloud
         self.identity_client = cloud.resources['identity']
         # TODO: implement switch to quantumclient if we have quantum-server
-        self.neutron_client = self.proxy(self.get_client(), config)
-
-    def get_client(self):
+        client = self.get_client()
+        self.neutron_client = self.proxy(client, config)
+        # requests which must not be repeated: a rejected one fails again,
+        # a failed in transport one may have been done
+        self.neutron_client_once = self.proxy(client, config, retry=0)
+        self.port_index = port_index.PortIndex(self.get_list_ports,
+                                               config.migrate.cache_ttl)
+        self.floatingip_address_supported = True
+
+    def get_client(self, params=None):
+        params = self.config if not params else params
         return neutron_client.Client(
-            username=self.config['cloud']["user"],
-            password=self.config['cloud']["password"],
-            tenant_name=self.config['cloud']["tenant"],
-            auth_url="http://" + self.config['cloud']["host"] + ":35357/v2.0/")
+            username=params['cloud']["user"],
+            password=params['cloud']["password"],
+            tenant_name=params['cloud']["tenant"],
+            auth_url="http://" + params['cloud']["host"] + ":35357/v2.0/")
 
     def read_info(self, **kwargs):
 
         """Get info about neutron resources:
         :rtype: Dictionary with all necessary neutron info
         """
-        info = {'networks': self.get_networks(),
-                'subnets': self.get_subnets(),
-                'routers': self.get_routers(),
-                'floating_ips': self.get_floatingips(),
-                'security_groups': self.get_sec_gr_and_rules(),
+        snapshot = neutron_snapshot.NeutronSnapshot(self.neutron_client)
+        info = {'networks': self.get_networks(snapshot),
+                'subnets': self.get_subnets(snapshot),
+                'routers': self.get_routers(snapshot),
+                'floating_ips': self.get_floatingips(snapshot),
+                'security_groups': self.get_sec_gr_and_rules(snapshot),
                 'meta': {}}
         return info
 
     def deploy(self, info):
         deploy_info = info
-        self.upload_networks(deploy_info['networks'])
-        self.upload_subnets(deploy_info['networks'],
-                            deploy_info['subnets'])
-        self.upload_routers(deploy_info['networks'],
-                            deploy_info['subnets'],
-                            deploy_info['routers'])
+        existing = resource_index.ExistingResources(self)
+        networks = resource_index.ResourceIndex(deploy_info['networks'])
+        subnets = resource_index.ResourceIndex(deploy_info['subnets'])
+        self.upload_networks(networks, existing)
+        self.upload_subnets(networks, subnets, existing)
+        self.upload_routers(networks, subnets, deploy_info['routers'],
+                            existing)
         if self.config.migrate.keep_floatingip:
-            self.upload_floatingips(deploy_info['networks'],
-                                    deploy_info['floating_ips'])
-        self.upload_neutron_security_groups(deploy_info['security_groups'])
-        self.upload_sec_group_rules(deploy_info['security_groups'])
+            self.upload_floatingips(networks, deploy_info['floating_ips'],
+                                    existing)
+        self.upload_neutron_security_groups(deploy_info['security_groups'],
+                                            existing)
+        self.upload_sec_group_rules(deploy_info['security_groups'], existing)
 
     def get_func_mac_address(self, instance):
         return self.get_mac_by_ip
 
     def get_mac_by_ip(self, ip_address):
-        for port in self.get_list_ports():
-            for fixed_ip_info in port['fixed_ips']:
-                if fixed_ip_info['ip_address'] == ip_address:
-                    return port["mac_address"]
+        return self.port_index.get_mac(ip_address)
+
+    def get_macs_by_ip(self):
+        """MAC of the first port with every IP, by a single list call."""
+        return self.port_index.get_macs()
 
     def get_list_ports(self, **kwargs):
         return self.neutron_client.list_ports(**kwargs)['ports']
 
-    def create_port(self, net_id, mac, ip, tenant_id, keep_ip, sg_ids=None):
+    @staticmethod
+    def get_port_body(net_id, mac, ip, tenant_id, keep_ip, sg_ids=None):
         param_create_port = {'network_id': net_id,
                              'mac_address': mac,
                              'tenant_id': tenant_id}
@@ -93,11 +115,99 @@ class NeutronNetwork(network.Network):
             param_create_port['security_groups'] = sg_ids
         if keep_ip:
             param_create_port['fixed_ips'] = [{"ip_address": ip}]
-        return self.neutron_client.create_port({
+        return param_create_port
+
+    def create_port(self, net_id, mac, ip, tenant_id, keep_ip, sg_ids=None):
+        param_create_port = self.get_port_body(net_id, mac, ip, tenant_id,
+                                               keep_ip, sg_ids)
+        port = self.neutron_client.create_port({
             'port': param_create_port})['port']
+        self.port_index.add(port)
+        return port
+
+    def create_ports(self, ports):
+        """Create ports by dicts of arguments of create_port in bulk.
+
+        If any port fails, ports already created are deleted.
+        """
+        created = self.bulk_create('port', [self.get_port_body(**port)
+                                            for port in ports],
+                                   rollback=True)
+        for port in created:
+            self.port_index.add(port)
+        return created
+
+    def bulk_create(self, resource, bodies, rollback=False):
+        """Create objects of `resource` type ('port', 'security_group'...).
+
+        Bodies of a tenant are sent by bulk requests of
+        migrate.neutron_bulk_size objects. Bulk request creates all its
+        objects or none of them, so objects of a request rejected by neutron
+        (4xx) are created one by one. Any other error of a bulk request is
+        raised at once, since its objects may have been created. Returns
+        created objects in the order of `bodies`; when every object is
+        tried, error of the first failed one is raised, after objects
+        already created are deleted if `rollback` is set.
+        """
+        plural = resource + 's'
+        batch_size = max(self.config.migrate.neutron_bulk_size, 1)
+        results = [None] * len(bodies)
+        errors = []
+        tenants = collections.OrderedDict()
+        for i, body in enumerate(bodies):
+            tenants.setdefault(body.get('tenant_id'), []).append(i)
+        batches = [indexes[start:start + batch_size]
+                   for indexes in tenants.itervalues()
+                   for start in xrange(0, len(indexes), batch_size)]
+        try:
+            for batch in batches:
+                if len(batch) > 1:
+                    try:
+                        # failed request is retried by objects
+                        created = getattr(self.neutron_client_once,
+                                          'create_' + resource)(
+                            {plural: [bodies[i] for i in batch]})[plural]
+                    except NeutronClientException as e:
+                        if not 400 <= e.status_code < 500:
+                            raise
+                        LOG.warning("| Bulk create of %d %s failed, they "
+                                    "are created one by one: %s",
+                                    len(batch), plural, e)
+                    else:
+                        for i, obj in zip(batch, created):
+                            results[i] = obj
+                        continue
+                for i in batch:
+                    try:
+                        results[i] = getattr(self.neutron_client,
+                                             'create_' + resource)(
+                            {resource: bodies[i]})[resource]
+                    except Exception as e:
+                        LOG.error("| Create of %s %s failed: %s",
+                                  resource, bodies[i], e)
+                        errors.append(e)
+        except Exception as e:
+            LOG.error("| Bulk create of %s failed: %s", plural, e)
+            errors.insert(0, e)
+        if errors:
+            if rollback:
+                self.bulk_delete(resource, [obj for obj in results if obj])
+            raise errors[0]
+        return results
+
+    def bulk_delete(self, resource, objs):
+        """Delete created objects of `resource` type, errors are logged."""
+        for obj in objs:
+            try:
+                getattr(self.neutron_client, 'delete_' + resource)(obj['id'])
+            except Exception as e:
+                LOG.error("| Delete of %s %s failed: %s",
+                          resource, obj['id'], e)
 
     def delete_port(self, port_id):
-        return self.neutron_client.delete_port(port_id)
+        result = self.neutron_client.delete_port(port_id)
+        self.port_index.remove(port_id)
+        return result
 
     def get_security_groups_list(self, **kwargs):
         return self.neutron_client.\
@@ -121,15 +231,10 @@ class NeutronNetwork(network.Network):
             raise Exception("Can't find suitable network")
 
     def check_existing_port(self, network_id, mac):
-        for port in self.get_list_ports(fields=['network_id',
-                                                'mac_address', 'id']):
-            if (port['network_id'] == network_id) \
-                    and (port['mac_address'] == mac):
-                return port['id']
-        return None
+        return self.port_index.get_port_id(network_id, mac)
 
     @staticmethod
-    def convert(neutron_object, cloud, obj_name):
+    def convert(neutron_object, cloud, obj_name, snapshot=None):
         """Convert OpenStack Neutron network object to CloudFerry object.
 
         :param neutron_object: Direct OS NeutronNetwork object to convert,
@@ -138,6 +243,8 @@ class NeutronNetwork(network.Network):
                                List of possible values:
                                'network', 'subnet', 'router', 'floating_ip',
                                'security_group', 'rule'.
+        :snapshot:             NeutronSnapshot related objects are looked up
+                               in, a new one if it isn't given.
         """
 
         obj_map = {
@@ -149,18 +256,21 @@ class NeutronNetwork(network.Network):
             'rule': NeutronNetwork.convert_rules,
         }
 
-        return obj_map[obj_name](neutron_object, cloud)
+        if snapshot is None:
+            snapshot = neutron_snapshot.NeutronSnapshot(
+                cloud.resources[utl.NETWORK_RESOURCE].neutron_client)
+
+        return obj_map[obj_name](neutron_object, cloud, snapshot)
 
     @staticmethod
-    def convert_networks(net, cloud):
+    def convert_networks(net, cloud, snapshot):
         identity_res = cloud.resources[utl.IDENTITY_RESOURCE]
         net_res = cloud.resources[utl.NETWORK_RESOURCE]
         get_tenant_name = identity_res.get_tenants_func()
 
         subnet_names = []
         for subnet in net['subnets']:
-            name = net_res.neutron_client.show_subnet(subnet)['subnet']['name']
-            subnet_names.append(name)
+            subnet_names.append(snapshot.get_subnet(subnet)['name'])
 
         result = {
             'name': net['name'],
@@ -186,12 +296,12 @@ class NeutronNetwork(network.Network):
         return result
 
     @staticmethod
-    def convert_subnets(snet, cloud):
+    def convert_subnets(snet, cloud, snapshot):
         identity_res = cloud.resources[utl.IDENTITY_RESOURCE]
         network_res = cloud.resources[utl.NETWORK_RESOURCE]
         get_tenant_name = identity_res.get_tenants_func()
 
-        net = network_res.neutron_client.show_network(snet['network_id'])
+        net = snapshot.get_network(snet['network_id'])
 
         result = {
             'name': snet['name'],
@@ -201,7 +311,7 @@ class NeutronNetwork(network.Network):
             'gateway_ip': snet['gateway_ip'],
             'ip_version': snet['ip_version'],
             'cidr': snet['cidr'],
-            'network_name': net['network']['name'],
+            'network_name': net['name'],
             'network_id': snet['network_id'],
             'tenant_name': get_tenant_name(snet['tenant_id']),
             'meta': {},
@@ -220,7 +330,7 @@ class NeutronNetwork(network.Network):
         return result
 
     @staticmethod
-    def convert_routers(router, cloud):
+    def convert_routers(router, cloud, snapshot):
         identity_res = cloud.resources[utl.IDENTITY_RESOURCE]
         net_res = cloud.resources[utl.NETWORK_RESOURCE]
 
@@ -229,12 +339,11 @@ class NeutronNetwork(network.Network):
         ips = []
         subnet_ids = []
 
-        for port in net_res.neutron_client.list_ports()['ports']:
-            if port['device_id'] == router['id']:
-                for ip_info in port['fixed_ips']:
-                    ips.append(ip_info['ip_address'])
-                    if ip_info['subnet_id'] not in subnet_ids:
-                        subnet_ids.append(ip_info['subnet_id'])
+        for port in snapshot.get_device_ports(router['id']):
+            for ip_info in port['fixed_ips']:
+                ips.append(ip_info['ip_address'])
+                if ip_info['subnet_id'] not in subnet_ids:
+                    subnet_ids.append(ip_info['subnet_id'])
 
         result = {
             'name': router['name'],
@@ -250,7 +359,7 @@ class NeutronNetwork(network.Network):
 
         if router['external_gateway_info']:
             ext_id = router['external_gateway_info']['network_id']
-            ext_net = net_res.neutron_client.show_network(ext_id)['network']
+            ext_net = snapshot.get_network(ext_id)
 
             result['ext_net_name'] = ext_net['name']
             result['ext_net_tenant_name'] = get_tenant_name(
@@ -269,14 +378,13 @@ class NeutronNetwork(network.Network):
         return result
 
     @staticmethod
-    def convert_floatingips(floating, cloud):
+    def convert_floatingips(floating, cloud, snapshot):
         identity_res = cloud.resources[utl.IDENTITY_RESOURCE]
-        net_res = cloud.resources[utl.NETWORK_RESOURCE]
 
         get_tenant_name = identity_res.get_tenants_func()
 
         ext_id = floating['floating_network_id']
-        extnet = net_res.neutron_client.show_network(ext_id)['network']
+        extnet = snapshot.get_network(ext_id)
 
         result = {
             'id': floating['id'],
@@ -293,7 +401,7 @@ class NeutronNetwork(network.Network):
         return result
 
     @staticmethod
-    def convert_rules(rule, cloud):
+    def convert_rules(rule, cloud, snapshot=None):
         net_res = cloud.resources[utl.NETWORK_RESOURCE]
 
         rule_hash = net_res.get_resource_hash(rule,
@@ -320,7 +428,7 @@ class NeutronNetwork(network.Network):
         return result
 
     @staticmethod
-    def convert_security_groups(sec_gr, cloud):
+    def convert_security_groups(sec_gr, cloud, snapshot):
         identity_res = cloud.resources[utl.IDENTITY_RESOURCE]
         net_res = cloud.resources[utl.NETWORK_RESOURCE]
 
@@ -328,7 +436,8 @@ class NeutronNetwork(network.Network):
 
         security_group_rules = []
         for rule in sec_gr['security_group_rules']:
-            rule_info = NeutronNetwork.convert(rule, cloud, 'rule')
+            rule_info = NeutronNetwork.convert(rule, cloud, 'rule',
+                                               snapshot)
             security_group_rules.append(rule_info)
 
         result = {
@@ -350,42 +459,48 @@ class NeutronNetwork(network.Network):
 
         return result
 
-    def get_networks(self):
-        networks = self.neutron_client.list_networks()['networks']
+    def get_snapshot(self, snapshot=None):
+        if snapshot is None:
+            snapshot = neutron_snapshot.NeutronSnapshot(self.neutron_client)
+        return snapshot
+
+    def get_networks(self, snapshot=None):
+        snapshot = self.get_snapshot(snapshot)
         networks_info = []
 
-        for net in networks:
-            cf_net = self.convert(net, self.cloud, 'network')
+        for net in snapshot.get_list('networks'):
+            cf_net = self.convert(net, self.cloud, 'network', snapshot)
             networks_info.append(cf_net)
 
         return networks_info
 
-    def get_subnets(self):
-        subnets = self.neutron_client.list_subnets()['subnets']
+    def get_subnets(self, snapshot=None):
+        snapshot = self.get_snapshot(snapshot)
         subnets_info = []
 
-        for snet in subnets:
-            subnet = self.convert(snet, self.cloud, 'subnet')
+        for snet in snapshot.get_list('subnets'):
+            subnet = self.convert(snet, self.cloud, 'subnet', snapshot)
             subnets_info.append(subnet)
 
         return subnets_info
 
-    def get_routers(self):
-        routers = self.neutron_client.list_routers()['routers']
+    def get_routers(self, snapshot=None):
+        snapshot = self.get_snapshot(snapshot)
         routers_info = []
 
-        for router in routers:
-            rinfo = self.convert(router, self.cloud, 'router')
+        for router in snapshot.get_list('routers'):
+            rinfo = self.convert(router, self.cloud, 'router', snapshot)
             routers_info.append(rinfo)
 
         return routers_info
 
-    def get_floatingips(self):
-        floatings = self.neutron_client.list_floatingips()['floatingips']
+    def get_floatingips(self, snapshot=None):
+        snapshot = self.get_snapshot(snapshot)
         floatingips_info = []
 
-        for floating in floatings:
-            floatingip_info = self.convert(floating, self.cloud, 'floating_ip')
+        for floating in snapshot.get_list('floatingips'):
+            floatingip_info = self.convert(floating, self.cloud,
+                                           'floating_ip', snapshot)
             floatingips_info.append(floatingip_info)
 
         return floatingips_info
@@ -394,74 +509,86 @@ class NeutronNetwork(network.Network):
         sec_grs = self.neutron_client.list_security_groups()['security_groups']
         return sec_grs
 
-    def get_sec_gr_and_rules(self):
-        sec_grs = self.get_security_groups()
+    def get_sec_gr_and_rules(self, snapshot=None):
+        snapshot = self.get_snapshot(snapshot)
         sec_groups_info = []
 
-        for sec_gr in sec_grs:
-            sec_gr_info = self.convert(sec_gr, self.cloud, 'security_group')
+        for sec_gr in snapshot.get_list('security_groups'):
+            sec_gr_info = self.convert(sec_gr, self.cloud, 'security_group',
+                                       snapshot)
             sec_groups_info.append(sec_gr_info)
 
         return sec_groups_info
 
-    def upload_neutron_security_groups(self, sec_groups):
-        exist_secgrs = self.get_sec_gr_and_rules()
-        exis_secgrs_hashlist = [ex_sg['res_hash'] for ex_sg in exist_secgrs]
+    def get_existing(self, existing=None):
+        if existing is None:
+            existing = resource_index.ExistingResources(self)
+        return existing
+
+    def upload_neutron_security_groups(self, sec_groups, existing=None):
+        exist_secgrs = self.get_existing(existing).get('security_groups')
+        missing = exist_secgrs.missing(sec_groups)
+        new_groups = []
         for sec_group in sec_groups:
             if sec_group['name'] != DEFAULT_SECGR:
-                if sec_group['res_hash'] not in exis_secgrs_hashlist:
+                if sec_group['res_hash'] in missing:
+                    missing.remove(sec_group['res_hash'])
                     tenant_id = \
                         self.identity_client.get_tenant_id_by_name(
                             sec_group['tenant_name']
                         )
-                    sg_info = \
-                        {
-                            'security_group':
-                            {
-                                'name': sec_group['name'],
-                                'tenant_id': tenant_id,
-                                'description': sec_group['description']
-                            }
-                        }
-                    sec_group['meta']['id'] = self.neutron_client.\
-                        create_security_group(sg_info)['security_group']['id']
-
-    def upload_sec_group_rules(self, sec_groups):
-        ex_secgrs = self.get_sec_gr_and_rules()
+                    new_groups.append((sec_group, {
+                        'name': sec_group['name'],
+                        'tenant_id': tenant_id,
+                        'description': sec_group['description']
+                    }))
+        created = self.bulk_create('security_group',
+                                   [body for _, body in new_groups])
+        for (sec_group, sg_info), new_group in zip(new_groups, created):
+            sec_group['meta']['id'] = new_group['id']
+            exist_secgrs.add(dict(sec_group,
+                                  id=new_group['id'],
+                                  tenant_id=sg_info['tenant_id'],
+                                  security_group_rules=[],
+                                  meta={}))
+
+    def upload_sec_group_rules(self, sec_groups, existing=None):
+        ex_secgrs = self.get_existing(existing).get('security_groups')
+        src_secgrs = resource_index.as_index(sec_groups)
+        new_rules = []
         for sec_gr in sec_groups:
-            ex_secgr = \
-                self.get_res_by_hash(ex_secgrs, sec_gr['res_hash'])
+            ex_secgr = ex_secgrs.get_by_hash(sec_gr['res_hash'])
             exrules_hlist = \
-                [r['rule_hash'] for r in ex_secgr['security_group_rules']]
+                set(r['rule_hash'] for r in ex_secgr['security_group_rules'])
             for rule in sec_gr['security_group_rules']:
                 if rule['protocol'] \
                         and (rule['rule_hash'] not in exrules_hlist):
-                    rinfo = \
-                        {'security_group_rule': {
-                            'direction': rule['direction'],
-                            'protocol': rule['protocol'],
-                            'port_range_min': rule['port_range_min'],
-                            'port_range_max': rule['port_range_min'],
-                            'ethertype': rule['ethertype'],
-                            'remote_ip_prefix': rule['remote_ip_prefix'],
-                            'security_group_id': ex_secgr['id'],
-                            'tenant_id': ex_secgr['tenant_id']}}
+                    rinfo = {
+                        'direction': rule['direction'],
+                        'protocol': rule['protocol'],
+                        'port_range_min': rule['port_range_min'],
+                        'port_range_max': rule['port_range_min'],
+                        'ethertype': rule['ethertype'],
+                        'remote_ip_prefix': rule['remote_ip_prefix'],
+                        'security_group_id': ex_secgr['id'],
+                        'tenant_id': ex_secgr['tenant_id']}
                     if rule['remote_group_id']:
-                        remote_sghash = \
-                            self.get_res_hash_by_id(sec_groups,
-                                                    rule['remote_group_id'])
-                        rem_ex_sec_gr = \
-                            self.get_res_by_hash(ex_secgrs,
-                                                 remote_sghash)
-                        rinfo['security_group_rule']['remote_group_id'] = \
-                            rem_ex_sec_gr['id']
-                    new_rule = \
-                        self.neutron_client.create_security_group_rule(rinfo)
-                    rule['meta']['id'] = new_rule['security_group_rule']['id']
-
-    def upload_networks(self, networks):
-        existing_nets_hashlist = \
-            [ex_net['res_hash'] for ex_net in self.get_networks()]
+                        remote_sghash = src_secgrs.get_hash_by_id(
+                            rule['remote_group_id'])
+                        rem_ex_sec_gr = ex_secgrs.get_by_hash(remote_sghash)
+                        rinfo['remote_group_id'] = rem_ex_sec_gr['id']
+                    new_rules.append((rule, rinfo))
+                    exrules_hlist.add(rule['rule_hash'])
+        created = self.bulk_create('security_group_rule',
+                                   [body for _, body in new_rules])
+        for (rule, _), new_rule in zip(new_rules, created):
+            rule['meta']['id'] = new_rule['id']
+
+    def upload_networks(self, networks, existing=None):
+        existing_nets = self.get_existing(existing).get('networks')
+        # networks equal by hash are different networks of the source, so
+        # only networks of the destination before the deploy match them
+        missing = existing_nets.missing(networks)
         for net in networks:
             tenant_id = \
                 self.identity_client.get_tenant_id_by_name(net['tenant_name'])
@@ -484,25 +611,34 @@ class NeutronNetwork(network.Network):
                 if net['provider:network_type'] == 'vlan':
                     network_info['network']['provider:segmentation_id'] = \
                         net['provider:segmentation_id']
-            if net['res_hash'] not in existing_nets_hashlist:
+            if net['res_hash'] in missing:
                 net['meta']['id'] = self.neutron_client.\
                     create_network(network_info)['network']['id']
+                existing_nets.add(dict(net, id=net['meta']['id'], meta={}))
             else:
                 LOG.info("| Dst cloud already has the same network "
                          "with name %s in tenant %s" %
                          (net['name'], net['tenant_name']))
 
-    def upload_subnets(self, networks, subnets):
-        existing_nets = self.get_networks()
-        existing_subnets_hashlist = \
-            [ex_snet['res_hash'] for ex_snet in self.get_subnets()]
+    def upload_subnets(self, networks, subnets, existing=None):
+        existing = self.get_existing(existing)
+        existing_nets = existing.get('networks')
+        existing_subnets = existing.get('subnets')
+        networks = resource_index.as_index(networks)
+        # hash of a subnet doesn't cover its network, so subnets are
+        # matched by the network of the destination as well
+        existing_keys = set((s.get('network_id'), s['res_hash'])
+                            for s in existing_subnets)
         for snet in subnets:
             tenant_id = \
                 self.identity_client.get_tenant_id_by_name(snet['tenant_name'])
-            net_hash = \
-                self.get_res_hash_by_id(networks, snet['network_id'])
-            network_id = \
-                self.get_res_by_hash(existing_nets, net_hash)['id']
+            net = networks.by_id.get(snet['network_id'])
+            if net and net['meta'].get('id'):
+                # created by this deploy
+                network_id = net['meta']['id']
+            else:
+                net_hash = networks.get_hash_by_id(snet['network_id'])
+                network_id = existing_nets.get_by_hash(net_hash)['id']
             subnet_info = {
                 'subnet':
                 {
@@ -516,20 +652,25 @@ class NeutronNetwork(network.Network):
                     'tenant_id': tenant_id
                 }
             }
-            if snet['res_hash'] not in existing_subnets_hashlist:
+            key = (network_id, snet['res_hash'])
+            if key not in existing_keys:
+                existing_keys.add(key)
                 snet['meta']['id'] = self.neutron_client.\
                     create_subnet(subnet_info)['subnet']['id']
+                existing_subnets.add(dict(snet, id=snet['meta']['id'],
+                                          network_id=network_id, meta={}))
             else:
                 LOG.info("| Dst cloud already has the same subnetwork "
                          "with name %s in tenant %s" %
                          (snet['name'], snet['tenant_name']))
 
-    def upload_routers(self, networks, subnets, routers):
-        existing_nets = self.get_networks()
-        existing_subnets = self.get_subnets()
-        existing_routers = self.get_routers()
-        existing_routers_hashlist = \
-            [ex_router['res_hash'] for ex_router in existing_routers]
+    def upload_routers(self, networks, subnets, routers, existing=None):
+        existing = self.get_existing(existing)
+        existing_nets = existing.get('networks')
+        existing_subnets = existing.get('subnets')
+        existing_routers = existing.get('routers')
+        networks = resource_index.as_index(networks)
+        subnets = resource_index.as_index(subnets)
         for router in routers:
             tname = router['tenant_name']
             tenant_id = \
@@ -537,13 +678,14 @@ class NeutronNetwork(network.Network):
             r_info = {'router': {'name': router['name'],
                                  'tenant_id': tenant_id}}
             if router['external_gateway_info']:
-                ex_net_hash = \
-                    self.get_res_hash_by_id(networks, router['ext_net_id'])
-                ex_net_id = \
-                    self.get_res_by_hash(existing_nets, ex_net_hash)['id']
+                ex_net_hash = networks.get_hash_by_id(router['ext_net_id'])
+                ex_net_id = existing_nets.get_by_hash(ex_net_hash)['id']
                 r_info['router']['external_gateway_info'] = \
                     dict(network_id=ex_net_id)
-            if router['res_hash'] not in existing_routers_hashlist:
+            existing_router = existing_routers.get_by_hash(router['res_hash'])
+            if (existing_router is None or
+                    not set(router['ips']).intersection(
+                        existing_router['ips'])):
                 new_router = \
                     self.neutron_client.create_router(r_info)['router']
                 router['meta']['id'] = new_router['id']
@@ -551,28 +693,20 @@ class NeutronNetwork(network.Network):
                                            new_router,
                                            subnets,
                                            existing_subnets)
+                existing_routers.add(dict(router, id=new_router['id'],
+                                          ips=[], meta={}))
             else:
-                existing_router = self.get_res_by_hash(existing_routers,
-                                                       router['res_hash'])
-                if not set(router['ips']).intersection(existing_router['ips']):
-                    new_router = \
-                        self.neutron_client.create_router(r_info)['router']
-                    router['meta']['id'] = new_router['id']
-                    self.add_router_interfaces(router,
-                                               new_router,
-                                               subnets,
-                                               existing_subnets)
-                else:
-                    LOG.info("| Dst cloud already has the same router "
-                             "with name %s in tenant %s" %
-                             (router['name'], router['tenant_name']))
+                LOG.info("| Dst cloud already has the same router "
+                         "with name %s in tenant %s" %
+                         (router['name'], router['tenant_name']))
 
     def add_router_interfaces(self, src_router, dst_router,
                               src_snets, dst_sets):
+        src_snets = resource_index.as_index(src_snets)
+        dst_sets = resource_index.as_index(dst_sets)
         for snet_id in src_router['subnet_ids']:
-            snet_hash = self.get_res_hash_by_id(src_snets, snet_id)
-            ex_snet = self.get_res_by_hash(dst_sets,
-                                           snet_hash)
+            snet_hash = src_snets.get_hash_by_id(snet_id)
+            ex_snet = dst_sets.get_by_hash(snet_hash)
             if dst_router['external_gateway_info']:
                 if ex_snet['network_id'] == \
                         dst_router['external_gateway_info']['network_id']:
@@ -581,70 +715,134 @@ class NeutronNetwork(network.Network):
                 dst_router['id'],
                 {"subnet_id": ex_snet['id']})
 
-    def upload_floatingips(self, networks, src_floats):
-        existing_nets = self.get_networks()
-        ext_nets_ids = []
-        # getting list of external networks with allocated floating ips
-        for src_float in src_floats:
-            ext_net_hash = \
-                self.get_res_hash_by_id(networks,
-                                        src_float['floating_network_id'])
-            ext_net_id = \
-                self.get_res_by_hash(existing_nets, ext_net_hash)['id']
-            if ext_net_id not in ext_nets_ids:
-                ext_nets_ids.append(ext_net_id)
-                self.allocate_floatingips(ext_net_id)
-        existing_floatingips = self.get_floatingips()
-        self.recreate_floatingips(src_floats, networks,
-                                  existing_nets, existing_floatingips)
-        self.delete_redundant_floatingips(src_floats, existing_floatingips)
-
-    def allocate_floatingips(self, ext_net_id):
-        try:
-            while True:
-                self.neutron_client.create_floatingip({
-                    'floatingip': {'floating_network_id': ext_net_id}})
-        except IpAddressGenerationFailureClient:
-            LOG.info("| Floating IPs "
-                     "were allocated in network %s" % ext_net_id)
-
-    def recreate_floatingips(self, src_floats, src_nets,
-                             existing_nets,
-                             existing_floatingips):
-
-        """ We recreate floating ips with the same parameters as on src cloud,
-        because we can't determine floating ip address
-        during allocation process. """
+    def upload_floatingips(self, networks, src_floats, existing=None):
+        """Allocate floating IPs of the source cloud for the same tenants.
 
+        Addresses are requested directly where the API allows it,
+        otherwise they are looked for among allocated floating IPs (see
+        `allocate_floatingips`). Floating IPs of the destination cloud
+        which are not in the source cloud are not touched.
+        """
+        existing = self.get_existing(existing)
+        existing_nets = existing.get('networks')
+        networks = resource_index.as_index(networks)
+        dst_floats = {floating['floating_ip_address']: floating for floating
+                      in self.get_floatingips(existing.snapshot)}
+        # external network id -> {address: tenant id}
+        needed = collections.defaultdict(dict)
         for src_float in src_floats:
-            tname = src_float['tenant_name']
-            tenant_id = \
-                self.identity_client.get_tenant_id_by_name(tname)
             ext_net_hash = \
-                self.get_res_hash_by_id(src_nets,
-                                        src_float['floating_network_id'])
-            ext_net = self.get_res_by_hash(existing_nets, ext_net_hash)
-            for floating in existing_floatingips:
-                if floating['floating_ip_address'] == \
-                        src_float['floating_ip_address']:
-                    if floating['floating_network_id'] == ext_net['id']:
-                        if floating['tenant_id'] != tenant_id:
-                            fl_id = floating['id']
-                            self.neutron_client.delete_floatingip(fl_id)
-                            self.neutron_client.create_floatingip({
-                                'floatingip':
-                                {
-                                    'floating_network_id': ext_net['id'],
-                                    'tenant_id': tenant_id
-                                }
-                            })
-
-    def delete_redundant_floatingips(self, src_floats, existing_floatingips):
-        src_floatingips = \
-            [src_float['floating_ip_address'] for src_float in src_floats]
-        for floatingip in existing_floatingips:
-            if floatingip['floating_ip_address'] not in src_floatingips:
-                self.neutron_client.delete_floatingip(floatingip['id'])
+                networks.get_hash_by_id(src_float['floating_network_id'])
+            ext_net_id = existing_nets.get_by_hash(ext_net_hash)['id']
+            tenant_id = self.identity_client.get_tenant_id_by_name(
+                src_float['tenant_name'])
+            address = src_float['floating_ip_address']
+            floating = dst_floats.get(address)
+            if floating is not None:
+                if (floating['floating_network_id'] == ext_net_id and
+                        floating['tenant_id'] == tenant_id):
+                    continue
+                self.neutron_client.delete_floatingip(floating['id'])
+            needed[ext_net_id][address] = tenant_id
+        for ext_net_id, addresses in needed.iteritems():
+            left = self.create_floatingips_by_address(ext_net_id, addresses)
+            if left:
+                self.allocate_floatingips(ext_net_id, left,
+                                          self.get_pool_size(
+                                              ext_net_id,
+                                              existing.get('subnets')))
+
+    def create_floatingips_by_address(self, ext_net_id, addresses):
+        """Create floating IPs with given addresses {address: tenant id}.
+
+        Returns addresses which weren't created because the API can't
+        allocate a given address.
+        """
+        left = dict(addresses)
+        if not self.floatingip_address_supported:
+            return left
+        for address, tenant_id in sorted(addresses.iteritems()):
+            try:
+                self.neutron_client_once.create_floatingip({
+                    'floatingip': {'floating_network_id': ext_net_id,
+                                   'floating_ip_address': address,
+                                   'tenant_id': tenant_id}})
+            except IpAddressInUseClient:
+                LOG.warning("| Floating IP %s is in use in network %s",
+                            address, ext_net_id)
+            except NeutronClientException as e:
+                if e.status_code != 400:
+                    raise
+                LOG.info("| Floating IPs can't be allocated by address: %s",
+                         e)
+                self.floatingip_address_supported = False
+                return left
+            del left[address]
+        return left
+
+    @staticmethod
+    def get_pool_size(network_id, subnets):
+        """Number of addresses in allocation pools of the network."""
+        size = 0
+        for subnet in subnets:
+            if subnet['network_id'] != network_id:
+                continue
+            for pool in subnet['allocation_pools']:
+                size += (int(ipaddr.IPAddress(pool['end'])) -
+                         int(ipaddr.IPAddress(pool['start'])) + 1)
+        return size or None
+
+    def allocate_floatingips(self, ext_net_id, addresses, limit=None,
+                             batch_size=FLOATINGIP_BATCH_SIZE):
+        """Allocate floating IPs with addresses {address: tenant id}.
+
+        Address of a new floating IP can't be chosen, so floating IPs are
+        allocated by batches of `batch_size` until every address is found,
+        the network has no free addresses or `limit` allocations are made.
+        A found address is released and allocated again for its tenant
+        while the rest of the batch is held, the rest is released before
+        the next batch.
+        """
+        left = dict(addresses)
+        seen = set()
+        count = 0
+        exhausted = False
+        while left and not exhausted and (limit is None or count < limit):
+            batch = {}
+            try:
+                while len(batch) < batch_size and (limit is None or
+                                                   count < limit):
+                    floating = self.neutron_client.create_floatingip({
+                        'floatingip': {'floating_network_id': ext_net_id}})
+                    floating = floating['floatingip']
+                    batch[floating['floating_ip_address']] = floating['id']
+                    count += 1
+            except IpAddressGenerationFailureClient:
+                LOG.info("| Floating IPs "
+                         "were allocated in network %s" % ext_net_id)
+                exhausted = True
+            new = set(batch) - seen
+            seen.update(batch)
+            for address in sorted(set(batch) & set(left)):
+                self.neutron_client.delete_floatingip(batch.pop(address))
+                floating = self.neutron_client.create_floatingip({
+                    'floatingip': {'floating_network_id': ext_net_id,
+                                   'tenant_id': left[address]}})['floatingip']
+                if floating['floating_ip_address'] == address:
+                    del left[address]
+                    continue
+                LOG.warning("| Floating IP %s was allocated instead of %s, "
+                            "it is released", floating['floating_ip_address'],
+                            address)
+                self.neutron_client.delete_floatingip(floating['id'])
+            for floating_id in batch.itervalues():
+                self.neutron_client.delete_floatingip(floating_id)
+            if not new:
+                # released addresses are given out again
+                break
+        for address in sorted(left):
+            LOG.warning("| Floating IP %s can't be allocated in network %s",
+                        address, ext_net_id)
 
     def update_floatingip(self, floatingip_id, port_id=None):
         update_dict = {'floatingip': {'port_id': port_id}}
@@ -0,0 +1,63 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+class NeutronSnapshot(object):
+    """Neutron resources read by one list call each, indexed by id.
+
+    Every list (networks, subnets, ports, routers, floatingips,
+    security_groups) is read when it is used first. Networks and subnets
+    missing from the lists, created after they were read, are read by show
+    calls.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.lists = {}
+        self.indexes = {}
+
+    def get_list(self, name):
+        if name not in self.lists:
+            self.lists[name] = getattr(self.client, 'list_' + name)()[name]
+        return self.lists[name]
+
+    def get_index(self, name):
+        """{id: object} of the list."""
+        if name not in self.indexes:
+            self.indexes[name] = {obj['id']: obj
+                                  for obj in self.get_list(name)}
+        return self.indexes[name]
+
+    def get_network(self, network_id):
+        networks = self.get_index('networks')
+        if network_id not in networks:
+            networks[network_id] = self.client.show_network(
+                network_id)['network']
+        return networks[network_id]
+
+    def get_subnet(self, subnet_id):
+        subnets = self.get_index('subnets')
+        if subnet_id not in subnets:
+            subnets[subnet_id] = self.client.show_subnet(
+                subnet_id)['subnet']
+        return subnets[subnet_id]
+
+    def get_device_ports(self, device_id):
+        """Ports of the device (router, instance...)."""
+        if 'device_ports' not in self.indexes:
+            device_ports = {}
+            for port in self.get_list('ports'):
+                device_ports.setdefault(port['device_id'], []).append(port)
+            self.indexes['device_ports'] = device_ports
+        return self.indexes['device_ports'].get(device_id, [])
@@ -0,0 +1,97 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import threading
+import time
+
+
+PORT_FIELDS = ['id', 'network_id', 'mac_address', 'fixed_ips']
+
+
+class PortIndex(object):
+    """Ports of the cloud indexed by IP and by (network id, MAC).
+
+    Ports are listed with the fields needed for lookups only, when the
+    index is used first and again when it is older than `ttl` seconds
+    (0 - on every lookup). Ports created and deleted by CloudFerry are
+    added and removed by `add` and `remove`.
+    """
+
+    def __init__(self, list_ports, ttl=300):
+        self.list_ports = list_ports
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.loaded = None
+        self.ports = {}
+        self.ip_ports = {}
+        self.mac_ports = {}
+
+    def load(self):
+        if self.loaded is not None and time.time() - self.loaded < self.ttl:
+            return
+        self.ports = {}
+        self.ip_ports = {}
+        self.mac_ports = {}
+        for port in self.list_ports(fields=PORT_FIELDS):
+            self.index(port)
+        self.loaded = time.time()
+
+    def index(self, port):
+        self.ports[port['id']] = port
+        for fixed_ip in port['fixed_ips']:
+            self.ip_ports.setdefault(fixed_ip['ip_address'],
+                                     []).append(port['id'])
+        self.mac_ports[(port['network_id'], port['mac_address'])] = \
+            port['id']
+
+    def add(self, port):
+        with self.lock:
+            if self.loaded is not None:
+                self.index(port)
+
+    def remove(self, port_id):
+        with self.lock:
+            port = self.ports.pop(port_id, None)
+            if port is None:
+                return
+            for fixed_ip in port['fixed_ips']:
+                port_ids = self.ip_ports.get(fixed_ip['ip_address'], [])
+                if port_id in port_ids:
+                    port_ids.remove(port_id)
+                if not port_ids:
+                    self.ip_ports.pop(fixed_ip['ip_address'], None)
+            key = (port['network_id'], port['mac_address'])
+            if self.mac_ports.get(key) == port_id:
+                del self.mac_ports[key]
+
+    def get_mac(self, ip_address):
+        """MAC of the first port with the IP."""
+        with self.lock:
+            self.load()
+            port_ids = self.ip_ports.get(ip_address)
+            if port_ids:
+                return self.ports[port_ids[0]]['mac_address']
+
+    def get_macs(self):
+        """{IP: MAC of the first port with the IP}."""
+        with self.lock:
+            self.load()
+            return {ip: self.ports[port_ids[0]]['mac_address']
+                    for ip, port_ids in self.ip_ports.iteritems()}
+
+    def get_port_id(self, network_id, mac):
+        with self.lock:
+            self.load()
+            return self.mac_ports.get((network_id, mac))
@@ -0,0 +1,85 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+from cloudferrylib.os.network import neutron_snapshot
+
+
+class ResourceIndex(object):
+    """Converted neutron resources indexed by id and by res_hash.
+
+    The first resource with a hash is found by it, as get_res_by_hash
+    does.
+    """
+
+    def __init__(self, resources=()):
+        self.resources = []
+        self.by_id = {}
+        self.by_hash = {}
+        for resource in resources:
+            self.add(resource)
+
+    def __iter__(self):
+        return iter(self.resources)
+
+    def add(self, resource):
+        self.resources.append(resource)
+        if 'id' in resource:
+            self.by_id.setdefault(resource['id'], resource)
+        self.by_hash.setdefault(resource['res_hash'], resource)
+
+    def get_by_hash(self, res_hash):
+        return self.by_hash.get(res_hash)
+
+    def get_hash_by_id(self, resource_id):
+        resource = self.by_id.get(resource_id)
+        return resource['res_hash'] if resource else None
+
+    def missing(self, resources):
+        """Hashes of `resources` which aren't in the index."""
+        return set(r['res_hash'] for r in resources) - set(self.by_hash)
+
+
+def as_index(resources):
+    if isinstance(resources, ResourceIndex):
+        return resources
+    return ResourceIndex(resources)
+
+
+class ExistingResources(object):
+    """Indexes of resources of the cloud shared by the steps of a deploy.
+
+    Each kind of resources is read when it is needed first, by one
+    snapshot of neutron lists; steps add resources they create.
+    """
+
+    GETTERS = {
+        'networks': 'get_networks',
+        'subnets': 'get_subnets',
+        'routers': 'get_routers',
+        'floating_ips': 'get_floatingips',
+        'security_groups': 'get_sec_gr_and_rules',
+    }
+
+    def __init__(self, network_res):
+        self.network_res = network_res
+        self.snapshot = neutron_snapshot.NeutronSnapshot(
+            network_res.neutron_client)
+        self.indexes = {}
+
+    def get(self, name):
+        if name not in self.indexes:
+            getter = getattr(self.network_res, self.GETTERS[name])
+            self.indexes[name] = ResourceIndex(getter(self.snapshot))
+        return self.indexes[name]
@@ -213,6 +213,14 @@ class CinderStorage(storage.Storage):
                 cloud.getIpSsh(),
                 instance_info['host'])
             volume['path'] = utl.find_element_by_in(list_disk, vol.id)
+            if not volume['path']:
+                # volume may be attached after block info was cached
+                list_disk = utl.get_libvirt_block_info(
+                    instance_info['instance_name'],
+                    cloud.getIpSsh(),
+                    instance_info['host'],
+                    refresh=True)
+                volume['path'] = utl.find_element_by_in(list_disk, vol.id)
         return volume
 
     @staticmethod
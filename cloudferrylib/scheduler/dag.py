@@ -0,0 +1,94 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+class Dag(object):
+    """Dependency graph of a linear chain of tasks.
+
+    Tasks are indexed by their position in the chain (tasks compare equal
+    to each other, so they can't be used as keys). Task `i` depends on the
+    tasks which write the namespace keys it reads, and on the tasks which
+    read or write the keys it writes before it. Task with unknown output
+    (`provides` is None) is a barrier for the whole chain.
+    """
+
+    def __init__(self, net):
+        self.tasks = self.get_chain(net)
+        self.deps = self.compile(self.tasks)
+
+    @staticmethod
+    def get_chain(net):
+        tasks = []
+        elem = net.go_start() if net else None
+        while elem:
+            if len(elem.next_element) > 1 or elem.parall_elem:
+                raise ValueError("Task %s has alternative or parallel paths, "
+                                 "only linear chain can be compiled to DAG" %
+                                 elem)
+            tasks.append(elem)
+            elem = elem.next_element[0]
+        return tasks
+
+    @staticmethod
+    def compile(tasks):
+        deps = [set() for _ in tasks]
+        last_writer = {}
+        readers = {}
+        barrier = None
+        for i, task in enumerate(tasks):
+            provides = task.get_provides()
+            if provides is None:
+                deps[i].update(xrange(i))
+                barrier = i
+                last_writer.clear()
+                readers.clear()
+                continue
+            if barrier is not None:
+                deps[i].add(barrier)
+            for key in task.get_requires():
+                if key in last_writer:
+                    deps[i].add(last_writer[key])
+                readers.setdefault(key, []).append(i)
+            for key in provides:
+                if key in last_writer:
+                    deps[i].add(last_writer[key])
+                deps[i].update(r for r in readers.get(key, []) if r != i)
+                last_writer[key] = i
+                readers[key] = []
+        return deps
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def critical_path(self, durations):
+        """Longest chain of dependent tasks: (duration, [task indexes]).
+
+        `durations` holds estimated duration of every task of the chain.
+        """
+        finish = []
+        prev = []
+        for i, deps in enumerate(self.deps):
+            last = max(deps, key=lambda d: finish[d]) if deps else None
+            start = finish[last] if last is not None else 0
+            finish.append(start + durations[i])
+            prev.append(last)
+        if not finish:
+            return 0, []
+        i = max(xrange(len(finish)), key=lambda n: finish[n])
+        total = finish[i]
+        path = []
+        while i is not None:
+            path.append(i)
+            i = prev[i]
+        return total, path[::-1]
@@ -0,0 +1,269 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import cPickle
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+
+from thread_tasks import NORMAL
+
+
+class Job(object):
+    """Function submitted to an executor.
+
+    Job which is joined before any worker took it is run by the joining
+    thread itself, so that a child joining its own children can't take all
+    workers of the pool.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.lock = threading.Lock()
+        self.started = False
+        self.finished = threading.Event()
+        self.result = None
+        self.error = None
+
+    def claim(self):
+        with self.lock:
+            if self.started:
+                return False
+            self.started = True
+            return True
+
+    def run(self):
+        try:
+            self.result = self.func()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished.set()
+
+    def join(self):
+        if self.claim():
+            self.run()
+        self.finished.wait()
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class PendingJobs(object):
+    """Jobs waiting for a worker, the highest priority first.
+
+    Priority of a waiting job grows by one level every `ageing` seconds
+    (0 - no ageing), so that low priority jobs are not starved by a stream
+    of high priority ones. Jobs of the same priority are taken in order.
+    """
+
+    def __init__(self, ageing=0):
+        self.ageing = ageing
+        self.jobs = []
+        self.order = itertools.count()
+        self.cond = threading.Condition()
+
+    def put(self, job, priority=NORMAL):
+        with self.cond:
+            self.jobs.append((priority, time.time(), next(self.order), job))
+            self.cond.notify()
+
+    def get(self):
+        with self.cond:
+            while not self.jobs:
+                self.cond.wait()
+            return self.pop()
+
+    def pop(self):
+        with self.cond:
+            if not self.jobs:
+                return None
+            now = time.time()
+            best = max(self.jobs, key=lambda item: self.rank(item, now))
+            self.jobs.remove(best)
+            return best[-1]
+
+    def rank(self, item, now):
+        priority, since, order, _ = item
+        if self.ageing:
+            priority += (now - since) / self.ageing
+        return priority, -order
+
+    def remove(self, job):
+        with self.cond:
+            for item in self.jobs:
+                if item[-1] is job:
+                    self.jobs.remove(item)
+                    return True
+            return False
+
+    def __len__(self):
+        return len(self.jobs)
+
+
+class InlineExecutor(object):
+    """Runs every job at once in the submitting thread."""
+
+    def submit(self, func, priority=None):
+        job = Job(func)
+        job.claim()
+        job.run()
+        return job
+
+
+class ThreadExecutor(object):
+    """Runs jobs in a pool of `workers` threads, by priority.
+
+    Workers are started on the first submitted job (again in a forked
+    process, since threads don't survive fork).
+    """
+
+    def __init__(self, workers=4, ageing=0):
+        self.workers = workers
+        self.ageing = ageing
+        self.jobs = PendingJobs(ageing)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def submit(self, func, priority=None):
+        job = Job(func)
+        with self.lock:
+            if self.pid != os.getpid():
+                self.jobs = PendingJobs(self.ageing)
+                self.threads = []
+                self.pid = os.getpid()
+            if not self.threads:
+                for _ in xrange(self.workers):
+                    thread = threading.Thread(target=self.work)
+                    thread.daemon = True
+                    thread.start()
+                    self.threads.append(thread)
+        self.jobs.put(job, priority if priority is not None else NORMAL)
+        return job
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            if job.claim():
+                job.run()
+
+
+class ProcessJob(object):
+    def __init__(self, func, executor):
+        self.func = func
+        self.executor = executor
+        self.process = None
+        self.receiver = None
+        self.finished = False
+        self.result = None
+        self.error = None
+
+    def start(self):
+        self.receiver, sender = multiprocessing.Pipe(False)
+
+        def target():
+            try:
+                result = (self.func(), None)
+            except Exception as e:
+                result = (None, e)
+            try:
+                sender.send(result)
+            except (cPickle.PicklingError, TypeError) as e:
+                sender.send((None, RuntimeError(str(result[1] or e))))
+
+        self.process = multiprocessing.Process(target=target)
+        self.process.start()
+        sender.close()
+
+    def wait(self):
+        try:
+            self.result, self.error = self.receiver.recv()
+        except EOFError:
+            self.error = RuntimeError("Process exited with code %s" %
+                                      self.process.exitcode)
+        self.process.join()
+        self.finished = True
+
+    def join(self):
+        self.executor.join(self)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class ProcessExecutor(object):
+    """Runs every job in a forked process, at most `workers` at once.
+
+    Waiting jobs are started by priority. Processes are forked by the
+    thread which submits and joins jobs only, since a process forked by
+    another thread may inherit locks held by it. Job which is joined
+    before it was started is started at once.
+    """
+
+    def __init__(self, workers=4, ageing=0):
+        self.workers = workers
+        self.ageing = ageing
+        self.pending = PendingJobs(ageing)
+        self.running = []
+        self.pid = os.getpid()
+
+    def submit(self, func, priority=None):
+        if self.pid != os.getpid():
+            self.pending = PendingJobs(self.ageing)
+            self.running = []
+            self.pid = os.getpid()
+        job = ProcessJob(func, self)
+        self.pending.put(job, priority if priority is not None else NORMAL)
+        self.dispatch()
+        return job
+
+    def dispatch(self):
+        for job in [j for j in self.running if j.receiver.poll()]:
+            job.wait()
+            self.running.remove(job)
+        while self.pending and len(self.running) < self.workers:
+            self.start(self.pending.pop())
+
+    def start(self, job):
+        job.start()
+        self.running.append(job)
+
+    def join(self, job):
+        if job.finished:
+            return
+        if self.pending.remove(job):
+            self.start(job)
+        job.wait()
+        self.running.remove(job)
+        self.dispatch()
+
+
+EXECUTORS = {
+    'inline': InlineExecutor,
+    'thread': ThreadExecutor,
+    'process': ProcessExecutor,
+}
+
+
+def get_executor(name, workers=4, ageing=0):
+    if name not in EXECUTORS:
+        raise ValueError("Unknown executor %s, expected one of: %s" %
+                         (name, ', '.join(sorted(EXECUTORS))))
+    if name == 'inline':
+        return InlineExecutor()
+    return EXECUTORS[name](workers, ageing)
@@ -0,0 +1,133 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import copy
+import cPickle
+import os
+
+from cloudferrylib.utils import utils
+
+
+LOG = utils.get_log(__name__)
+
+
+def diff(old, new):
+    """Changes turning dict `old` into dict `new`: (set, patched, removed).
+
+    `patched` holds changes of nested dicts, so that a single new item of a
+    big info costs a single item in the journal.
+    """
+    changed = {}
+    patched = {}
+    for k, v in new.iteritems():
+        if k not in old:
+            changed[k] = v
+        elif old[k] != v:
+            if isinstance(old[k], dict) and isinstance(v, dict):
+                patched[k] = diff(old[k], v)
+            else:
+                changed[k] = v
+    removed = [k for k in old if k not in new]
+    return changed, patched, removed
+
+
+def patch(obj, changes):
+    changed, patched, removed = changes
+    for k in removed:
+        obj.pop(k, None)
+    for k, sub_changes in patched.iteritems():
+        patch(obj[k], sub_changes)
+    obj.update(changed)
+
+
+class Journal(object):
+    """Append-only checkpoint journal of the scheduler namespace.
+
+    Every record is a pickled tuple (task, num_element, changes): repr of
+    the finished task (None for a record which only changes vars), path
+    chosen by the task and changes of vars made by it (see `diff`). Only
+    vars replaced by the task or listed in its `provides` are compared
+    with the last journaled state. Service vars (starting with '__') are
+    not journaled. Clouds and their resources are stored by reference, so
+    that they are bound to the objects of the resumed migration.
+    """
+
+    def __init__(self, path, clouds=()):
+        self.path = path
+        self.state = {}
+        self.refs = {}
+        for cloud in clouds:
+            self.refs[('cloud', cloud.position)] = cloud
+            for name, resource in cloud.resources.iteritems():
+                self.refs[('resource', cloud.position, name)] = resource
+        self.ids = {id(obj): ref for ref, obj in self.refs.iteritems()}
+
+    def reset(self):
+        self.state = {}
+        open(self.path, 'wb').close()
+
+    def append(self, task, before, vars, provides=None):
+        missing = object()
+        keys = [k for k, v in vars.iteritems()
+                if not k.startswith('__') and
+                (before.get(k, missing) is not v or k in (provides or ()))]
+        new = {k: vars[k] for k in keys}
+        old = {k: self.state[k] for k in keys if k in self.state}
+        changed, patched, _ = diff(old, new)
+        removed = [k for k in before
+                   if k not in vars and not k.startswith('__')]
+        changes = (changed, patched, removed)
+        record = (repr(task) if task is not None else None,
+                  getattr(task, 'num_element', None), changes)
+        with open(self.path, 'ab') as f:
+            pickler = cPickle.Pickler(f, cPickle.HIGHEST_PROTOCOL)
+            pickler.persistent_id = self.persistent_id
+            pickler.dump(record)
+            f.flush()
+            os.fsync(f.fileno())
+        patch(self.state, copy.deepcopy(changes))
+
+    def replay(self, vars):
+        """Apply journaled changes to `vars` record by record.
+
+        Yields (task, num_element) of every applied record.
+        """
+        for task_repr, num_element, changes in self.load():
+            patch(vars, changes)
+            yield task_repr, num_element
+        self.state = copy.deepcopy({k: v for k, v in vars.iteritems()
+                                    if not k.startswith('__')})
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            unpickler = cPickle.Unpickler(f)
+            unpickler.persistent_load = self.persistent_load
+            while True:
+                try:
+                    yield unpickler.load()
+                except EOFError:
+                    return
+                except (cPickle.UnpicklingError, ValueError, IndexError):
+                    # the last record was not written completely
+                    LOG.warning("Truncated record in journal %s", self.path)
+                    return
+
+    def persistent_id(self, obj):
+        return self.ids.get(id(obj))
+
+    def persistent_load(self, ref):
+        return self.refs[ref]
@@ -11,12 +11,59 @@
 # implied.
 # See the License for the specific language governing permissions and#
 # limitations under the License.
+import collections
 import copy
 __author__ = 'mirrorcoder'
 
 CHILDREN = '__children__'
 
 
+class LayeredVars(collections.MutableMapping):
+    """Vars of a forked namespace.
+
+    Reads go through to the parent vars, writes and deletions are recorded
+    in the own layer only, so forking doesn't copy anything. Values are
+    shared with the parent and must not be changed in place.
+    """
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.own = {CHILDREN: dict()}
+        self.deleted = set()
+
+    def __getitem__(self, key):
+        if key in self.own:
+            return self.own[key]
+        if key in self.deleted:
+            raise KeyError(key)
+        return self.parent[key]
+
+    def __setitem__(self, key, value):
+        self.own[key] = value
+        self.deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.own.pop(key, None)
+        if key in self.parent:
+            self.deleted.add(key)
+
+    def __contains__(self, key):
+        return key in self.own or (key not in self.deleted and
+                                   key in self.parent)
+
+    def __iter__(self):
+        for key in self.own:
+            yield key
+        for key in self.parent:
+            if key not in self.own and key not in self.deleted:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
 class Namespace:
 
     def __init__(self, vars={}):
@@ -25,4 +72,27 @@ class Namespace:
         self.vars = vars
 
     def fork(self, is_deep_copy=False):
-        return Namespace(copy.copy(self.vars)) if not is_deep_copy else Namespace(copy.deepcopy(self.vars))
+        if is_deep_copy:
+            return Namespace(copy.deepcopy({k: v for k, v in
+                                            self.vars.iteritems()
+                                            if k != CHILDREN}))
+        return Namespace(LayeredVars(self.vars))
+
+    def get_changes(self):
+        """Vars written and deleted by the forked namespace.
+
+        Changes are picklable as far as the values are, so they can be
+        sent to the parent from another process.
+        """
+        if not isinstance(self.vars, LayeredVars):
+            return {}, set()
+        written = {k: v for k, v in self.vars.own.iteritems()
+                   if k != CHILDREN}
+        return written, set(self.vars.deleted)
+
+    def merge(self, changes):
+        """Apply changes of the forked namespace (see `get_changes`)."""
+        written, deleted = changes
+        for key in deleted:
+            self.vars.pop(key, None)
+        self.vars.update(written)
@@ -13,12 +13,15 @@
 # limitations under the License.
 
 
-import multiprocessing
+from multiprocessing.pool import ThreadPool
+import Queue
 import traceback
 
 from cloudferrylib.scheduler.namespace import Namespace, CHILDREN
 from cloudferrylib.utils import utils
 from cursor import Cursor
+from dag import Dag
+from executor import ProcessExecutor
 from task import BaseTask
 from thread_tasks import WrapThreadTask
 
@@ -35,15 +38,21 @@ class BaseScheduler(object):
         self.namespace = namespace if namespace else Namespace()
         self.status_error = NO_ERROR
         self.cursor = cursor
+        self.journal = None
+        self.profiler = None
         self.map_func_task = dict() if not hasattr(
             self,
             'map_func_task') else self.map_func_task
         self.map_func_task[BaseTask()] = self.task_run
 
     def event_start_task(self, task):
+        if self.profiler:
+            self.profiler.start_task(task)
         return True
 
     def event_end_task(self, task):
+        if self.profiler:
+            self.profiler.end_task(task)
         return True
 
     def event_error_task(self, task, e):
@@ -62,7 +71,11 @@ class BaseScheduler(object):
             try:
                 task_print = str(task).split('|')[1]
                 LOG.info('%s Start task: %s', '-' * 8, task_print)
+                before = dict(self.namespace.vars) if self.journal else None
                 self.run_task(task)
+                if self.journal:
+                    self.journal.append(task, before, self.namespace.vars,
+                                        task.get_provides())
                 LOG.info('%s End task: %s', '-' * 8, task_print)
             except Exception as e:
                 self.status_error = ERROR
@@ -71,6 +84,25 @@ class BaseScheduler(object):
                 self.error_task(task, e)
                 break
 
+    def resume(self, journal):
+        """Restore namespace from the journal and skip finished tasks.
+
+        Journal is used for the rest of the run. Returns number of
+        replayed records.
+        """
+        records = 0
+        for task_repr, num_element in journal.replay(self.namespace.vars):
+            if task_repr is not None:
+                task = next(self.cursor, None)
+                if repr(task) != task_repr:
+                    raise ValueError("Journal %s doesn't match the chain: "
+                                     "%s expected, %s found" %
+                                     (journal.path, task_repr, task))
+                task.num_element = num_element
+            records += 1
+        self.journal = journal
+        return records
+
     def task_run(self, task):
         task(namespace=self.namespace)
 
@@ -80,19 +112,20 @@ class BaseScheduler(object):
 
 class SchedulerThread(BaseScheduler):
     def __init__(self, namespace=None, thread_task=None, cursor=None,
-                 scheduler_parent=None):
+                 scheduler_parent=None, executor=None):
         super(SchedulerThread, self).__init__(namespace, cursor)
         self.map_func_task[WrapThreadTask()] = self.task_run_thread
         self.child_threads = dict()
         self.thread_task = thread_task
         self.scheduler_parent = scheduler_parent
+        self.executor = executor if executor else ProcessExecutor()
 
     def event_start_children(self, thread_task):
-        self.child_threads[thread_task] = True
+        self.child_threads[id(thread_task)] = True
         return True
 
     def event_stop_children(self, thread_task):
-        del self.child_threads[thread_task]
+        self.child_threads.pop(id(thread_task), None)
         return True
 
     def trigger_start_scheduler(self):
@@ -107,12 +140,17 @@ class SchedulerThread(BaseScheduler):
         if not self.thread_task:
             self.start_current_thread()
         else:
-            self.start_separate_thread()
+            return self.start_separate_thread()
 
     def start_separate_thread(self):
-        p = multiprocessing.Process(target=self.start_current_thread)
-        self.namespace.vars[CHILDREN][self.thread_task]['process'] = p
-        p.start()
+        return self.executor.submit(self.run_separate_thread,
+                                    self.thread_task.priority)
+
+    def run_separate_thread(self):
+        self.start_current_thread()
+        if self.status_error:
+            raise self.exception
+        return self.namespace.get_changes()
 
     def start_current_thread(self):
         self.trigger_start_scheduler()
@@ -124,21 +162,85 @@ class SchedulerThread(BaseScheduler):
         scheduler = self.__class__(namespace=namespace,
                                    thread_task=thread_task,
                                    cursor=Cursor(thread_task.getNet()),
-                                   scheduler_parent=self)
-        self.namespace.vars[CHILDREN][thread_task] = {
+                                   scheduler_parent=self,
+                                   executor=self.executor)
+        scheduler.profiler = self.profiler
+        # thread tasks are equal to each other, so they are kept by id
+        self.namespace.vars[CHILDREN][id(thread_task)] = {
             'namespace': namespace,
             'scheduler': scheduler,
-            'process': None
+            'job': None
         }
         return scheduler
 
     def task_run_thread(self, task):
         scheduler_fork = self.fork(task)
-        scheduler_fork.start()
+        job = scheduler_fork.start()
+        self.namespace.vars[CHILDREN][id(task)]['job'] = job
+
+
+class DagScheduler(BaseScheduler):
+    """Runs independent tasks of a linear chain concurrently.
+
+    The chain is compiled to the DAG (see `Dag`) and every task is started
+    as soon as all tasks it depends on are finished, at most `workers`
+    tasks at a time.
+    """
+
+    def __init__(self, namespace=None, cursor=None, workers=4):
+        super(DagScheduler, self).__init__(namespace, cursor)
+        self.workers = workers
+
+    def start(self):
+        dag = Dag(self.cursor.current())
+        remaining = {i: set(deps) for i, deps in enumerate(dag.deps)}
+        done = Queue.Queue()
+        pool = ThreadPool(self.workers)
+        before = dict(self.namespace.vars)
+        running = 0
+        failed = None
+        while True:
+            if not failed:
+                for i in sorted(remaining):
+                    if not remaining[i]:
+                        del remaining[i]
+                        pool.apply_async(self.run_node, (i, dag.tasks[i]),
+                                         callback=done.put)
+                        running += 1
+            if not running:
+                break
+            i, e = done.get()
+            running -= 1
+            if e:
+                failed = failed or (dag.tasks[i], e)
+                continue
+            for deps in remaining.itervalues():
+                deps.discard(i)
+        pool.close()
+        pool.join()
+        if failed:
+            task, e = failed
+            self.status_error = ERROR
+            self.exception = e
+            self.error_task(task, e)
+        elif self.journal:
+            # tasks run concurrently, so the whole DAG is a single record
+            self.journal.append(None, before, self.namespace.vars)
+
+    def run_node(self, num, task):
+        try:
+            task_print = str(task).split('|')[1]
+            LOG.info('%s Start task: %s', '-' * 8, task_print)
+            self.run_task(task)
+            LOG.info('%s End task: %s', '-' * 8, task_print)
+        except Exception as e:
+            traceback.print_exc()
+            return num, e
+        return num, None
 
 
 class Scheduler(SchedulerThread):
     def __init__(self, namespace=None, thread_task=False, cursor=None,
-                 scheduler_parent=None):
+                 scheduler_parent=None, executor=None):
         super(Scheduler, self).__init__(namespace, thread_task, cursor,
-                                        scheduler_parent)
+                                        scheduler_parent, executor)
@@ -13,6 +13,8 @@
 # limitations under the License.
 
 __author__ = 'mirrorcoder'
+import inspect
+
 from cloudferrylib.scheduler.cursor import DEFAULT
 from cloudferrylib.scheduler.utils.equ_instance import EquInstance
 
@@ -84,6 +86,10 @@ class AltSyntax(ClassicSyntax):
 
 
 class BaseTask(AltSyntax, EquInstance):
+    # Namespace keys the task reads in addition to named arguments of run()
+    requires = ()
+    # Namespace keys the task writes, None - unknown (task is a barrier)
+    provides = None
 
     def __init__(self):
         self.class_name = BaseTask.__name__
@@ -92,6 +98,15 @@ class BaseTask(AltSyntax, EquInstance):
     def run(self, **kwargs):
         pass
 
+    def get_requires(self):
+        args = inspect.getargspec(self.run).args[1:]
+        return set(args) | set(self.requires)
+
+    def get_provides(self):
+        if self.provides is None:
+            return None
+        return set(self.provides)
+
     def __call__(self, namespace=None):
         result = self.run(**namespace.vars)
         if type(result) == dict:
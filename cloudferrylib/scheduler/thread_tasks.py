@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+from namespace import CHILDREN
 from task import Task
 from utils.equ_instance import EquInstance
 __author__ = 'mirrorcoder'
@@ -30,19 +31,32 @@ class WrapThreadTask(EquInstance):
     def getNet(self):
         return self.net
 
+    def __repr__(self):
+        return "WrapThreadTask|%s" % self.__class__.__name__
+
+
+def join_child(namespace, child):
+    if child['job']:
+        namespace.merge(child['job'].join())
+
 
 class WaitThreadTask(Task):
+    """Waits for the thread task and merges its vars into the namespace."""
+
     def __init__(self, tt):
         self.tt = tt
         super(WaitThreadTask, self).__init__()
 
-    def run(self, __children__={}, **kwargs):
-        if __children__:
-            __children__[self.tt]['process'].join()
+    def __call__(self, namespace=None):
+        children = namespace.vars.get(CHILDREN)
+        if children and id(self.tt) in children:
+            join_child(namespace, children.pop(id(self.tt)))
 
 
 class WaitThreadAllTask(Task):
-    def run(self, __children__={}, **kwargs):
-        if __children__:
-            for p in __children__:
-                __children__[p]['process'].join()
+    """Waits for all thread tasks and merges their vars into the namespace."""
+
+    def __call__(self, namespace=None):
+        children = namespace.vars.get(CHILDREN)
+        while children:
+            join_child(namespace, children.popitem()[1])
@@ -0,0 +1,58 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import os
+import threading
+import time
+
+
+# clients re-authenticate when their token expires, they are recreated
+# after this time anyway to drop stale connections
+CLIENT_TTL = 3600
+
+
+class ClientCache(object):
+    """Long-lived API clients shared by all resources and threads.
+
+    Client keeps its token and connection pool, so reusing it saves
+    authentication in Keystone and new connections. Clients are not shared
+    with forked processes, a process creates its own ones.
+    """
+
+    def __init__(self, ttl=CLIENT_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.clients = {}
+        self.pid = os.getpid()
+
+    def get(self, key, factory):
+        """Client cached by `key`, created by `factory()` if expired."""
+        with self.lock:
+            if self.pid != os.getpid():
+                self.clients = {}
+                self.pid = os.getpid()
+            client, created = self.clients.get(key, (None, 0))
+            if client is None or (self.ttl and
+                                  time.time() - created > self.ttl):
+                client = factory()
+                self.clients[key] = (client, time.time())
+            return client
+
+    def clear(self):
+        with self.lock:
+            self.clients = {}
+
+
+clients = ClientCache()
@@ -12,6 +12,22 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import re
+
+
+# dd reports e.g. "1048576 bytes (1.0 MB) copied, 0.01 s, 95 MB/s"
+DD_BYTES_RE = re.compile(r'^(\d+) bytes', re.M)
+
+
+def transferred_bytes(output):
+    """Returns amount of bytes reported by the last dd in transfer output,
+    or None if output has no dd statistics."""
+
+    if not output:
+        return None
+    found = DD_BYTES_RE.findall(str(output))
+    return int(found[-1]) if found else None
+
 
 class DriverTransporter(object):
     def __init__(self, src_cloud, dst_cloud, cfg):
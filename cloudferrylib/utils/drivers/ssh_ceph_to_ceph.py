@@ -45,4 +45,4 @@ class SSHCephToCeph(driver_transporter.DriverTransporter):
             process = process(data['path_src'], '-', '-',
                               data['path_dst'])
 
-            self.src_cloud.ssh_util.execute(process)
+            return self.src_cloud.ssh_util.execute(process)
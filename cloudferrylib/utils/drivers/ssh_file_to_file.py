@@ -50,7 +50,7 @@ class SSHFileToFile(driver_transporter.DriverTransporter):
                                   '1M',
                                   data['path_dst'])
 
-                self.src_cloud.ssh_util.execute(process)
+                return self.src_cloud.ssh_util.execute(process)
 
             elif self.cfg.migrate.file_compression == "gzip":
                 dd = cmd_cfg.dd_cmd_of
@@ -66,7 +66,7 @@ class SSHFileToFile(driver_transporter.DriverTransporter):
                 process = process(self.cfg.migrate.level_compression,
                                   data['path_src'], '1M', data['path_dst'])
 
-                self.src_cloud.ssh_util.execute(process)
+                return self.src_cloud.ssh_util.execute(process)
 
     def transfer_direct(self, data):
         LOG.debug("| | copy file")
@@ -85,8 +85,8 @@ class SSHFileToFile(driver_transporter.DriverTransporter):
                                   '1M',
                                   data['path_dst'])
 
-                self.src_cloud.ssh_util.execute(process,
-                                                host_exec=data['host_src'])
+                return self.src_cloud.ssh_util.execute(
+                    process, host_exec=data['host_src'])
 
             elif self.cfg.migrate.file_compression == "gzip":
                 dd = cmd_cfg.dd_cmd_of
@@ -100,5 +100,5 @@ class SSHFileToFile(driver_transporter.DriverTransporter):
                 process = process(self.cfg.migrate.level_compression,
                                   data['path_src'], '1M', data['path_dst'])
 
-                self.src_cloud.ssh_util.execute(process,
-                                                host_exec=data['host_src'])
+                return self.src_cloud.ssh_util.execute(
+                    process, host_exec=data['host_src'])
@@ -16,6 +16,7 @@
 import re
 import time
 
+import profiler
 from utils import get_log
 
 LOG = get_log(__name__)
@@ -74,6 +75,7 @@ class FileLikeProxy:
         return res
 
     def __trigger_callback(self, len_data):
+        profiler.count(profiler.BYTES, len_data)
         self.delta += len_data
         self.res += len_data
         if self.delta > self.percent:
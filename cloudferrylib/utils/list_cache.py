@@ -0,0 +1,62 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import collections
+import threading
+import time
+
+
+class ListCache(object):
+    """Lists of slowly changing objects of a resource (flavors, images...).
+
+    List is read again when it is older than `ttl` seconds (0 - lists are
+    not cached) or after `invalidate`, which resource calls when it
+    creates or deletes an object of the list. Hits and misses are counted
+    by list name.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.lists = {}
+        self.hits = collections.Counter()
+        self.misses = collections.Counter()
+
+    def get(self, name, loader):
+        """List `name`, read by `loader()` if it is not cached."""
+        with self.lock:
+            if name in self.lists:
+                objs, loaded = self.lists[name]
+                if time.time() - loaded < self.ttl:
+                    self.hits[name] += 1
+                    return objs
+            self.misses[name] += 1
+            objs = list(loader())
+            if self.ttl:
+                self.lists[name] = (objs, time.time())
+            return objs
+
+    def invalidate(self, name=None):
+        with self.lock:
+            if name is None:
+                self.lists.clear()
+            else:
+                self.lists.pop(name, None)
+
+    def stats(self):
+        """{name: (hits, misses)} of every list."""
+        with self.lock:
+            return {name: (self.hits[name], self.misses[name])
+                    for name in set(self.hits) | set(self.misses)}
@@ -13,6 +13,8 @@
 # limitations under the License.
 
 
+import os
+
 import sqlalchemy
 
 
@@ -21,6 +23,8 @@ class MysqlConnector():
         self.config = config
         self.db = db
         self.connection_url = self.compose_connection_url()
+        self.engine = None
+        self.pid = None
 
     def compose_connection_url(self):
         return '{}://{}:{}@{}/{}'.format(self.config['connection'],
@@ -29,7 +33,40 @@ class MysqlConnector():
                                          self.config['host'],
                                          self.db)
 
+    def get_engine(self):
+        """Engine with the pool of connections, one per process."""
+        if self.engine is None or self.pid != os.getpid():
+            self.engine = sqlalchemy.create_engine(self.connection_url)
+            self.pid = os.getpid()
+        return self.engine
+
     def execute(self, command, **kwargs):
-        with sqlalchemy.create_engine(
-                self.connection_url).begin() as connection:
+        with self.get_engine().begin() as connection:
             return connection.execute(sqlalchemy.text(command), **kwargs)
+
+    def upsert(self, table, rows, keys, batch_size=500):
+        """Insert dicts `rows` into `table`, update rows which exist.
+
+        Rows are sent by batches of INSERT ... ON DUPLICATE KEY UPDATE
+        over a single connection in one transaction. Columns which are not
+        in `keys` are updated in existing rows.
+        """
+        if not rows:
+            return
+        columns = sorted(rows[0])
+        updates = ', '.join('%s=VALUES(%s)' % (c, c) for c in columns
+                            if c not in keys)
+        with self.get_engine().begin() as connection:
+            for start in xrange(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                values = []
+                params = {}
+                for i, row in enumerate(batch):
+                    values.append('(%s)' % ', '.join(
+                        ':%s_%d' % (c, i) for c in columns))
+                    params.update(('%s_%d' % (c, i), row[c]) for c in columns)
+                command = 'INSERT INTO %s (%s) VALUES %s' % (
+                    table, ', '.join(columns), ', '.join(values))
+                if updates:
+                    command += ' ON DUPLICATE KEY UPDATE ' + updates
+                connection.execute(sqlalchemy.text(command), **params)
@@ -0,0 +1,133 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import json
+from multiprocessing import Value
+import os
+import resource
+import threading
+import time
+
+from cloudferrylib.utils import utils
+
+
+LOG = utils.get_log(__name__)
+
+API_CALLS = 'api_calls'
+BYTES = 'bytes'
+
+# shared with forked processes, so that work of child schedulers is counted
+counters = {
+    API_CALLS: Value('L', 0),
+    BYTES: Value('L', 0),
+}
+
+
+def count(name, value=1):
+    counter = counters[name]
+    with counter.get_lock():
+        counter.value += value
+
+
+def get_counters():
+    return {name: counter.value for name, counter in counters.iteritems()}
+
+
+def get_usage():
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        'wall': time.time(),
+        'cpu': (usage_self.ru_utime + usage_self.ru_stime +
+                usage_children.ru_utime + usage_children.ru_stime),
+        'rss_kb': usage_self.ru_maxrss,
+    }
+
+
+def get_task_times(path):
+    """Mean wall time of every task recorded in the profile `path`."""
+    times = {}
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            times.setdefault(record['task'], []).append(record['wall'])
+    return {name: sum(walls) / len(walls) for name, walls in times.iteritems()}
+
+
+class Profiler(object):
+    """Records resources spent by every task of the scheduler.
+
+    For every task: wall and cpu time (including finished child processes),
+    growth of the peak RSS, number of API calls made through proxy clients
+    and bytes moved by transporters. Records are appended to `path` as
+    JSON lines. Counters are global, so tasks running concurrently share
+    them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.started = {}
+        self.records = []
+        self.lock = threading.Lock()
+
+    def start_task(self, task):
+        state = get_usage()
+        state.update(get_counters())
+        with self.lock:
+            self.started[id(task)] = state
+
+    def end_task(self, task):
+        state = get_usage()
+        state.update(get_counters())
+        with self.lock:
+            start = self.started.pop(id(task), None)
+            if start is None:
+                return
+            record = {
+                'task': str(task).split('|')[-1],
+                'wall': round(state['wall'] - start['wall'], 3),
+                'cpu': round(state['cpu'] - start['cpu'], 3),
+                'rss_delta_kb': state['rss_kb'] - start['rss_kb'],
+                API_CALLS: state[API_CALLS] - start[API_CALLS],
+                BYTES: state[BYTES] - start[BYTES],
+            }
+            self.records.append(record)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record, sort_keys=True) + '\n')
+
+    def summary(self):
+        """Table of totals by task, the most time consuming first."""
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record['task'], {
+                'task': record['task'], 'runs': 0, 'wall': 0, 'cpu': 0,
+                'rss_delta_kb': 0, API_CALLS: 0, BYTES: 0})
+            total['runs'] += 1
+            for key in ('wall', 'cpu', 'rss_delta_kb', API_CALLS, BYTES):
+                total[key] += record[key]
+        row = '%-32s %6s %12s %12s %12s %10s %16s'
+        lines = [row % ('task', 'runs', 'wall', 'cpu', 'rss_delta_kb',
+                        API_CALLS, BYTES)]
+        for total in sorted(totals.itervalues(), key=lambda t: -t['wall']):
+            lines.append(row % (total['task'], total['runs'],
+                                '%.3f' % total['wall'], '%.3f' % total['cpu'],
+                                total['rss_delta_kb'], total[API_CALLS],
+                                total[BYTES]))
+        return '\n'.join(lines)
+
+    def log_summary(self):
+        LOG.info("Tasks profile (%s):\n%s", self.path, self.summary())
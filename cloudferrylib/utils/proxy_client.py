@@ -13,6 +13,9 @@
 # limitations under the License.
 import time
 import inspect
+
+from cloudferrylib.utils import profiler
+
 method_wrapper = type(object().__str__)
 
 base_types = [inspect.types.BooleanType,
@@ -68,6 +71,7 @@ class Proxy:
         is_retry = True
         while is_retry:
             try:
+                profiler.count(profiler.API_CALLS)
                 result = self.client(*args, **kwargs)
                 is_retry = False
             except Exception as e:
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import copy
 import logging
 import sys
 import time
@@ -25,7 +26,9 @@ import json
 from jinja2 import Environment, FileSystemLoader
 import os
 import inspect
+from multiprocessing import Array
 from multiprocessing import Lock
+from multiprocessing import Pool
 from fabric.api import run, settings, local, env
 import ipaddr
 import yaml
@@ -100,6 +103,21 @@ class ext_dict(dict):
         raise AttributeError("Exporter has no attribute %s" % name)
 
 
+def copy_path(obj, *path):
+    """Shallow copy of the info with dicts along `path` copied too.
+
+    Dicts along the path of the copy may be changed, everything else is
+    shared with `obj` and must not be changed in place. Used by actions
+    instead of deepcopy: cost depends on the path, not on the info size.
+    """
+    obj = copy.copy(obj)
+    node = obj
+    for key in path:
+        node[key] = copy.copy(node[key])
+        node = node[key]
+    return obj
+
+
 def get_snapshots_list_repository(path=PATH_TO_SNAPSHOTS):
     path_source = path+'/source'
     path_dest = path+'/dest'
@@ -324,24 +342,21 @@ class wrapper_singletone_ssh_tunnel:
 
     def __init__(self, interval_ssh="9000-9999", locker=Lock()):
         self.interval_ssh = [int(interval_ssh.split('-')[0]), int(interval_ssh.split('-')[1])]
-        self.busy_port = []
+        # shared with forked processes, which migrate instances concurrently
+        self.busy_port = Array('b', self.interval_ssh[1] - self.interval_ssh[0] + 1, lock=False)
         self.locker = locker
 
     def get_free_port(self):
         with self.locker:
-            beg = self.interval_ssh[0]
-            end = self.interval_ssh[1]
-            while beg <= end:
-                if beg not in self.busy_port:
-                    self.busy_port.append(beg)
-                    return beg
-                beg += 1
+            for i in xrange(len(self.busy_port)):
+                if not self.busy_port[i]:
+                    self.busy_port[i] = 1
+                    return self.interval_ssh[0] + i
         raise RuntimeError("No free ssh port")
 
     def free_port(self, port):
         with self.locker:
-            if port in self.busy_port:
-                self.busy_port.remove(port)
+            self.busy_port[port - self.interval_ssh[0]] = 0
 
     def __call__(self, address_dest_compute, address_dest_controller, host, **kwargs):
         return up_ssh_tunnel_class(address_dest_compute,
@@ -401,13 +416,56 @@ def write_info(rendered_info, info_file = "source_info.html"):
         ifile.write(rendered_info)
 
 
-def get_libvirt_block_info(libvirt_name, init_host, compute_host):
-    with settings(host_string=init_host):
-        with forward_agent(env.key_filename):
-            out = run("ssh -oStrictHostKeyChecking=no %s 'virsh domblklist %s'" %
-                      (compute_host, libvirt_name))
-            libvirt_output = out.split()
-    return libvirt_output
+# printed before output of each domain, must be a plain shell word
+DOMAIN_MARKER = '==domain=='
+
+# (init_host, compute_host) -> {libvirt name: output of domblklist}
+libvirt_block_info = {}
+
+
+def get_libvirt_host_block_info(init_host, compute_host):
+    """Output of `virsh domblklist` of every domain of the host, split.
+
+    All domains are read by a single remote command, the result is cached
+    for the rest of the run.
+    """
+    key = (init_host, compute_host)
+    if key not in libvirt_block_info:
+        cmd = ("for d in $(virsh list --all --name); "
+               "do echo %s $d; virsh domblklist $d; done" % DOMAIN_MARKER)
+        with settings(host_string=init_host):
+            with forward_agent(env.key_filename):
+                out = run("ssh -oStrictHostKeyChecking=no %s '%s'" %
+                          (compute_host, cmd))
+        libvirt_block_info[key] = parse_host_block_info(out)
+    return libvirt_block_info[key]
+
+
+def parse_host_block_info(out):
+    domains = {}
+    blk_list = None
+    words = iter(out.split())
+    for word in words:
+        if word == DOMAIN_MARKER:
+            blk_list = domains.setdefault(next(words, None), [])
+        elif blk_list is not None:
+            blk_list.append(word)
+    return domains
+
+
+def get_libvirt_block_info(libvirt_name, init_host, compute_host,
+                           refresh=False):
+    """Output of `virsh domblklist` of the domain, split.
+
+    Block info of all domains of the host is read at once and cached (see
+    get_libvirt_host_block_info). It is read again if the domain is not
+    cached or `refresh` is set.
+    """
+    key = (init_host, compute_host)
+    if refresh or libvirt_name not in libvirt_block_info.get(key, {}):
+        libvirt_block_info.pop(key, None)
+    return get_libvirt_host_block_info(init_host, compute_host).get(
+        libvirt_name, [])
 
 
 def find_element_by_in(list_values, word):
@@ -418,6 +476,8 @@ def find_element_by_in(list_values, word):
 
 def init_singletones(cfg):
     globals()['up_ssh_tunnel'] = wrapper_singletone_ssh_tunnel(cfg.migrate.ssh_transfer_port)
+    globals()['ext_ips_path'] = cfg.migrate.ext_ip_cache
+    load_ext_ips()
 
 
 def get_disk_path(instance, blk_list, is_ceph_ephemeral=False, disk=DISK):
@@ -452,7 +512,7 @@ def get_ips(init_host, compute_host):
                 list_ips.append(info)
     return list_ips
 
-def get_ext_ip(ext_cidr, init_host, compute_host):
+def resolve_ext_ip(ext_cidr, init_host, compute_host):
     list_ips = get_ips(init_host, compute_host)
     for ip_str in list_ips:
         ip_addr = ipaddr.IPAddress(ip_str)
@@ -460,6 +520,73 @@ def get_ext_ip(ext_cidr, init_host, compute_host):
             return ip_str
     return None
 
+
+# (ext_cidr, init_host, compute_host) -> external IP of the compute host
+ext_ips = {}
+# file where ext_ips are kept between runs, None - not kept
+ext_ips_path = None
+
+
+def load_ext_ips():
+    if ext_ips_path and os.path.exists(ext_ips_path):
+        with open(ext_ips_path) as f:
+            for ext_cidr, init_host, compute_host, ip in json.load(f):
+                ext_ips[(ext_cidr, init_host, compute_host)] = ip
+
+
+def save_ext_ips():
+    if ext_ips_path:
+        with open(ext_ips_path, 'w') as f:
+            json.dump([list(key) + [ip] for key, ip in
+                       sorted(ext_ips.iteritems())], f, indent=1)
+
+
+def get_ext_ip(ext_cidr, init_host, compute_host):
+    """External IP of the compute host, resolved once per host."""
+    key = (ext_cidr, init_host, compute_host)
+    if key not in ext_ips:
+        ip = resolve_ext_ip(ext_cidr, init_host, compute_host)
+        if ip is None:
+            return None
+        ext_ips[key] = ip
+        save_ext_ips()
+    return ext_ips[key]
+
+
+def resolve_ext_ip_args(args):
+    # fabric aborts with SystemExit, which would kill the pool worker and
+    # leave map waiting forever; such host is resolved later by get_ext_ip
+    try:
+        return resolve_ext_ip(*args)
+    except (SystemExit, Exception) as e:
+        logging.getLogger(__name__).warning(
+            "Failed to resolve external IP of %s: %s", args[2], e)
+        return None
+
+
+def resolve_ext_ips(ext_cidr, init_host, compute_hosts, workers=8):
+    """Resolve external IPs of all compute hosts not resolved yet.
+
+    Hosts are resolved by `workers` processes at once, since fabric
+    connections can't be shared by threads.
+    """
+    hosts = sorted(set(h for h in compute_hosts
+                       if (ext_cidr, init_host, h) not in ext_ips))
+    if not hosts:
+        return
+    pool = Pool(min(workers, len(hosts)))
+    try:
+        ips = pool.map(resolve_ext_ip_args,
+                       [(ext_cidr, init_host, h) for h in hosts])
+    finally:
+        pool.close()
+        pool.join()
+    for host, ip in zip(hosts, ips):
+        if ip is not None:
+            ext_ips[(ext_cidr, init_host, host)] = ip
+    save_ext_ips()
+
+
 def check_file(file_path):
     return os.path.isfile(file_path)
 
@@ -37,6 +37,34 @@ def migrate(name_config=None, name_instance=None):
     cloud.migrate()
 
 
+@task
+def resume(name_config=None):
+    """
+        Continue interrupted migration from the journal (migrate.journal)
+        :name_config - name of config yaml-file, example 'config.yaml'
+    """
+    cfglib.collector_configs_plugins()
+    cfglib.init_config(name_config)
+    utils.init_singletones(cfglib.CONF)
+    env.key_filename = cfglib.CONF.migrate.key_filename
+    cloud = cloud_ferry.CloudFerry(cfglib.CONF)
+    cloud.migrate(resume=True)
+
+
+@task
+def plan(name_config=None):
+    """
+        Estimate data volume and duration of migration without migrating
+        :name_config - name of config yaml-file, example 'config.yaml'
+    """
+    cfglib.collector_configs_plugins()
+    cfglib.init_config(name_config)
+    utils.init_singletones(cfglib.CONF)
+    env.key_filename = cfglib.CONF.migrate.key_filename
+    cloud = cloud_ferry.CloudFerry(cfglib.CONF)
+    cloud.plan()
+
+
 @task
 def get_info(name_config):
     LOG.info("Init getting information")
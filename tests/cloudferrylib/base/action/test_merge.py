@@ -0,0 +1,49 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+from cloudferrylib.base.action import merge
+from cloudferrylib.utils import utils
+from tests import test
+
+
+class CopyPathTestCase(test.TestCase):
+    def test_copies_path_only(self):
+        info = {'instances': {'id1': {'instance': {'name': 'vm1'}}},
+                'meta': {}}
+
+        result = utils.copy_path(info, 'instances')
+        result['instances']['id2'] = {}
+
+        self.assertNotIn('id2', info['instances'])
+        self.assertIs(info['instances']['id1'], result['instances']['id1'])
+        self.assertIs(info['meta'], result['meta'])
+
+
+class MergeTestCase(test.TestCase):
+    def test_merge_shares_objects(self):
+        vm1 = {'instance': {'name': 'vm1'}}
+        vm2 = {'instance': {'name': 'vm2'}}
+        info = {'instances': {'id1': vm1}}
+        info_result = {'instances': {'id2': vm2}}
+        action = merge.Merge('info', 'info_result', 'info_result',
+                             'instances')
+
+        result = action.run(info=info,
+                            info_result=info_result)['info_result']
+
+        self.assertEqual({'id1': vm1, 'id2': vm2}, result['instances'])
+        self.assertIs(vm1, result['instances']['id1'])
+        self.assertEqual({'id2': vm2}, info_result['instances'])
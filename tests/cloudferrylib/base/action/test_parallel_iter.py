@@ -0,0 +1,67 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+from cloudferrylib.base.action import parallel_iter
+from cloudferrylib.scheduler import task
+from tests import test
+
+
+class RenameInstance(task.Task):
+    def run(self, info=None, **kwargs):
+        instances = {}
+        for inst_id, inst in info['instances'].iteritems():
+            if inst['instance']['name'] == 'broken':
+                raise RuntimeError('fake error')
+            inst['instance']['name'] += '_new'
+            instances['new_' + inst_id] = inst
+        return {'info': {'instances': instances}}
+
+
+def make_instance(name, host):
+    return {'instance': {'name': name, 'host': host}, 'meta': {}}
+
+
+class ParallelIterTestCase(test.TestCase):
+    def setUp(self):
+        super(ParallelIterTestCase, self).setUp()
+        self.info = {'instances': {
+            'id1': make_instance('vm1', 'host1'),
+            'id2': make_instance('vm2', 'host1'),
+            'id3': make_instance('vm3', 'host2')}}
+
+    def test_run(self):
+        action = parallel_iter.ParallelIter(RenameInstance(), workers=2,
+                                            workers_per_host=1)
+        result = action.run(info=self.info,
+                            info_result={'instances': {}})
+        instances = result['info_result']['instances']
+        self.assertEqual(['new_id1', 'new_id2', 'new_id3'],
+                         sorted(instances))
+        self.assertEqual('vm1_new', instances['new_id1']['instance']['name'])
+
+    def test_run_error(self):
+        self.info['instances']['id2']['instance']['name'] = 'broken'
+        action = parallel_iter.ParallelIter(RenameInstance(), workers=3)
+        self.assertRaises(RuntimeError, action.run, info=self.info,
+                          info_result={'instances': {}})
+
+    def test_run_error_stops_pending(self):
+        self.info['instances']['id1']['instance']['name'] = 'broken'
+        action = parallel_iter.ParallelIter(
+            RenameInstance(), workers=1,
+            get_priority=lambda inst: inst['instance']['name'] == 'broken')
+        self.assertRaises(RuntimeError, action.run, info=self.info,
+                          info_result={'instances': {}})
@@ -0,0 +1,118 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import os
+import shutil
+import tempfile
+
+from cloudferrylib.base.action import pipeline
+from cloudferrylib.scheduler import journal
+from cloudferrylib.scheduler import task
+from cloudferrylib.utils import profiler
+from tests import test
+
+
+class CopyDisk(task.Task):
+    def run(self, info=None, **kwargs):
+        for inst_id, inst in info['instances'].iteritems():
+            if inst['instance']['name'] == 'broken':
+                raise RuntimeError('fake error')
+        return {'disk_info': info['instances'].keys()}
+
+
+class BootInstance(task.Task):
+    def run(self, info=None, disk_info=None, **kwargs):
+        for inst in info['instances'].itervalues():
+            inst['meta']['disks'] = disk_info
+        return {'info': info}
+
+
+def make_instance(name, host):
+    return {'instance': {'name': name, 'host': host}, 'meta': {}}
+
+
+class PipelineTestCase(test.TestCase):
+    def setUp(self):
+        super(PipelineTestCase, self).setUp()
+        self.info = {'instances': {
+            'id1': make_instance('vm1', 'host1'),
+            'id2': make_instance('vm2', 'host1'),
+            'id3': make_instance('vm3', 'host2')}}
+
+    def test_run(self):
+        stages = [pipeline.Stage(CopyDisk(), 2, 1),
+                  pipeline.Stage(BootInstance())]
+        action = pipeline.Pipeline(stages)
+        result = action.run(info=self.info, info_result={'instances': {}})
+        instances = result['info_result']['instances']
+        self.assertEqual(['id1', 'id2', 'id3'], sorted(instances))
+        self.assertEqual(['id2'], instances['id2']['meta']['disks'])
+
+    def test_run_error(self):
+        self.info['instances']['id2']['instance']['name'] = 'broken'
+        stages = [pipeline.Stage(CopyDisk(), 3),
+                  pipeline.Stage(BootInstance())]
+        action = pipeline.Pipeline(stages)
+        self.assertRaises(RuntimeError, action.run, info=self.info,
+                          info_result={'instances': {}})
+
+    def test_run_error_stops_queue(self):
+        self.info['instances']['id1']['instance']['name'] = 'broken'
+        stages = [pipeline.Stage(CopyDisk()),
+                  pipeline.Stage(BootInstance())]
+        action = pipeline.Pipeline(
+            stages,
+            get_priority=lambda inst: inst['instance']['name'] == 'broken')
+        self.assertRaises(RuntimeError, action.run, info=self.info,
+                          info_result={'instances': {}})
+
+    def test_resume_skips_finished(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        migration_journal = journal.Journal(os.path.join(tmp_dir, 'journal'))
+        migration_journal.reset()
+        self.info['instances']['id3']['instance']['name'] = 'broken'
+        stages = [pipeline.Stage(CopyDisk()),
+                  pipeline.Stage(BootInstance())]
+        action = pipeline.Pipeline(
+            stages,
+            get_priority=lambda inst: inst['instance']['name'] != 'broken',
+            journal=migration_journal)
+        self.assertRaises(RuntimeError, action.run, info=self.info,
+                          info_result={'instances': {}})
+
+        resumed = {'info': self.info}
+        list(journal.Journal(migration_journal.path).replay(resumed))
+        self.assertEqual(['id1', 'id2'],
+                         sorted(resumed['info_result']['instances']))
+        # finished instances would fail if they were migrated again
+        self.info['instances']['id1']['instance']['name'] = 'broken'
+        self.info['instances']['id2']['instance']['name'] = 'broken'
+        self.info['instances']['id3']['instance']['name'] = 'vm3'
+        result = action.run(**resumed)
+        self.assertEqual(['id1', 'id2', 'id3'],
+                         sorted(result['info_result']['instances']))
+
+    def test_profile_items(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        task_profiler = profiler.Profiler(os.path.join(tmp_dir, 'profile'))
+        stages = [pipeline.Stage(CopyDisk(), 2),
+                  pipeline.Stage(BootInstance())]
+        action = pipeline.Pipeline(stages, profiler=task_profiler)
+        action.run(info=self.info, info_result={'instances': {}})
+        tasks = sorted(r['task'] for r in task_profiler.records)
+        self.assertEqual(['BootInstance'] * 3 + ['CopyDisk'] * 3, tasks)
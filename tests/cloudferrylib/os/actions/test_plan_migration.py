@@ -0,0 +1,87 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from cloudferrylib.os.actions import plan_migration
+from tests import test
+
+
+GB = plan_migration.GB
+
+
+def fake_instance(inst_id, host, image_id=None, is_ephemeral=False):
+    return {'instance': {'id': inst_id,
+                         'name': 'vm-%s' % inst_id,
+                         'host': host,
+                         'image_id': image_id,
+                         'flavor_id': 'flavor1',
+                         'is_ephemeral': is_ephemeral},
+            'meta': {}}
+
+
+class ScheduleTestCase(test.TestCase):
+    def test_workers(self):
+        times = plan_migration.schedule(
+            [('a', 'h1', 10), ('b', 'h2', 5), ('c', 'h3', 5)], workers=2)
+        self.assertEqual({'a': (0, 10), 'b': (0, 5), 'c': (5, 10)}, times)
+
+    def test_workers_per_host(self):
+        times = plan_migration.schedule(
+            [('a', 'h1', 10), ('b', 'h1', 5), ('c', 'h2', 5)],
+            workers=2, workers_per_host=1)
+        self.assertEqual({'a': (0, 10), 'c': (0, 5), 'b': (10, 15)}, times)
+
+
+class PlanMigrationTestCase(test.TestCase):
+    def setUp(self):
+        super(PlanMigrationTestCase, self).setUp()
+        image = mock.Mock(id='image1', size=2 * GB)
+        flavor = mock.Mock(id='flavor1', ephemeral=1)
+        fake_cloud = mock.Mock()
+        fake_cloud.resources = {
+            'image': mock.Mock(**{'get_image_list.return_value': [image]}),
+            'compute': mock.Mock(
+                **{'get_flavor_list.return_value': [flavor]})}
+        fake_config = mock.Mock()
+        fake_config.migrate.plan_bandwidth = 1024
+        fake_config.migrate.plan_instance_overhead = 10
+        self.fake_init = {'src_cloud': fake_cloud,
+                          'dst_cloud': mock.Mock(),
+                          'cfg': fake_config}
+
+    def test_plan(self):
+        inst1 = fake_instance('id1', 'h1', image_id='image1')
+        inst2 = fake_instance('id2', 'h1', image_id='image1',
+                              is_ephemeral=True)
+        info = {'instances': {'id1': inst1, 'id2': inst2}}
+        storage_info = {'volumes': {
+            'vol1': {'volume': {'size': 3}, 'meta': {'instance': inst2}}}}
+        action = plan_migration.PlanMigration(
+            self.fake_init, cloud='src_cloud', workers=2,
+            get_priority=lambda inst: inst['instance']['id'] == 'id2')
+
+        plan = action.run(info=info, storage_info=storage_info)['plan']
+
+        inst_plan = plan['instances']
+        self.assertEqual(6 * GB, inst_plan['id2']['bytes'])
+        self.assertEqual(0, inst_plan['id1']['bytes'])
+        self.assertEqual(16, inst_plan['id2']['duration'])
+        self.assertEqual(10, inst_plan['id1']['end'])
+        self.assertEqual(6 * GB, plan['bytes'])
+        self.assertEqual(16, plan['duration'])
+        self.assertIn('total: 2 instances',
+                      plan_migration.report(plan))
@@ -0,0 +1,51 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from cloudferrylib.os.actions import task_transfer
+from cloudferrylib.utils import profiler
+from tests import test
+
+
+DD_OUTPUT = """0+1 records in
+0+1 records out
+1048576 bytes (1.0 MB) copied, 0.01 s, 95 MB/s
+2048+0 records in
+2048+0 records out
+2147483648 bytes (2.1 GB) copied, 20.1 s, 107 MB/s"""
+
+
+class TaskTransferTestCase(test.TestCase):
+    def setUp(self):
+        super(TaskTransferTestCase, self).setUp()
+        self.data = {'path_src': '/tmp/disk', 'size': 1}
+        patcher = mock.patch.object(profiler, 'count')
+        self.count = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_count_bytes_of_dd(self):
+        task_transfer.TaskTransfer.count_bytes(self.data, DD_OUTPUT)
+        self.count.assert_called_once_with(profiler.BYTES, 2147483648)
+
+    def test_count_bytes_of_known_size(self):
+        task_transfer.TaskTransfer.count_bytes(self.data, '')
+        self.count.assert_called_once_with(profiler.BYTES, 1024 ** 3)
+
+    def test_count_bytes_unknown(self):
+        task_transfer.TaskTransfer.count_bytes({'path_src': '/tmp/disk'},
+                                               None)
+        self.assertFalse(self.count.called)
@@ -0,0 +1,107 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import json
+
+import mock
+
+from cloudferrylib.os.compute import db_inventory
+from tests import test
+
+
+NETWORK_INFO = json.dumps([{
+    'address': 'fa:16:3e:00:00:01',
+    'network': {'label': 'net1', 'subnets': [{'ips': [{
+        'address': '10.0.0.2',
+        'floating_ips': [{'address': '172.24.4.3'}]}]}]}}])
+
+
+class DbInventoryTestCase(test.TestCase):
+    def setUp(self):
+        super(DbInventoryTestCase, self).setUp()
+        self.connector = mock.Mock()
+        self.connector.execute.side_effect = self.execute
+        self.rows = {
+            'instances i JOIN': [{
+                'id': 26, 'uuid': 'uuid1', 'display_name': 'vm1',
+                'vm_state': 'stopped', 'project_id': 'tenant1',
+                'image_ref': 'image1', 'key_name': None, 'host': 'compute1',
+                'availability_zone': 'nova', 'flavorid': '2'}],
+            'security_group_instance_association': [
+                {'instance_uuid': 'uuid1', 'name': 'default'}],
+            'block_device_mapping': [
+                {'instance_uuid': 'uuid1', 'volume_id': 'vol1',
+                 'device_name': '/dev/vdb'}],
+            'instance_info_caches': [
+                {'instance_uuid': 'uuid1', 'network_info': NETWORK_INFO}],
+        }
+
+    def execute(self, command, **kwargs):
+        for table, rows in self.rows.iteritems():
+            if 'FROM ' + table in command:
+                return rows
+
+    def test_read_servers(self):
+        server, = db_inventory.read_servers(self.connector)
+
+        self.assertEqual('uuid1', server.id)
+        self.assertEqual('SHUTOFF', server.status)
+        self.assertEqual({'id': '2'}, server.flavor)
+        self.assertEqual({'id': 'image1'}, server.image)
+        self.assertEqual('instance-0000001a',
+                         getattr(server, 'OS-EXT-SRV-ATTR:instance_name'))
+        self.assertEqual([{'name': 'default'}], server.security_groups)
+        self.assertEqual({'net1': ['10.0.0.2', '172.24.4.3']},
+                         server.networks)
+        self.assertEqual({'10.0.0.2': 'fa:16:3e:00:00:01'}, server.macs)
+        self.assertEqual([('vol1', '/dev/vdb')], server.devices)
+        self.assertEqual(4, self.connector.execute.call_count)
+
+    def test_read_servers_name_template(self):
+        server, = db_inventory.read_servers(self.connector,
+                                            name_template='vm-%(uuid)s')
+
+        self.assertEqual('vm-uuid1',
+                         getattr(server, 'OS-EXT-SRV-ATTR:instance_name'))
+
+    def test_read_servers_of_project(self):
+        db_inventory.read_servers(self.connector, project_id='tenant1')
+
+        command, = self.connector.execute.call_args[0]
+        self.assertIn('AND i.project_id IN (:tenant_id_0)', command)
+        self.assertEqual({'tenant_id_0': 'tenant1'},
+                         self.connector.execute.call_args[1])
+
+    def test_read_servers_all_tenants(self):
+        db_inventory.read_servers(self.connector, {'all_tenants': 1},
+                                  project_id='tenant1')
+
+        command, = self.connector.execute.call_args[0]
+        self.assertNotIn('project_id IN', command)
+
+    def test_read_servers_filtered(self):
+        db_inventory.read_servers(self.connector,
+                                  {'id': ['uuid1', 'uuid2']})
+
+        command, = self.connector.execute.call_args[0]
+        self.assertIn('AND i.uuid IN (:id_0, :id_1)', command)
+        self.assertEqual({'id_0': 'uuid1', 'id_1': 'uuid2'},
+                         self.connector.execute.call_args[1])
+
+    def test_supports(self):
+        self.assertTrue(db_inventory.supports(None))
+        self.assertTrue(db_inventory.supports({'tenant_id': 't1'}))
+        self.assertFalse(db_inventory.supports({'name': 'vm1'}))
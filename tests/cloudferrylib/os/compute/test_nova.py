@@ -20,6 +20,7 @@ from novaclient.v1_1 import client as nova_client
 from oslotest import mockpatch
 
 from cloudferrylib.os.compute import nova_compute
+from cloudferrylib.utils import client_cache
 from cloudferrylib.utils import utils
 from tests import test
 
@@ -29,9 +30,14 @@ FAKE_CONFIG = utils.ext_dict(cloud=utils.ext_dict({'user': 'fake_user',
                                                    'tenant': 'fake_tenant',
                                                    'host': '1.1.1.1'}),
                              mysql=utils.ext_dict({'host': '1.1.1.1'}),
-                             migrate=utils.ext_dict({'speed_limit': '10MB',
-                                                     'retry': '7',
-                                                     'time_wait': '5'}))
+                             migrate=utils.ext_dict({
+                                 'speed_limit': '10MB',
+                                 'retry': '7',
+                                 'time_wait': '5',
+                                 'cache_ttl': 300,
+                                 'inventory_from_db': False,
+                                 'instances_page_size': 500,
+                                 'instances_fetch_workers': 4}))
 
 
 class NovaComputeTestCase(test.TestCase):
@@ -102,56 +108,86 @@ class NovaComputeTestCase(test.TestCase):
 
         self.assertEqual('start', status)
 
-    @mock.patch('cloudferrylib.os.compute.nova_compute.time.sleep')
+    @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.'
+                'wait_for_status')
     @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.get_status')
-    def test_change_status_active(self, mock_get, mock_sleep):
+    def test_change_status_active(self, mock_get, mock_wait):
         mock_get.return_value = 'shutoff'
         self.nova_client.change_status('active', instance=self.fake_instance_0)
         self.fake_instance_0.start.assert_called_once_with()
-        mock_sleep.assert_called_with(2)
+        mock_wait.assert_called_with('fake_instance_id', 'active',
+                                     since=mock.ANY)
 
-    @mock.patch('cloudferrylib.os.compute.nova_compute.time.sleep')
+    @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.'
+                'wait_for_status')
     @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.get_status')
-    def test_change_status_shutoff(self, mock_get, mock_sleep):
+    def test_change_status_shutoff(self, mock_get, mock_wait):
         mock_get.return_value = 'active'
         self.nova_client.change_status('shutoff',
                                        instance=self.fake_instance_0)
         self.fake_instance_0.stop.assert_called_once_with()
-        mock_sleep.assert_called_with(2)
+        mock_wait.assert_called_with('fake_instance_id', 'shutoff',
+                                     since=mock.ANY)
 
-    @mock.patch('cloudferrylib.os.compute.nova_compute.time.sleep')
+    @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.'
+                'wait_for_status')
     @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.get_status')
-    def test_change_status_resume(self, mock_get, mock_sleep):
+    def test_change_status_resume(self, mock_get, mock_wait):
         mock_get.return_value = 'suspend'
         self.nova_client.change_status('active', instance=self.fake_instance_0)
         self.fake_instance_0.resume.assert_called_once_with()
-        mock_sleep.assert_called_with(2)
+        mock_wait.assert_called_with('fake_instance_id', 'active',
+                                     since=mock.ANY)
 
-    @mock.patch('cloudferrylib.os.compute.nova_compute.time.sleep')
+    @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.'
+                'wait_for_status')
     @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.get_status')
-    def test_change_status_paused(self, mock_get, mock_sleep):
+    def test_change_status_paused(self, mock_get, mock_wait):
         mock_get.return_value = 'active'
         self.nova_client.change_status('paused', instance=self.fake_instance_0)
         self.fake_instance_0.pause.assert_called_once_with()
-        mock_sleep.assert_called_with(2)
+        mock_wait.assert_called_with('fake_instance_id', 'paused',
+                                     since=mock.ANY)
 
-    @mock.patch('cloudferrylib.os.compute.nova_compute.time.sleep')
+    @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.'
+                'wait_for_status')
     @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.get_status')
-    def test_change_status_unpaused(self, mock_get, mock_sleep):
+    def test_change_status_unpaused(self, mock_get, mock_wait):
         mock_get.return_value = 'paused'
         self.nova_client.change_status('active',
                                        instance=self.fake_instance_0)
         self.fake_instance_0.unpause.assert_called_once_with()
-        mock_sleep.assert_called_with(2)
+        mock_wait.assert_called_with('fake_instance_id', 'active',
+                                     since=mock.ANY)
 
-    @mock.patch('cloudferrylib.os.compute.nova_compute.time.sleep')
+    @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.'
+                'wait_for_status')
     @mock.patch('cloudferrylib.os.compute.nova_compute.NovaCompute.get_status')
-    def test_change_status_suspend(self, mock_get, mock_sleep):
+    def test_change_status_suspend(self, mock_get, mock_wait):
         mock_get.return_value = 'active'
         self.nova_client.change_status('suspend',
                                        instance=self.fake_instance_0)
         self.fake_instance_0.suspend.assert_called_once_with()
-        mock_sleep.assert_called_with(2)
+        mock_wait.assert_called_with('fake_instance_id', 'suspend',
+                                     since=mock.ANY)
+
+    def test_change_statuses(self):
+        servers = {'id1': mock.Mock(status='ACTIVE'),
+                   'id2': mock.Mock(status='SHUTOFF'),
+                   'id3': mock.Mock(status='ACTIVE')}
+        self.mock_client().servers.get.side_effect = servers.get
+        servers['id3'].stop.side_effect = Exception('fake error')
+        self.nova_client.status_watcher = mock.Mock()
+        self.nova_client.status_watcher.wait_for_all.return_value = {}
+
+        errors = self.nova_client.change_statuses('shutoff',
+                                                  ['id1', 'id2', 'id3'])
+
+        self.assertEqual(['id3'], errors.keys())
+        servers['id1'].stop.assert_called_once_with()
+        self.assertFalse(servers['id2'].stop.called)
+        self.nova_client.status_watcher.wait_for_all.assert_called_once_with(
+            {'id1': 'shutoff'}, 180, mock.ANY)
 
     def test_change_status_same(self):
         self.mock_client().servers.get('fake_instance_id').status = 'stop'
@@ -185,3 +221,185 @@ class NovaComputeTestCase(test.TestCase):
         self.nova_client.delete_flavor('fake_fl_id')
 
         self.mock_client().flavors.delete.assert_called_once_with('fake_fl_id')
+
+    def test_lookup_context(self):
+        network_mock = mock.Mock()
+        network_mock.get_macs_by_ip.return_value = {'10.0.0.2': 'fake_mac'}
+        storage_mock = mock.Mock()
+        storage_mock.get_volumes_list.return_value = [
+            mock.Mock(id='vol_1', attachments=[
+                {'server_id': 'fake_instance_id', 'device': '/dev/vdb'}])]
+        self.fake_cloud.resources.update(network=network_mock,
+                                         storage=storage_mock)
+        self.fake_flavor_0.id = 'fake_flavor_id'
+        self.mock_client().flavors.list.return_value = [self.fake_flavor_0]
+        setattr(self.fake_instance_0, nova_compute.VOLUMES_ATTACHED,
+                [{'id': 'vol_1'}])
+        self.fake_instance_0.networks = {'net': ['10.0.0.2']}
+
+        context = nova_compute.LookupContext(self.nova_client)
+
+        self.assertEqual(self.fake_flavor_0,
+                         context.get_flavor('fake_flavor_id'))
+        self.assertEqual([('vol_1', '/dev/vdb')],
+                         context.get_volumes(self.fake_instance_0))
+        self.assertEqual('fake_mac', context.get_networks(
+            self.fake_instance_0)[0]['mac'])
+        self.assertFalse(self.mock_client().volumes.get_server_volumes.called)
+        self.identity_mock.get_tenants_func.assert_called_once_with()
+        storage_mock.get_volumes_list.assert_called_once_with(
+            search_opts={'all_tenants': 1})
+
+    @mock.patch.object(nova_compute.NovaCompute, 'convert')
+    def test_read_info_by_id_no_prefetch(self, convert_mock):
+        network_mock = mock.Mock()
+        storage_mock = mock.Mock()
+        self.fake_cloud.resources.update(network=network_mock,
+                                         storage=storage_mock)
+        self.mock_client().servers.get.return_value = self.fake_instance_0
+
+        info = self.nova_client.read_info(
+            search_opts={'id': 'fake_instance_id'})
+
+        self.assertEqual(['fake_instance_id'], info['instances'].keys())
+        convert_mock.assert_called_once_with(
+            self.fake_instance_0, FAKE_CONFIG, self.fake_cloud)
+        self.assertFalse(self.mock_client().flavors.list.called)
+        self.assertFalse(storage_mock.get_volumes_list.called)
+        self.assertFalse(network_mock.get_macs_by_ip.called)
+
+    @mock.patch.object(nova_compute.NovaCompute, 'convert_instance')
+    @mock.patch.object(nova_compute.NovaCompute, 'convert')
+    def test_db_inventory_same_servers(self, convert_mock,
+                                       convert_instance_mock):
+        servers = [mock.Mock(id='uuid1', tenant_id='tenant1'),
+                   mock.Mock(id='uuid2', tenant_id='tenant2')]
+        rows = [{'id': i, 'uuid': server.id, 'display_name': server.id,
+                 'vm_state': 'active', 'project_id': server.tenant_id,
+                 'image_ref': None, 'key_name': None, 'host': 'compute1',
+                 'availability_zone': 'nova', 'flavorid': '1'}
+                for i, server in enumerate(servers)]
+
+        def list_servers(detailed, search_opts, marker, limit):
+            if marker:
+                return []
+            return [server for server in servers
+                    if (search_opts or {}).get('all_tenants') or
+                    server.tenant_id == 'tenant1']
+
+        def execute(command, **params):
+            if 'FROM instances i JOIN' not in command:
+                return []
+            return [row for row in rows
+                    if row['project_id'] == params.get('tenant_id_0',
+                                                       row['project_id'])]
+        self.mock_client().servers.list.side_effect = list_servers
+        self.nova_client.mysql_connector.execute.side_effect = execute
+        self.identity_mock.get_tenant_id_by_name.return_value = 'tenant1'
+        self.fake_cloud.position = 'src'
+
+        for search_opts in (None, {'all_tenants': 1}):
+            api_ids = sorted(self.nova_client.read_info(
+                search_opts=search_opts)['instances'])
+            with mock.patch.dict(FAKE_CONFIG['migrate'],
+                                 inventory_from_db=True,
+                                 instance_name_template='instance-%08x'):
+                db_ids = sorted(self.nova_client.read_info(
+                    search_opts=search_opts)['instances'])
+            self.assertEqual(api_ids, db_ids)
+        self.assertEqual(['uuid1', 'uuid2'], db_ids)
+        self.identity_mock.get_tenant_id_by_name.assert_called_with(
+            'fake_tenant')
+
+    def test_lookup_context_fallback(self):
+        self.mock_client().flavors.list.return_value = []
+        self.mock_client().flavors.get.return_value = self.fake_flavor_1
+        self.mock_client().volumes.get_server_volumes.return_value = [
+            mock.Mock(id='vol_1', device='/dev/vdb')]
+        setattr(self.fake_instance_0, nova_compute.VOLUMES_ATTACHED,
+                [{'id': 'vol_1'}])
+
+        context = nova_compute.LookupContext(self.nova_client)
+
+        self.assertEqual(self.fake_flavor_1, context.get_flavor('fl_id'))
+        self.assertEqual(self.fake_flavor_1, context.get_flavor('fl_id'))
+        self.mock_client().flavors.get.assert_called_once_with('fl_id')
+        self.assertEqual([('vol_1', '/dev/vdb')],
+                         context.get_volumes(self.fake_instance_0))
+
+    def test_iter_instances_pages(self):
+        self.fake_instance_1.id = 'fake_instance_id_1'
+        self.mock_client().servers.list.side_effect = [
+            [self.fake_instance_0, self.fake_instance_1],
+            [self.fake_instance_0], []]
+
+        instances = list(self.nova_client.iter_instances(limit=2))
+
+        self.assertEqual([self.fake_instance_0, self.fake_instance_1,
+                          self.fake_instance_0], instances)
+        self.mock_client().servers.list.assert_any_call(
+            detailed=True, search_opts=None, marker='fake_instance_id_1',
+            limit=2)
+        self.assertEqual(3, self.mock_client().servers.list.call_count)
+
+    def test_iter_instances_pages_above_max_limit(self):
+        self.fake_instance_1.id = 'fake_instance_id_1'
+        self.mock_client().servers.list.side_effect = [
+            [self.fake_instance_0], [self.fake_instance_1], []]
+
+        instances = list(self.nova_client.iter_instances(limit=1000))
+
+        self.assertEqual([self.fake_instance_0, self.fake_instance_1],
+                         instances)
+        self.mock_client().servers.list.assert_called_with(
+            detailed=True, search_opts=None, marker='fake_instance_id_1',
+            limit=1000)
+
+    def test_iter_instances_by_ids(self):
+        self.mock_client().servers.get.side_effect = lambda i: i
+
+        instances = list(self.nova_client.iter_instances(
+            search_opts={'id': ['id1', 'id2', 'id3']}, limit=2, workers=2))
+
+        self.assertEqual(['id1', 'id2', 'id3'], instances)
+
+    @mock.patch.dict(FAKE_CONFIG['migrate'], direct_compute_transfer=True)
+    @mock.patch.dict(FAKE_CONFIG['cloud'], ext_cidr='172.16.0.0/24')
+    @mock.patch.object(utils, 'resolve_ext_ips')
+    def test_resolve_ext_ips_of_live_services(self, resolve_mock):
+        self.fake_cloud.getIpSsh.return_value = 'ctrl'
+        self.mock_client().services.list.return_value = [
+            mock.Mock(host='compute1', state='up', status='enabled'),
+            mock.Mock(host='compute2', state='down', status='enabled'),
+            mock.Mock(host='compute3', state='up', status='disabled')]
+
+        self.nova_client.resolve_ext_ips()
+
+        resolve_mock.assert_called_once_with('172.16.0.0/24', 'ctrl',
+                                             ['compute1'])
+
+    def test_create_instance_in_tenant(self):
+        self.addCleanup(client_cache.clients.clear)
+        self.mock_client().servers.create.return_value = self.fake_instance_0
+
+        for _ in xrange(2):
+            instance_id = self.nova_client.create_instance(
+                tenant='fake_tenant_1', name='fake_instance')
+
+        self.assertEqual('fake_instance_id', instance_id)
+        self.mock_client.assert_called_with('fake_user', 'fake_password',
+                                            'fake_tenant_1',
+                                            'http://1.1.1.1:35357/v2.0/')
+        self.assertEqual(1, len(client_cache.clients.clients))
+
+    def test_deploy_project_quotas(self):
+        quotas = [{'quota': {'project_id': 'src_tenant', 'resource': 'cores',
+                             'hard_limit': 20}, 'meta': {}}]
+
+        self.nova_client._deploy_project_quotas(
+            quotas, {'src_tenant': 'dst_tenant'})
+
+        self.nova_client.mysql_connector.upsert.assert_called_once_with(
+            'quotas', [{'project_id': 'dst_tenant', 'resource': 'cores',
+                        'hard_limit': 20, 'deleted': 0}],
+            keys=('project_id', 'resource', 'deleted'))
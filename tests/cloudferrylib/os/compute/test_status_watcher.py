@@ -0,0 +1,70 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from cloudferrylib.os.compute import status_watcher
+from cloudferrylib.utils import timeout_exception
+from tests import test
+
+
+def fake_server(server_id, status):
+    server = mock.Mock(status=status)
+    server.id = server_id
+    return server
+
+
+class StatusWatcherTestCase(test.TestCase):
+    def setUp(self):
+        super(StatusWatcherTestCase, self).setUp()
+        self.client = mock.Mock()
+        self.watcher = status_watcher.StatusWatcher(
+            self.client, interval=0.01, max_interval=0.05, skew=0)
+
+    def test_wait_for_many(self):
+        self.client.servers.list.side_effect = [
+            [fake_server('id1', 'BUILD'), fake_server('id2', 'ACTIVE')],
+            [fake_server('id1', 'ACTIVE')],
+        ] + [[]] * 100
+
+        self.watcher.wait_for(['id1', 'id2'], 'active', timeout=5)
+
+        self.assertLess(self.client.servers.list.call_count, 5)
+        search_opts = self.client.servers.list.call_args[1]['search_opts']
+        self.assertIn('changes-since', search_opts)
+
+    def test_timeout(self):
+        self.client.servers.list.return_value = [fake_server('id1', 'BUILD')]
+
+        self.assertRaises(timeout_exception.TimeoutException,
+                          self.watcher.wait_for, ['id1'], 'active',
+                          timeout=0.1)
+
+    def test_error(self):
+        self.client.servers.list.return_value = [fake_server('id1', 'ERROR')]
+
+        self.assertRaises(RuntimeError, self.watcher.wait_for, ['id1'],
+                          'active', timeout=5)
+
+    def test_wait_for_all_reports_failed(self):
+        self.client.servers.list.return_value = [
+            fake_server('id1', 'SHUTOFF'), fake_server('id2', 'ERROR')]
+
+        errors = self.watcher.wait_for_all({'id1': 'shutoff',
+                                            'id2': 'shutoff'}, timeout=5)
+
+        self.assertEqual(['id2'], errors.keys())
+        self.assertIsInstance(errors['id2'], RuntimeError)
@@ -17,10 +17,13 @@
 import copy
 import mock
 
+from neutronclient.common import exceptions as neutron_exc
 from neutronclient.v2_0 import client as neutron_client
 from oslotest import mockpatch
 
 from cloudferrylib.os.network import neutron
+from cloudferrylib.os.network import resource_index
+from cloudferrylib.utils import profiler
 from cloudferrylib.utils import utils
 from tests import test
 
@@ -32,7 +35,9 @@ FAKE_CONFIG = utils.ext_dict(cloud=utils.ext_dict({'user': 'fake_user',
                                                    }),
                              migrate=utils.ext_dict({'speed_limit': '10MB',
                                                      'retry': '7',
-                                                     'time_wait': '5'}))
+                                                     'time_wait': '5',
+                                                     'cache_ttl': 300,
+                                                     'neutron_bulk_size': 2}))
 
 
 class NeutronTestCase(test.TestCase):
@@ -160,14 +165,16 @@ class NeutronTestCase(test.TestCase):
 
         self.neutron_mock_client().list_networks.return_value = \
             fake_networks_list
-        self.neutron_mock_client.show_subnet.return_value = \
-            {'subnet': {'name': 'fake_subnet_name_1'}}
+        self.neutron_mock_client().list_subnets.return_value = \
+            {'subnets': [{'id': 'fake_subnet_id_1',
+                          'name': 'fake_subnet_name_1'}]}
         self.network_mock.get_resource_hash = \
             mock.Mock(return_value='fake_net_hash_1')
 
         networks_info = [self.net_1_info]
         networks_info_result = self.neutron_network_client.get_networks()
         self.assertEquals(networks_info, networks_info_result)
+        self.assertFalse(self.neutron_mock_client().show_subnet.called)
 
     def test_get_subnets(self):
 
@@ -188,14 +195,16 @@ class NeutronTestCase(test.TestCase):
 
         self.neutron_mock_client().list_subnets.return_value = \
             fake_subnets_list
-        self.neutron_mock_client.show_network.return_value = \
-            {'network': {'name': 'fake_network_name_1'}}
+        self.neutron_mock_client().list_networks.return_value = \
+            {'networks': [{'id': 'fake_network_id_1',
+                           'name': 'fake_network_name_1'}]}
         self.network_mock.get_resource_hash = \
             mock.Mock(return_value='fake_subnet_hash_1')
 
         subnets_info = [self.subnet_1_info]
         subnets_info_result = self.neutron_network_client.get_subnets()
         self.assertEquals(subnets_info, subnets_info_result)
+        self.assertFalse(self.neutron_mock_client().show_network.called)
 
     def test_get_routers(self):
 
@@ -213,16 +222,20 @@ class NeutronTestCase(test.TestCase):
 
         self.neutron_mock_client().list_routers.return_value = \
             fake_routers_list
-        self.neutron_mock_client.show_network.return_value = \
-            {'network': {'name': 'fake_network_name_1',
-                         'tenant_id': 'fake_tenant_id_1'}}
+        self.neutron_mock_client().list_networks.return_value = \
+            {'networks': [{'id': 'fake_network_id_1',
+                           'name': 'fake_network_name_1',
+                           'tenant_id': 'fake_tenant_id_1'}]}
 
         fake_ports_list = {
             'ports': [{'fixed_ips': [{'subnet_id': 'fake_subnet_id_1',
                                       'ip_address': 'fake_ipaddr_1'}],
-                       'device_id': 'fake_router_id_1'}]}
+                       'device_id': 'fake_router_id_1'},
+                      {'fixed_ips': [{'subnet_id': 'fake_subnet_id_2',
+                                      'ip_address': 'fake_ipaddr_2'}],
+                       'device_id': 'fake_instance_id_1'}]}
 
-        self.neutron_mock_client.list_ports.return_value = fake_ports_list
+        self.neutron_mock_client().list_ports.return_value = fake_ports_list
         self.network_mock.get_resource_hash = \
             mock.Mock(return_value='fake_router_hash')
 
@@ -245,6 +258,7 @@ class NeutronTestCase(test.TestCase):
 
         routers_info_result = self.neutron_network_client.get_routers()
         self.assertEquals(routers_info, routers_info_result)
+        self.assertFalse(self.neutron_mock_client().show_network.called)
 
     def test_get_floatingips(self):
 
@@ -259,9 +273,10 @@ class NeutronTestCase(test.TestCase):
 
         self.neutron_mock_client().list_floatingips.return_value = \
             fake_floatingips_list
-        self.neutron_mock_client.show_network.return_value = \
-            {'network': {'name': 'fake_network_name_1',
-                         'tenant_id': 'fake_tenant_id_1'}}
+        self.neutron_mock_client().list_networks.return_value = \
+            {'networks': [{'id': 'fake_network_id_1',
+                           'name': 'fake_network_name_1',
+                           'tenant_id': 'fake_tenant_id_1'}]}
 
         floatingips_info = [{'id': 'fake_floating_ip_id_1',
                              'tenant_id': 'fake_tenant_id_1',
@@ -344,6 +359,133 @@ class NeutronTestCase(test.TestCase):
         secgr_info_result = self.neutron_network_client.get_sec_gr_and_rules()
         self.assertEquals(secgroups_info, secgr_info_result)
 
+    def test_check_existing_port(self):
+        self.neutron_mock_client().list_ports.return_value = {
+            'ports': [{'id': 'fake_port_id_1',
+                       'network_id': 'fake_network_id_1',
+                       'mac_address': 'fake_mac_1',
+                       'fixed_ips': [{'ip_address': 'fake_ipaddr_1'}]}]}
+        self.neutron_mock_client().create_port.return_value = {
+            'port': {'id': 'fake_port_id_2',
+                     'network_id': 'fake_network_id_1',
+                     'mac_address': 'fake_mac_2',
+                     'fixed_ips': [{'ip_address': 'fake_ipaddr_2'}]}}
+
+        port_id = self.neutron_network_client.check_existing_port(
+            'fake_network_id_1', 'fake_mac_1')
+        self.neutron_network_client.delete_port(port_id)
+        self.neutron_network_client.create_port('fake_network_id_1',
+                                                'fake_mac_2', 'fake_ipaddr_2',
+                                                'fake_tenant_id_1', True)
+
+        self.assertEqual('fake_port_id_1', port_id)
+        self.assertIsNone(self.neutron_network_client.check_existing_port(
+            'fake_network_id_1', 'fake_mac_1'))
+        self.assertEqual('fake_port_id_2',
+                         self.neutron_network_client.check_existing_port(
+                             'fake_network_id_1', 'fake_mac_2'))
+        self.assertEqual(1, self.neutron_mock_client().list_ports.call_count)
+
+    @staticmethod
+    def fake_port(port):
+        return dict(port, id='port_' + port['mac_address'],
+                    fixed_ips=port.get('fixed_ips', []))
+
+    def fake_create_ports(self, body):
+        if 'ports' in body:
+            if any(port.get('fixed_ips') for port in body['ports']):
+                raise neutron_exc.NeutronClientException(status_code=409)
+            return {'ports': [self.fake_port(port) for port in body['ports']]}
+        return {'port': self.fake_port(body['port'])}
+
+    def test_bulk_create_by_tenants(self):
+        create = self.neutron_mock_client().create_port
+        create.side_effect = self.fake_create_ports
+        bodies = [{'mac_address': 'mac%d' % i, 'tenant_id': tenant_id}
+                  for i, tenant_id in enumerate(['t1', 't1', 't2', 't1'])]
+
+        ports = self.neutron_network_client.bulk_create('port', bodies)
+
+        self.assertEqual(['port_mac0', 'port_mac1', 'port_mac2', 'port_mac3'],
+                         [port['id'] for port in ports])
+        self.assertEqual(
+            [mock.call({'ports': [bodies[0], bodies[1]]}),
+             mock.call({'port': bodies[3]}),
+             mock.call({'port': bodies[2]})],
+            create.call_args_list)
+
+    def test_bulk_create_failed_batch(self):
+        create = self.neutron_mock_client().create_port
+        create.side_effect = self.fake_create_ports
+        ports = [dict(net_id='net1', mac='mac%d' % i, ip='10.0.0.%d' % i,
+                      tenant_id='t1', keep_ip=bool(i)) for i in xrange(2)]
+        self.neutron_mock_client().list_ports.return_value = {'ports': []}
+        self.assertIsNone(self.neutron_network_client.check_existing_port(
+            'net1', 'mac1'))
+
+        created = self.neutron_network_client.create_ports(ports)
+
+        self.assertEqual(['port_mac0', 'port_mac1'],
+                         [port['id'] for port in created])
+        self.assertEqual(3, create.call_count)
+        self.assertEqual('port_mac1',
+                         self.neutron_network_client.check_existing_port(
+                             'net1', 'mac1'))
+
+    def test_bulk_create_transport_error(self):
+        create = self.neutron_mock_client().create_port
+        create.side_effect = [neutron_exc.ConnectionFailed()]
+        bodies = [{'mac_address': 'mac%d' % i, 'tenant_id': 't1'}
+                  for i in xrange(2)]
+
+        self.assertRaises(neutron_exc.ConnectionFailed,
+                          self.neutron_network_client.bulk_create,
+                          'port', bodies)
+        self.assertEqual(1, create.call_count)
+
+    def test_create_ports_rollback(self):
+        def create_port(body):
+            if body['ports'][0]['tenant_id'] == 't2':
+                raise neutron_exc.ConnectionFailed()
+            return self.fake_create_ports(body)
+        self.neutron_mock_client().create_port.side_effect = create_port
+        ports = [dict(net_id='net1', mac='mac%d' % i, ip='10.0.0.%d' % i,
+                      tenant_id=tenant_id, keep_ip=False)
+                 for i, tenant_id in enumerate(['t1', 't1', 't2', 't2'])]
+
+        self.assertRaises(neutron_exc.ConnectionFailed,
+                          self.neutron_network_client.create_ports, ports)
+        self.assertEqual(
+            [mock.call('port_mac0'), mock.call('port_mac1')],
+            self.neutron_mock_client().delete_port.call_args_list)
+
+    def test_create_ports_rollback_delete_error(self):
+        create = self.neutron_mock_client().create_port
+        create.side_effect = [self.fake_create_ports({'ports': [
+            {'mac_address': 'mac0'}, {'mac_address': 'mac1'}]}),
+            neutron_exc.ConnectionFailed()]
+        self.neutron_mock_client().delete_port.side_effect = \
+            neutron_exc.NotFound()
+        ports = [dict(net_id='net1', mac='mac%d' % i, ip='10.0.0.%d' % i,
+                      tenant_id=tenant_id, keep_ip=False)
+                 for i, tenant_id in enumerate(['t1', 't1', 't2', 't2'])]
+
+        self.assertRaises(neutron_exc.ConnectionFailed,
+                          self.neutron_network_client.create_ports, ports)
+        self.neutron_mock_client().delete_port.assert_any_call('port_mac1')
+
+    def test_bulk_create_counted(self):
+        self.neutron_mock_client().create_port.side_effect = \
+            self.fake_create_ports
+        bodies = [{'mac_address': 'mac%d' % i, 'tenant_id': 't1'}
+                  for i in xrange(2)]
+        calls = profiler.get_counters()[profiler.API_CALLS]
+
+        self.neutron_network_client.bulk_create('port', bodies)
+
+        self.assertEqual(calls + 1,
+                         profiler.get_counters()[profiler.API_CALLS])
+
     def test_upload_neutron_security_groups(self):
 
         sg1_info = {'name': 'fake_secgr_name_1',
@@ -484,7 +626,8 @@ class NeutronTestCase(test.TestCase):
         self.neutron_network_client.get_networks = \
             mock.Mock(return_value=[dst_net_info])
         self.neutron_network_client.get_subnets = \
-            mock.Mock(return_value=[{'res_hash': 'fake_subnet_hash_1'}])
+            mock.Mock(return_value=[{'res_hash': 'fake_subnet_hash_1',
+                                     'network_id': 'fake_network_id_1'}])
 
         subnet_info = {
             'subnet': {'name': 'fake_subnet_name_2',
@@ -503,6 +646,50 @@ class NeutronTestCase(test.TestCase):
         self.neutron_mock_client().create_subnet.\
             assert_called_once_with(subnet_info)
 
+    def test_upload_subnets_of_created_network(self):
+        self.neutron_network_client.get_networks = mock.Mock(return_value=[])
+        self.neutron_network_client.get_subnets = mock.Mock(return_value=[])
+        self.neutron_mock_client().create_network.return_value = \
+            {'network': {'id': 'fake_new_network_id'}}
+        existing = resource_index.ExistingResources(
+            self.neutron_network_client)
+
+        self.neutron_network_client.upload_networks([self.net_1_info],
+                                                    existing)
+        self.neutron_network_client.upload_subnets([self.net_1_info],
+                                                   [self.subnet_1_info],
+                                                   existing)
+
+        subnet_info = self.neutron_mock_client().create_subnet.call_args[0][0]
+        self.assertEqual('fake_new_network_id',
+                         subnet_info['subnet']['network_id'])
+        self.assertEqual(1, self.neutron_network_client.get_networks.
+                         call_count)
+
+    def test_upload_same_subnets_of_different_networks(self):
+        self.neutron_network_client.get_networks = mock.Mock(return_value=[])
+        self.neutron_network_client.get_subnets = mock.Mock(return_value=[])
+        self.neutron_mock_client().create_network.side_effect = [
+            {'network': {'id': 'fake_new_network_id_1'}},
+            {'network': {'id': 'fake_new_network_id_2'}}]
+        net_2_info = dict(self.net_2_info,
+                          tenant_name='fake_tenant_name_1', meta={})
+        subnet_2_info = dict(self.subnet_1_info, id='fake_subnet_id_2',
+                             network_id='fake_network_id_2', meta={})
+        existing = resource_index.ExistingResources(
+            self.neutron_network_client)
+
+        self.neutron_network_client.upload_networks(
+            [self.net_1_info, net_2_info], existing)
+        self.neutron_network_client.upload_subnets(
+            [self.net_1_info, net_2_info],
+            [self.subnet_1_info, subnet_2_info], existing)
+
+        self.assertEqual(
+            ['fake_new_network_id_1', 'fake_new_network_id_2'],
+            [c[0][0]['subnet']['network_id'] for c in
+             self.neutron_mock_client().create_subnet.call_args_list])
+
     def test_upload_routers(self):
 
         router1_info = {
@@ -567,6 +754,71 @@ class NeutronTestCase(test.TestCase):
         self.neutron_mock_client().create_router.\
             assert_called_once_with(router_info)
 
+    def prepare_floatingips(self):
+        self.neutron_network_client.get_networks = \
+            mock.Mock(return_value=[self.net_1_info])
+        self.neutron_network_client.get_subnets = mock.Mock(return_value=[
+            {'network_id': 'fake_network_id_1',
+             'res_hash': 'fake_subnet_hash_1',
+             'allocation_pools': [{'start': '172.24.4.2',
+                                   'end': '172.24.4.4'}]}])
+        self.neutron_network_client.get_floatingips = \
+            mock.Mock(return_value=[])
+        return [{'floating_network_id': 'fake_network_id_1',
+                 'floating_ip_address': '172.24.4.3',
+                 'tenant_name': 'fake_tenant_name_2'}]
+
+    def test_upload_floatingips_by_address(self):
+        src_floats = self.prepare_floatingips()
+
+        self.neutron_network_client.upload_floatingips([self.net_1_info],
+                                                       src_floats)
+
+        self.neutron_mock_client().create_floatingip.assert_called_once_with(
+            {'floatingip': {'floating_network_id': 'fake_network_id_1',
+                            'floating_ip_address': '172.24.4.3',
+                            'tenant_id': 'fake_tenant_id_2'}})
+
+    def test_upload_floatingips_allocated(self):
+        src_floats = self.prepare_floatingips()
+        create = self.neutron_mock_client().create_floatingip
+        create.side_effect = [
+            neutron_exc.NeutronClientException(status_code=400)] + [
+            {'floatingip': {'id': 'fake_fl_id_%s' % i,
+                            'floating_ip_address': '172.24.4.%s' % i}}
+            for i in (2, 3, 4, 3)]
+
+        self.neutron_network_client.upload_floatingips([self.net_1_info],
+                                                       src_floats)
+
+        create.assert_called_with(
+            {'floatingip': {'floating_network_id': 'fake_network_id_1',
+                            'tenant_id': 'fake_tenant_id_2'}})
+        self.assertEqual(5, create.call_count)
+        deleted = [c[0][0] for c in
+                   self.neutron_mock_client().delete_floatingip.call_args_list]
+        self.assertEqual(['fake_fl_id_3', 'fake_fl_id_2', 'fake_fl_id_4'],
+                         deleted[:1] + sorted(deleted[1:]))
+        self.assertFalse(self.neutron_network_client.
+                         floatingip_address_supported)
+
+    def test_allocate_floatingips_by_batches(self):
+        create = self.neutron_mock_client().create_floatingip
+        create.side_effect = [
+            {'floatingip': {'id': 'fake_fl_id_%s' % i,
+                            'floating_ip_address': '172.24.4.%s' % i}}
+            for i in (2, 3, 4, 5, 4)]
+
+        self.neutron_network_client.allocate_floatingips(
+            'fake_network_id_1', {'172.24.4.4': 'fake_tenant_id_2'},
+            batch_size=2)
+
+        self.assertEqual(5, create.call_count)
+        self.assertEqual(
+            ['fake_fl_id_2', 'fake_fl_id_3', 'fake_fl_id_4', 'fake_fl_id_5'],
+            sorted(c[0][0] for c in self.neutron_mock_client().
+                   delete_floatingip.call_args_list))
+
     def test_add_router_interfaces(self):
         src_router = {'id': 'fake_router_id_1',
                       'subnet_ids': ['fake_subnet_id_1'],
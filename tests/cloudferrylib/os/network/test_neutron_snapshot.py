@@ -0,0 +1,58 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from cloudferrylib.os.network import neutron_snapshot
+from tests import test
+
+
+class NeutronSnapshotTestCase(test.TestCase):
+    def setUp(self):
+        super(NeutronSnapshotTestCase, self).setUp()
+        self.client = mock.Mock()
+        self.client.list_networks.return_value = {
+            'networks': [{'id': 'net1', 'name': 'net1_name'}]}
+        self.client.list_ports.return_value = {
+            'ports': [{'id': 'port1', 'device_id': 'router1'},
+                      {'id': 'port2', 'device_id': 'router1'},
+                      {'id': 'port3', 'device_id': 'vm1'}]}
+        self.snapshot = neutron_snapshot.NeutronSnapshot(self.client)
+
+    def test_get_network_listed_once(self):
+        for _ in xrange(3):
+            network = self.snapshot.get_network('net1')
+
+        self.assertEqual('net1_name', network['name'])
+        self.client.list_networks.assert_called_once_with()
+        self.assertFalse(self.client.show_network.called)
+
+    def test_get_network_missing(self):
+        self.client.show_network.return_value = {
+            'network': {'id': 'net2', 'name': 'net2_name'}}
+
+        self.snapshot.get_network('net2')
+        network = self.snapshot.get_network('net2')
+
+        self.assertEqual('net2_name', network['name'])
+        self.client.show_network.assert_called_once_with('net2')
+
+    def test_get_device_ports(self):
+        ports = self.snapshot.get_device_ports('router1')
+
+        self.assertEqual(['port1', 'port2'], [p['id'] for p in ports])
+        self.assertEqual([], self.snapshot.get_device_ports('router2'))
+        self.client.list_ports.assert_called_once_with()
@@ -0,0 +1,64 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from cloudferrylib.os.network import port_index
+from tests import test
+
+
+def fake_port(port_id, network_id, mac, ip):
+    return {'id': port_id, 'network_id': network_id, 'mac_address': mac,
+            'fixed_ips': [{'ip_address': ip}]}
+
+
+class PortIndexTestCase(test.TestCase):
+    def setUp(self):
+        super(PortIndexTestCase, self).setUp()
+        self.list_ports = mock.Mock(return_value=[
+            fake_port('port1', 'net1', 'mac1', '10.0.0.2'),
+            fake_port('port2', 'net2', 'mac2', '10.0.0.2'),
+            fake_port('port3', 'net2', 'mac3', '10.0.0.3')])
+        self.index = port_index.PortIndex(self.list_ports)
+
+    def test_lookups_list_ports_once(self):
+        self.assertEqual('mac1', self.index.get_mac('10.0.0.2'))
+        self.assertEqual('mac3', self.index.get_mac('10.0.0.3'))
+        self.assertEqual('port2', self.index.get_port_id('net2', 'mac2'))
+        self.assertIsNone(self.index.get_port_id('net1', 'mac2'))
+        self.assertEqual({'10.0.0.2': 'mac1', '10.0.0.3': 'mac3'},
+                         self.index.get_macs())
+        self.list_ports.assert_called_once_with(
+            fields=port_index.PORT_FIELDS)
+
+    def test_add_and_remove(self):
+        self.index.get_mac('10.0.0.2')
+
+        self.index.add(fake_port('port4', 'net1', 'mac4', '10.0.0.4'))
+        self.index.remove('port1')
+
+        self.assertEqual('mac4', self.index.get_mac('10.0.0.4'))
+        self.assertEqual('mac2', self.index.get_mac('10.0.0.2'))
+        self.assertIsNone(self.index.get_port_id('net1', 'mac1'))
+        self.assertEqual(1, self.list_ports.call_count)
+
+    def test_reloaded_after_ttl(self):
+        self.index.ttl = 0
+
+        self.index.get_mac('10.0.0.2')
+        self.index.get_mac('10.0.0.2')
+
+        self.assertEqual(2, self.list_ports.call_count)
@@ -0,0 +1,46 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+from cloudferrylib.os.network import resource_index
+from tests import test
+
+
+class ResourceIndexTestCase(test.TestCase):
+    def setUp(self):
+        super(ResourceIndexTestCase, self).setUp()
+        self.index = resource_index.ResourceIndex([
+            {'id': 'id1', 'res_hash': 'hash1'},
+            {'id': 'id2', 'res_hash': 'hash2'},
+            {'id': 'id3', 'res_hash': 'hash1'}])
+
+    def test_lookups(self):
+        self.assertEqual('id1', self.index.get_by_hash('hash1')['id'])
+        self.assertEqual('hash1', self.index.get_hash_by_id('id3'))
+        self.assertIsNone(self.index.get_by_hash('hash3'))
+        self.assertIsNone(self.index.get_hash_by_id('id4'))
+
+    def test_missing(self):
+        missing = self.index.missing([{'res_hash': 'hash2'},
+                                      {'res_hash': 'hash3'},
+                                      {'res_hash': 'hash3'}])
+
+        self.assertEqual(set(['hash3']), missing)
+
+    def test_add(self):
+        self.index.add({'id': 'id4', 'res_hash': 'hash3'})
+
+        self.assertEqual('id4', self.index.get_by_hash('hash3')['id'])
+        self.assertEqual(4, len(list(self.index)))
@@ -0,0 +1,43 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from cloudferrylib.utils import client_cache
+from tests import test
+
+
+class ClientCacheTestCase(test.TestCase):
+    def test_get(self):
+        cache = client_cache.ClientCache()
+        factory = mock.Mock(side_effect=lambda: object())
+
+        client = cache.get(('nova', 'tenant1'), factory)
+
+        self.assertIs(client, cache.get(('nova', 'tenant1'), factory))
+        self.assertIsNot(client, cache.get(('nova', 'tenant2'), factory))
+        self.assertEqual(2, factory.call_count)
+
+    @mock.patch('cloudferrylib.utils.client_cache.time.time')
+    def test_expired(self, mock_time):
+        cache = client_cache.ClientCache(ttl=10)
+        factory = mock.Mock(side_effect=lambda: object())
+        mock_time.return_value = 100
+        client = cache.get('key', factory)
+
+        mock_time.return_value = 111
+
+        self.assertIsNot(client, cache.get('key', factory))
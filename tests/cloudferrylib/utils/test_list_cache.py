@@ -0,0 +1,55 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import mock
+
+from cloudferrylib.utils import list_cache
+from tests import test
+
+
+class ListCacheTestCase(test.TestCase):
+    def setUp(self):
+        super(ListCacheTestCase, self).setUp()
+        self.loader = mock.Mock(return_value=iter(['flavor1']))
+
+    def test_get(self):
+        cache = list_cache.ListCache()
+
+        self.assertEqual(['flavor1'], cache.get('flavors', self.loader))
+        self.assertEqual(['flavor1'], cache.get('flavors', self.loader))
+
+        self.loader.assert_called_once_with()
+        self.assertEqual({'flavors': (1, 1)}, cache.stats())
+
+    def test_invalidate(self):
+        cache = list_cache.ListCache()
+        cache.get('flavors', self.loader)
+
+        cache.invalidate('flavors')
+        cache.get('flavors', self.loader)
+
+        self.assertEqual(2, self.loader.call_count)
+
+    @mock.patch('cloudferrylib.utils.list_cache.time.time')
+    def test_expired(self, mock_time):
+        cache = list_cache.ListCache(ttl=10)
+        mock_time.return_value = 100
+        cache.get('flavors', self.loader)
+
+        mock_time.return_value = 111
+        cache.get('flavors', self.loader)
+
+        self.assertEqual({'flavors': (0, 2)}, cache.stats())
@@ -0,0 +1,71 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import json
+import os
+import shutil
+import tempfile
+
+import mock
+
+from cloudferrylib.scheduler import cursor
+from cloudferrylib.scheduler import namespace
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from cloudferrylib.utils import profiler
+from cloudferrylib.utils import proxy_client
+from tests import test
+
+
+class CallApi(task.Task):
+    def run(self, **kwargs):
+        client = proxy_client.Proxy(mock.Mock(), 0, 0)
+        client.servers.list()
+        client.servers.get('id1')
+        profiler.count(profiler.BYTES, 1024)
+
+
+class ProfilerTestCase(test.TestCase):
+    def setUp(self):
+        super(ProfilerTestCase, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'profile')
+
+    def test_profile_tasks(self):
+        s = scheduler.Scheduler(namespace=namespace.Namespace({}),
+                                cursor=cursor.Cursor(CallApi() >> CallApi()))
+        s.profiler = profiler.Profiler(self.path)
+        s.start()
+
+        with open(self.path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(2, len(records))
+        self.assertEqual('CallApi', records[0]['task'])
+        self.assertEqual(2, records[0][profiler.API_CALLS])
+        self.assertEqual(1024, records[1][profiler.BYTES])
+        summary = s.profiler.summary().splitlines()
+        self.assertEqual(2, len(summary))
+        self.assertEqual(['CallApi', '2'], summary[1].split()[:2])
+        self.assertEqual(['4', '2048'], summary[1].split()[-2:])
+
+    def test_get_task_times(self):
+        with open(self.path, 'w') as f:
+            for wall in (1, 3):
+                f.write(json.dumps({'task': 'CallApi', 'wall': wall}) + '\n')
+
+        self.assertEqual({'CallApi': 2}, profiler.get_task_times(self.path))
+        self.assertEqual({}, profiler.get_task_times(self.path + '.none'))
@@ -0,0 +1,138 @@
+# Copyright 2014: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+from multiprocessing import dummy
+import os
+import shutil
+import subprocess
+import tempfile
+
+import mock
+
+from cloudferrylib.utils import utils
+from tests import test
+
+
+FAKE_OUTPUT = """==domain== instance-1
+Target     Source
+------------------------------------------------
+vda        /var/lib/nova/instances/id1/disk
+==domain== instance-2
+Target     Source
+------------------------------------------------
+vda        /var/lib/nova/instances/id2/disk
+vdb        /dev/disk/by-path/ip-volume-vol1-lun-1
+"""
+
+
+class LibvirtBlockInfoTestCase(test.TestCase):
+    def setUp(self):
+        super(LibvirtBlockInfoTestCase, self).setUp()
+        self.addCleanup(utils.libvirt_block_info.clear)
+        for name in ('settings', 'forward_agent'):
+            patcher = mock.patch.object(utils, name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(utils, 'run', return_value=FAKE_OUTPUT)
+        self.run_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_single_call_per_host(self):
+        blk_list_1 = utils.get_libvirt_block_info('instance-1', 'ctrl', 'c1')
+        blk_list_2 = utils.get_libvirt_block_info('instance-2', 'ctrl', 'c1')
+
+        self.assertEqual(1, self.run_mock.call_count)
+        self.assertEqual('/var/lib/nova/instances/id1/disk', blk_list_1[-1])
+        self.assertEqual('/dev/disk/by-path/ip-volume-vol1-lun-1',
+                         utils.find_element_by_in(blk_list_2, 'vol1'))
+
+    def test_command(self):
+        utils.get_libvirt_block_info('instance-1', 'ctrl', 'c1')
+
+        command = self.run_mock.call_args[0][0]
+        self.assertEqual(
+            "ssh -oStrictHostKeyChecking=no c1 'for d in $(virsh list --all "
+            "--name); do echo ==domain== $d; virsh domblklist $d; done'",
+            command)
+        remote_command = command.split("'")[1]
+        self.assertEqual(0, subprocess.call(['bash', '-n', '-c',
+                                             remote_command]))
+
+    def test_refresh(self):
+        utils.get_libvirt_block_info('instance-1', 'ctrl', 'c1')
+        utils.get_libvirt_block_info('instance-1', 'ctrl', 'c1', refresh=True)
+        self.assertEqual([], utils.get_libvirt_block_info('instance-3',
+                                                          'ctrl', 'c1'))
+
+        self.assertEqual(3, self.run_mock.call_count)
+
+
+class ExtIpTestCase(test.TestCase):
+    def setUp(self):
+        super(ExtIpTestCase, self).setUp()
+        self.addCleanup(utils.ext_ips.clear)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        patcher = mock.patch.object(
+            utils, 'ext_ips_path', os.path.join(self.tmp_dir, 'ext_ips'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            utils, 'get_ips', side_effect=lambda init, host: [
+                '10.0.0.%s' % host[-1], '172.16.0.%s' % host[-1]])
+        self.get_ips_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_ext_ip_cached(self):
+        for _ in xrange(2):
+            ip = utils.get_ext_ip('172.16.0.0/24', 'ctrl', 'compute1')
+
+        self.assertEqual('172.16.0.1', ip)
+        self.assertEqual(1, self.get_ips_mock.call_count)
+
+    def test_saved_between_runs(self):
+        utils.get_ext_ip('172.16.0.0/24', 'ctrl', 'compute1')
+        utils.ext_ips.clear()
+
+        utils.load_ext_ips()
+
+        self.assertEqual('172.16.0.1', utils.get_ext_ip('172.16.0.0/24',
+                                                        'ctrl', 'compute1'))
+        self.assertEqual(1, self.get_ips_mock.call_count)
+
+    @mock.patch.object(utils, 'Pool', dummy.Pool)
+    def test_resolve_ext_ips(self):
+        utils.resolve_ext_ips('172.16.0.0/24', 'ctrl',
+                              ['compute1', 'compute2', 'compute1'],
+                              workers=2)
+
+        self.assertEqual({('172.16.0.0/24', 'ctrl', 'compute1'): '172.16.0.1',
+                          ('172.16.0.0/24', 'ctrl', 'compute2'): '172.16.0.2'},
+                         utils.ext_ips)
+
+    @mock.patch.object(utils, 'Pool', dummy.Pool)
+    def test_resolve_ext_ips_unreachable_host(self):
+        def get_ips(init_host, compute_host):
+            if compute_host == 'compute2':
+                raise SystemExit(1)
+            return ['172.16.0.%s' % compute_host[-1]]
+        self.get_ips_mock.side_effect = get_ips
+
+        utils.resolve_ext_ips('172.16.0.0/24', 'ctrl',
+                              ['compute1', 'compute2'], workers=2)
+
+        self.assertEqual({('172.16.0.0/24', 'ctrl', 'compute1'): '172.16.0.1'},
+                         utils.ext_ips)
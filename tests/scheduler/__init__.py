@@ -14,5 +14,9 @@
 
 
 from cursor import *
+from dag import *
+from executor import *
+from journal import *
+from namespace import *
 from scheduler import *
 from task import *
@@ -0,0 +1,100 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+from cloudferrylib.scheduler import cursor
+from cloudferrylib.scheduler import dag
+from cloudferrylib.scheduler import namespace
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from tests import test
+
+
+class KeyTask(task.Task):
+    def __init__(self, requires=(), provides=None, fail=False):
+        super(KeyTask, self).__init__()
+        self.requires = requires
+        self.provides = provides
+        self.fail = fail
+
+    def run(self, **kwargs):
+        if self.fail:
+            raise RuntimeError('fake error')
+        return {k: kwargs.get('v', 0) + 1 for k in self.provides}
+
+
+class ArgTask(task.Task):
+    provides = ('c',)
+
+    def run(self, a=None, b=None, **kwargs):
+        return {'c': a + b}
+
+
+class DagTestCase(test.TestCase):
+    def test_independent_tasks(self):
+        net = KeyTask(provides=('a',)) >> KeyTask(provides=('b',))
+        graph = dag.Dag(net)
+        self.assertEqual(2, len(graph))
+        self.assertEqual([set(), set()], graph.deps)
+
+    def test_read_after_write(self):
+        net = KeyTask(provides=('a',)) >> KeyTask(provides=('b',)) >> \
+            ArgTask()
+        self.assertEqual({0, 1}, dag.Dag(net).deps[2])
+
+    def test_write_after_read(self):
+        net = ArgTask() >> KeyTask(provides=('a',)) >> \
+            KeyTask(requires=('c',), provides=('c',))
+        graph = dag.Dag(net)
+        self.assertEqual({0}, graph.deps[1])
+        self.assertEqual({0}, graph.deps[2])
+
+    def test_barrier(self):
+        net = KeyTask(provides=('a',)) >> KeyTask() >> \
+            KeyTask(provides=('b',))
+        graph = dag.Dag(net)
+        self.assertEqual({0}, graph.deps[1])
+        self.assertEqual({1}, graph.deps[2])
+
+    def test_branches_not_allowed(self):
+        t1 = task.Task()
+        t1 | task.Task()
+        self.assertRaises(ValueError, dag.Dag, t1)
+
+    def test_critical_path(self):
+        net = KeyTask(provides=('a',)) >> KeyTask(provides=('b',)) >> \
+            KeyTask(requires=('a',), provides=('c',))
+        self.assertEqual((4, [0, 2]),
+                         dag.Dag(net).critical_path([3, 2, 1]))
+        self.assertEqual((0, []), dag.Dag(None).critical_path([]))
+
+
+class DagSchedulerTestCase(test.TestCase):
+    def test_start(self):
+        net = KeyTask(provides=('a',)) >> KeyTask(provides=('b',)) >> \
+            ArgTask()
+        ns = namespace.Namespace({})
+        s = scheduler.DagScheduler(namespace=ns, cursor=cursor.Cursor(net),
+                                   workers=2)
+        s.start()
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual(2, ns.vars['c'])
+
+    def test_start_error(self):
+        net = KeyTask(provides=('a',), fail=True) >> ArgTask()
+        ns = namespace.Namespace({})
+        s = scheduler.DagScheduler(namespace=ns, cursor=cursor.Cursor(net))
+        s.start()
+        self.assertEqual(scheduler.ERROR, s.status_error)
+        self.assertNotIn('c', ns.vars)
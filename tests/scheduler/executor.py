@@ -0,0 +1,138 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import threading
+
+from cloudferrylib.scheduler import cursor
+from cloudferrylib.scheduler import executor
+from cloudferrylib.scheduler import namespace
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from cloudferrylib.scheduler import thread_tasks
+from tests import test
+
+
+class SetVar(task.Task):
+    def __init__(self, name, value, fail=False):
+        super(SetVar, self).__init__()
+        self.name = name
+        self.value = value
+        self.fail = fail
+
+    def run(self, **kwargs):
+        if self.fail:
+            raise RuntimeError('fake error')
+        return {self.name: self.value}
+
+
+def fail():
+    raise RuntimeError('fake error')
+
+
+class ExecutorTestCase(test.TestCase):
+    def test_submit(self):
+        for name in executor.EXECUTORS:
+            job = executor.get_executor(name, 2).submit(lambda: {'a': 1})
+            self.assertEqual({'a': 1}, job.join())
+
+    def test_submit_error(self):
+        for name in executor.EXECUTORS:
+            job = executor.get_executor(name, 2).submit(fail)
+            self.assertRaises(RuntimeError, job.join)
+
+    def test_nested_join(self):
+        pool = executor.ThreadExecutor(1)
+        job = pool.submit(lambda: pool.submit(lambda: 1).join() + 1)
+        self.assertEqual(2, job.join())
+
+    def test_unknown_executor(self):
+        self.assertRaises(ValueError, executor.get_executor, 'fake')
+
+
+class PendingJobsTestCase(test.TestCase):
+    def test_priority(self):
+        jobs = executor.PendingJobs()
+        for job, priority in (('low', thread_tasks.LOW),
+                              ('normal1', thread_tasks.NORMAL),
+                              ('high', thread_tasks.HIGH),
+                              ('normal2', thread_tasks.NORMAL)):
+            jobs.put(job, priority)
+        self.assertEqual(['high', 'normal1', 'normal2', 'low'],
+                         [jobs.pop() for _ in xrange(4)])
+        self.assertIsNone(jobs.pop())
+
+    def test_ageing(self):
+        jobs = executor.PendingJobs(ageing=10)
+        jobs.put('low', thread_tasks.LOW)
+        jobs.put('normal', thread_tasks.NORMAL)
+        jobs.jobs[0] = (thread_tasks.LOW, jobs.jobs[0][1] - 15) + \
+            jobs.jobs[0][2:]
+        self.assertEqual('low', jobs.pop())
+
+    def test_remove(self):
+        jobs = executor.PendingJobs()
+        jobs.put('job1')
+        self.assertFalse(jobs.remove('job2'))
+        self.assertTrue(jobs.remove('job1'))
+        self.assertEqual(0, len(jobs))
+
+    def test_thread_executor_priority(self):
+        pool = executor.ThreadExecutor(1)
+        started = threading.Event()
+        release = threading.Event()
+        order = []
+
+        def block():
+            started.set()
+            release.wait()
+
+        first = pool.submit(block)
+        started.wait()
+        jobs = [pool.submit(lambda p=p: order.append(p), p)
+                for p in (thread_tasks.LOW, thread_tasks.HIGH,
+                          thread_tasks.NORMAL)]
+        release.set()
+        first.join()
+        for job in jobs:
+            job.join()
+        self.assertEqual(thread_tasks.HIGH, order[0])
+
+
+class SchedulerThreadTestCase(test.TestCase):
+    def run_threads(self, name, fail=False):
+        thread_a = thread_tasks.WrapThreadTask(SetVar('a', 1))
+        thread_b = thread_tasks.WrapThreadTask(SetVar('b', 2, fail))
+        net = (SetVar('c', 3) & thread_a & thread_b) >> \
+            thread_tasks.WaitThreadTask(thread_a) >> \
+            thread_tasks.WaitThreadAllTask()
+        ns = namespace.Namespace({})
+        s = scheduler.Scheduler(namespace=ns, cursor=cursor.Cursor(net),
+                                executor=executor.get_executor(name, 2))
+        s.start()
+        return s, ns
+
+    def test_results_merged(self):
+        for name in executor.EXECUTORS:
+            s, ns = self.run_threads(name)
+            self.assertEqual(scheduler.NO_ERROR, s.status_error)
+            self.assertEqual((1, 2, 3), (ns.vars.get('a'), ns.vars.get('b'),
+                                         ns.vars.get('c')))
+            self.assertEqual({}, ns.vars[namespace.CHILDREN])
+
+    def test_child_error(self):
+        for name in executor.EXECUTORS:
+            s, ns = self.run_threads(name, fail=True)
+            self.assertEqual(scheduler.ERROR, s.status_error)
+            self.assertNotIn('b', ns.vars)
@@ -0,0 +1,109 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+import copy
+import os
+import shutil
+import tempfile
+
+from cloudferrylib.scheduler import cursor
+from cloudferrylib.scheduler import journal
+from cloudferrylib.scheduler import namespace
+from cloudferrylib.scheduler import scheduler
+from cloudferrylib.scheduler import task
+from tests import test
+
+
+class AddItem(task.Task):
+    provides = ('items',)
+
+    def __init__(self, fail=False):
+        super(AddItem, self).__init__()
+        self.fail = fail
+        self.runs = 0
+
+    def run(self, items=None, **kwargs):
+        self.runs += 1
+        if self.fail:
+            raise RuntimeError('fake error')
+        items['item%d' % len(items)] = len(items)
+        return {'items': items}
+
+
+class Count(task.Task):
+    provides = ('count',)
+
+    def run(self, items=None, **kwargs):
+        return {'count': len(items)}
+
+
+class JournalTestCase(test.TestCase):
+    def setUp(self):
+        super(JournalTestCase, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'journal')
+
+    def run_chain(self, tasks, resume=False):
+        net = tasks[0]
+        for t in tasks[1:]:
+            net = net >> t
+        ns = namespace.Namespace({'items': {}})
+        s = scheduler.Scheduler(namespace=ns, cursor=cursor.Cursor(net))
+        migration_journal = journal.Journal(self.path)
+        if resume:
+            s.resume(migration_journal)
+        else:
+            migration_journal.reset()
+            s.journal = migration_journal
+        s.start()
+        return s, ns
+
+    def test_diff_patch(self):
+        old = {'a': 1, 'b': {'c': 1, 'd': 2}, 'g': 0}
+        new = {'a': 1, 'b': {'c': 1, 'd': 3, 'e': 4}, 'f': 5}
+        changes = journal.diff(old, new)
+        self.assertEqual(({'f': 5}, {'b': ({'d': 3, 'e': 4}, {}, [])},
+                          ['g']), changes)
+        result = copy.deepcopy(old)
+        journal.patch(result, changes)
+        self.assertEqual(new, result)
+
+    def test_resume(self):
+        s, _ = self.run_chain([AddItem(), AddItem(), AddItem(fail=True),
+                               Count()])
+        self.assertEqual(scheduler.ERROR, s.status_error)
+
+        tasks = [AddItem(), AddItem(), AddItem(), Count()]
+        s, ns = self.run_chain(tasks, resume=True)
+        self.assertEqual(scheduler.NO_ERROR, s.status_error)
+        self.assertEqual([0, 0, 1], [t.runs for t in tasks[:3]])
+        self.assertEqual({'item0': 0, 'item1': 1, 'item2': 2},
+                         ns.vars['items'])
+        self.assertEqual(3, ns.vars['count'])
+
+    def test_resume_twice(self):
+        self.run_chain([AddItem(), AddItem(fail=True), AddItem()])
+        self.run_chain([AddItem(), AddItem(), AddItem(fail=True)],
+                       resume=True)
+        tasks = [AddItem(), AddItem(), AddItem()]
+        _, ns = self.run_chain(tasks, resume=True)
+        self.assertEqual([0, 0, 1], [t.runs for t in tasks])
+        self.assertEqual(3, len(ns.vars['items']))
+
+    def test_resume_other_chain(self):
+        self.run_chain([AddItem(), Count()])
+        self.assertRaises(ValueError, self.run_chain, [Count(), AddItem()],
+                          resume=True)
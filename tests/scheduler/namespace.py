@@ -0,0 +1,66 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+
+from cloudferrylib.scheduler import namespace
+from tests import test
+
+
+class NamespaceTestCase(test.TestCase):
+    def setUp(self):
+        super(NamespaceTestCase, self).setUp()
+        self.info = {'instances': {'id1': {}}}
+        self.ns = namespace.Namespace({'info': self.info, 'a': 1, 'b': 2})
+
+    def test_fork_reads_parent(self):
+        child = self.ns.fork()
+        self.assertIs(self.info, child.vars['info'])
+        self.assertEqual({'info', 'a', 'b', namespace.CHILDREN},
+                         set(child.vars))
+        self.assertIsNot(self.ns.vars[namespace.CHILDREN],
+                         child.vars[namespace.CHILDREN])
+
+    def test_fork_writes_own_layer(self):
+        child = self.ns.fork()
+        child.vars.update({'a': 10, 'c': 3})
+        del child.vars['b']
+        self.assertEqual({'a': 1, 'b': 2},
+                         {k: self.ns.vars[k] for k in ('a', 'b')})
+        self.assertNotIn('c', self.ns.vars)
+        self.assertNotIn('b', child.vars)
+        self.assertEqual(10, child.vars['a'])
+        self.assertEqual(({'a': 10, 'c': 3}, {'b'}), child.get_changes())
+
+    def test_fork_of_fork(self):
+        child = self.ns.fork()
+        child.vars['a'] = 10
+        grandchild = child.fork()
+        grandchild.vars['c'] = 3
+        self.assertEqual(10, grandchild.vars['a'])
+        self.assertEqual(2, grandchild.vars['b'])
+        child.merge(grandchild.get_changes())
+        self.assertEqual(({'a': 10, 'c': 3}, set()), child.get_changes())
+
+    def test_merge(self):
+        child = self.ns.fork()
+        child.vars['a'] = 10
+        del child.vars['b']
+        self.ns.merge(child.get_changes())
+        self.assertEqual(10, self.ns.vars['a'])
+        self.assertNotIn('b', self.ns.vars)
+
+    def test_fork_deep_copy(self):
+        child = self.ns.fork(is_deep_copy=True)
+        self.assertEqual(self.info, child.vars['info'])
+        self.assertIsNot(self.info, child.vars['info'])